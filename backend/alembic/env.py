@@ -0,0 +1,47 @@
+"""
+Alembic migration environment
+"""
+
+from logging.config import fileConfig
+from alembic import context
+from app.core.config import settings
+from app.database import Base, engine
+# Import every module that defines mapped tables so they register on Base
+from app.models import user, waste, system  # noqa: F401
+from app.routers import shop, smart_card, diy_projects  # noqa: F401
+
+config = context.config
+
+# Only configure logging for the alembic CLI; init_db() runs inside the app
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+def run_migrations_offline():
+    """Emit migration SQL without a database connection"""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    """Run migrations against the application database"""
+    with engine.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=True,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,43 @@
+"""Composite indexes for hot query shapes
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns) for every per-user / listing access pattern
+INDEXES = [
+    ("ix_waste_scans_user_scanned_at", "waste_scans", ["user_id", "scanned_at"]),
+    ("ix_waste_scans_user_category", "waste_scans", ["user_id", "detected_category"]),
+    ("ix_orders_user_created_at", "orders", ["user_id", "created_at"]),
+    ("ix_smart_cards_user_active", "smart_cards", ["user_id", "is_active"]),
+    ("ix_diy_projects_user_created_at", "diy_projects", ["user_id", "created_at"]),
+    ("ix_diy_projects_listing", "diy_projects", ["is_public", "is_approved", "created_at"]),
+]
+
+
+def upgrade() -> None:
+    existing = {
+        table: {index["name"] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+        for table in {table for _, table, _ in INDEXES}
+    }
+    for name, table, columns in INDEXES:
+        if name not in existing[table]:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,71 @@
+"""Reference waste categories from scans instead of copying guidance text
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('waste_categories') as batch_op:
+        batch_op.add_column(sa.Column('content_version', sa.Integer(), server_default='1', nullable=False))
+
+    with op.batch_alter_table('waste_scans') as batch_op:
+        batch_op.add_column(sa.Column('category_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('category_version', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key(
+            'fk_waste_scans_category_id', 'waste_categories', ['category_id'], ['id']
+        )
+
+    # Register every category name seen on scans; the seed fills in guidance text
+    op.execute(
+        "INSERT INTO waste_categories (name, content_version) "
+        "SELECT DISTINCT detected_category, 1 FROM waste_scans "
+        "WHERE detected_category NOT IN (SELECT name FROM waste_categories)"
+    )
+    op.execute(
+        "UPDATE waste_scans SET category_version = 1, category_id = ("
+        "SELECT id FROM waste_categories WHERE waste_categories.name = waste_scans.detected_category)"
+    )
+
+    with op.batch_alter_table('waste_scans') as batch_op:
+        batch_op.drop_column('disposal_method')
+        batch_op.drop_column('environmental_impact')
+        batch_op.drop_column('recycling_tips')
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('waste_scans') as batch_op:
+        batch_op.add_column(sa.Column('disposal_method', sa.String(length=255), nullable=True))
+        batch_op.add_column(sa.Column('environmental_impact', sa.Text(), nullable=True))
+        batch_op.add_column(sa.Column('recycling_tips', sa.Text(), nullable=True))
+
+    for column, source in (
+        ('disposal_method', 'disposal_method'),
+        ('environmental_impact', 'environmental_impact'),
+        ('recycling_tips', 'sorting_tips'),
+    ):
+        op.execute(
+            f"UPDATE waste_scans SET {column} = ("
+            f"SELECT {source} FROM waste_categories WHERE waste_categories.id = waste_scans.category_id)"
+        )
+
+    with op.batch_alter_table('waste_scans') as batch_op:
+        batch_op.drop_constraint('fk_waste_scans_category_id', type_='foreignkey')
+        batch_op.drop_column('category_version')
+        batch_op.drop_column('category_id')
+
+    with op.batch_alter_table('waste_categories') as batch_op:
+        batch_op.drop_column('content_version')
@@ -0,0 +1,32 @@
+"""Client-side idempotency ids for bulk scan ingestion
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('waste_scans') as batch_op:
+        batch_op.add_column(sa.Column('client_scan_id', sa.String(length=64), nullable=True))
+    op.create_index(
+        'ux_waste_scans_user_client_scan_id', 'waste_scans', ['user_id', 'client_scan_id'], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ux_waste_scans_user_client_scan_id', table_name='waste_scans')
+    with op.batch_alter_table('waste_scans') as batch_op:
+        batch_op.drop_column('client_scan_id')
@@ -0,0 +1,34 @@
+"""Monthly scan rollups for archived waste_scans
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 15:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'waste_scan_monthly_rollups',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('month', sa.String(length=7), primary_key=True),
+        sa.Column('detected_category', sa.String(length=100), primary_key=True),
+        sa.Column('scan_count', sa.Integer(), nullable=False),
+        sa.Column('confirmed_count', sa.Integer(), nullable=False),
+        sa.Column('corrected_count', sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('waste_scan_monthly_rollups')
@@ -0,0 +1,49 @@
+"""Daily per-user scan rollups
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 18:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0008'
+down_revision: Union[str, None] = '0007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'waste_scan_daily_rollups',
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), primary_key=True),
+        sa.Column('day', sa.Date(), primary_key=True),
+        sa.Column('detected_category', sa.String(length=100), primary_key=True),
+        sa.Column('scan_count', sa.Integer(), nullable=False),
+        sa.Column('feedback_count', sa.Integer(), nullable=False),
+        sa.Column('confirmed_count', sa.Integer(), nullable=False),
+        sa.Column('corrected_count', sa.Integer(), nullable=False),
+    )
+    # Backfill scans stored on the primary; shards are rebuilt with
+    # `python manage.py rebuild-rollups`
+    op.execute(
+        """
+        INSERT INTO waste_scan_daily_rollups
+            (user_id, day, detected_category, scan_count, feedback_count, confirmed_count, corrected_count)
+        SELECT user_id, DATE(scanned_at), detected_category, COUNT(*),
+               SUM(CASE WHEN user_confirmed IS NOT NULL THEN 1 ELSE 0 END),
+               SUM(CASE WHEN user_confirmed THEN 1 ELSE 0 END),
+               SUM(CASE WHEN user_correction IS NOT NULL THEN 1 ELSE 0 END)
+        FROM waste_scans
+        GROUP BY user_id, DATE(scanned_at), detected_category
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('waste_scan_daily_rollups')
@@ -0,0 +1,46 @@
+"""Eco point ledger for leaderboards
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19 19:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0009'
+down_revision: Union[str, None] = '0008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'eco_point_events',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('points', sa.Integer(), nullable=False),
+        sa.Column('reason', sa.String(length=50), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index('ix_eco_point_events_user_id', 'eco_point_events', ['user_id'])
+    op.create_index('ix_eco_point_events_created_at', 'eco_point_events', ['created_at'])
+    # Points awarded before the ledger count as earned when the account was created
+    op.execute(
+        """
+        INSERT INTO eco_point_events (user_id, points, reason, created_at)
+        SELECT id, eco_points, 'opening_balance', COALESCE(created_at, CURRENT_TIMESTAMP)
+        FROM users
+        WHERE eco_points > 0
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_eco_point_events_created_at', table_name='eco_point_events')
+    op.drop_index('ix_eco_point_events_user_id', table_name='eco_point_events')
+    op.drop_table('eco_point_events')
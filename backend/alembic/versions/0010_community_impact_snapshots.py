@@ -0,0 +1,40 @@
+"""Community impact snapshots
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 20:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0010'
+down_revision: Union[str, None] = '0009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Filled by the community_impact scheduled job
+    op.create_table(
+        'community_impact_snapshots',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('region', sa.String(length=255), nullable=True),
+        sa.Column('computed_at', sa.DateTime(), nullable=False),
+        sa.Column('users', sa.Integer(), nullable=False),
+        sa.Column('scan_count', sa.Integer(), nullable=False),
+        sa.Column('plastic_items_recycled', sa.Integer(), nullable=False),
+        sa.Column('trees_saved', sa.Float(), nullable=False),
+        sa.Column('water_saved_liters', sa.Float(), nullable=False),
+        sa.Column('co2_reduced_kg', sa.Float(), nullable=False),
+        sa.Column('category_counts', sa.JSON(), nullable=False),
+        sa.Column('daily_trends', sa.JSON(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('community_impact_snapshots')
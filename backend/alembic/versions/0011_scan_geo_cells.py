@@ -0,0 +1,39 @@
+"""Scan geohashes and per-cell counts for heatmaps
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 21:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0011'
+down_revision: Union[str, None] = '0010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('waste_scans') as batch_op:
+        batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+    op.create_index('ix_waste_scans_geohash', 'waste_scans', ['geohash'])
+    # Existing scans are geohashed and counted by `python manage.py rebuild-geo-cells`
+    op.create_table(
+        'scan_geo_cells',
+        sa.Column('precision', sa.Integer(), primary_key=True),
+        sa.Column('geohash', sa.String(length=12), primary_key=True),
+        sa.Column('detected_category', sa.String(length=100), primary_key=True),
+        sa.Column('scan_count', sa.Integer(), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('scan_geo_cells')
+    op.drop_index('ix_waste_scans_geohash', table_name='waste_scans')
+    with op.batch_alter_table('waste_scans') as batch_op:
+        batch_op.drop_column('geohash')
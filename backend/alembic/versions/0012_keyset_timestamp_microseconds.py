@@ -0,0 +1,37 @@
+"""Store keyset timestamps with microseconds on SQLite
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19 23:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0012'
+down_revision: Union[str, None] = '0011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Columns keyset pages sort on; server_default=func.now() wrote them as
+# "YYYY-MM-DD HH:MM:SS", which sorts before the ORM's ".ffffff" form
+KEYSET_TIMESTAMPS = (
+    ('waste_scans', 'scanned_at'),
+    ('orders', 'created_at'),
+    ('diy_projects', 'created_at'),
+)
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for table, column in KEYSET_TIMESTAMPS:
+        op.execute(f"UPDATE {table} SET {column} = {column} || '.000000' WHERE length({column}) = 19")
+
+
+def downgrade() -> None:
+    # Both forms read back as the same datetime
+    pass
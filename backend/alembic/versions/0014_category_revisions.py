@@ -0,0 +1,44 @@
+"""Keep superseded category guidance for scans shown an older content version
+
+Revision ID: 0014
+Revises: 0013
+Create Date: 2026-10-21 09:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0014'
+down_revision: Union[str, None] = '0013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Earlier edits overwrote their text, so history starts with the current versions
+    op.create_table(
+        'waste_category_revisions',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('category_id', sa.Integer(), sa.ForeignKey('waste_categories.id'), nullable=False),
+        sa.Column('content_version', sa.Integer(), nullable=False),
+        sa.Column('is_recyclable', sa.Boolean(), nullable=True),
+        sa.Column('disposal_method', sa.String(length=255), nullable=True),
+        sa.Column('environmental_impact', sa.Text(), nullable=True),
+        sa.Column('sorting_tips', sa.Text(), nullable=True),
+        sa.Column('preparation_steps', sa.Text(), nullable=True),
+        sa.Column('color_code', sa.String(length=7), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+    )
+    op.create_index(
+        'ux_waste_category_revisions_category_version', 'waste_category_revisions',
+        ['category_id', 'content_version'], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ux_waste_category_revisions_category_version', table_name='waste_category_revisions')
+    op.drop_table('waste_category_revisions')
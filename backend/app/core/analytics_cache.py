@@ -0,0 +1,150 @@
+"""
+Per-user cache of computed analytics responses
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.user import User
+from app.models.waste import WasteScan
+
+CHANGED_ANALYTICS_USERS_KEY = "changed_analytics_user_ids"
+
+CacheKey = Tuple[str, int, Hashable]  # (route, user id, parameters)
+
+class ResponseCache:
+    """TTL + LRU cache of responses keyed by route, user id and parameters
+
+    A user's entries are dropped when a session commits changes to their
+    scans or account (see the hooks below); the TTL bounds how long other
+    worker processes keep serving a response computed before such a change.
+    Responses computed on a read replica pass the time the replica had
+    replicated up to, and are not stored if the user's data changed after
+    it: a lagging replica would refill the cache with data from before the
+    invalidating commit.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Any]]" = OrderedDict()
+        self._by_user: Dict[int, set] = {}
+        # Recent invalidations as (monotonic, wall clock) times, oldest first, so
+        # slow computations and lagging replicas can't store stale results
+        self._invalidated: "OrderedDict[int, Tuple[float, float]]" = OrderedDict()
+        # Replica reads may be REPLICA_MAX_LAG_SECONDS old when checked, plus a check interval
+        self._mark_seconds = ttl_seconds + settings.REPLICA_MAX_LAG_SECONDS + settings.REPLICA_CHECK_SECONDS
+        self._routes: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, route: str, user_id: int, params: Hashable = ()) -> Tuple[Optional[Any], float]:
+        """Cached response or None, plus the lookup time to pass to put()"""
+        key = (route, user_id, params)
+        now = time.monotonic()
+        with self._lock:
+            counts = self._routes.setdefault(route, {"hits": 0, "misses": 0})
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    self._remove(key)
+                counts["misses"] += 1
+                return None, now
+            self._entries.move_to_end(key)
+            counts["hits"] += 1
+            return entry[1], now
+
+    def put(self, route: str, user_id: int, params: Hashable, value: Any, looked_up_at: float,
+            as_of: Optional[float] = None) -> Any:
+        """Store a response computed after get() returned None; returns it
+
+        `as_of` is the wall clock time a read replica had replicated up to
+        (see REPLICA_AS_OF_KEY), or None for responses read from the primary.
+        """
+        key = (route, user_id, params)
+        with self._lock:
+            invalidated_at, invalidated_wall = self._invalidated.get(user_id, (-1.0, -1.0))
+            if invalidated_at >= looked_up_at:
+                return value  # The user's data changed while this was computed
+            if as_of is not None and invalidated_wall >= as_of:
+                return value  # The replica has not caught up with the change yet
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            self._by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return value
+
+    def _remove(self, key: CacheKey):
+        self._entries.pop(key, None)
+        keys = self._by_user.get(key[1])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[key[1]]
+
+    def invalidate(self, user_id: int):
+        now = time.monotonic()
+        with self._lock:
+            for key in self._by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+            self._invalidated.pop(user_id, None)
+            self._invalidated[user_id] = (now, time.time())
+            # No request runs longer than the TTL nor reads a replica further behind, so older marks are no longer needed
+            while self._invalidated and next(iter(self._invalidated.values()))[0] < now - self._mark_seconds:
+                self._invalidated.popitem(last=False)
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            routes = {
+                route: {
+                    **counts,
+                    "hit_rate": round(counts["hits"] / max(counts["hits"] + counts["misses"], 1), 3)
+                }
+                for route, counts in self._routes.items()
+            }
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "users": len(self._by_user),
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "routes": routes
+            }
+
+# Global analytics response cache instance
+analytics_cache = ResponseCache(settings.ANALYTICS_CACHE_SIZE, settings.ANALYTICS_CACHE_TTL_SECONDS)
+
+# Invalidation: remember users whose scans or account a flush changed, drop them once committed
+@event.listens_for(Session, "after_flush")
+def _collect_changed_analytics_users(session, flush_context):
+    changed = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, WasteScan):
+            changed.add(obj.user_id)
+        elif isinstance(obj, User) and obj.id is not None:
+            changed.add(obj.id)
+    if changed:
+        session.info.setdefault(CHANGED_ANALYTICS_USERS_KEY, set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_analytics_users(session):
+    for user_id in session.info.pop(CHANGED_ANALYTICS_USERS_KEY, ()):
+        analytics_cache.invalidate(user_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_changed_analytics_users(session, previous_transaction):
+    session.info.pop(CHANGED_ANALYTICS_USERS_KEY, None)
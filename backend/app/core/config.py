@@ -18,9 +18,33 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Revoked token families: in-memory filter size and cross-worker sync interval
+    REVOKED_TOKEN_FILTER_CAPACITY: int = 100000
+    REVOKED_TOKEN_FILTER_ERROR_RATE: float = 0.001
+    TOKEN_REVOCATION_SYNC_SECONDS: float = float(os.getenv("TOKEN_REVOCATION_SYNC_SECONDS", "5"))
+    # Authenticated user snapshots cached per process
+    USER_CACHE_TTL_SECONDS: float = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+    USER_CACHE_SIZE: int = 10000
+    
+    # Analytics responses cached per user until their scans change (TTL bounds other workers)
+    ANALYTICS_CACHE_TTL_SECONDS: float = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "60"))
+    ANALYTICS_CACHE_SIZE: int = int(os.getenv("ANALYTICS_CACHE_SIZE", "5000"))
+    # bcrypt runs on a bounded pool; sign-ins waiting longer than the timeout get 503
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_QUEUE_TIMEOUT: float = float(os.getenv("PASSWORD_HASH_QUEUE_TIMEOUT", "2"))
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./smart_waste_sorter.db")
+    # Optional override; derived from DATABASE_URL (aiosqlite/asyncpg) when empty
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")
+    # Comma-separated read replica URLs for analytics; empty reads from the primary
+    READ_REPLICA_URLS: str = os.getenv("READ_REPLICA_URLS", "")
+    REPLICA_MAX_LAG_SECONDS: float = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "30"))
+    REPLICA_CHECK_SECONDS: float = 5.0
+    # Comma-separated databases holding scan data, sharded by user id; the
+    # first must be where scans currently live (usually DATABASE_URL)
+    SCAN_SHARD_URLS: str = os.getenv("SCAN_SHARD_URLS", "")
+    SHARD_MAP_REFRESH_SECONDS: float = 30.0
     
     # CORS
     ALLOWED_HOSTS: List[str] = [
@@ -39,6 +63,11 @@ class Settings(BaseSettings):
     # File Upload Settings
     UPLOAD_DIR: str = "./uploads"
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
+    MAX_BULK_SCANS: int = 1000  # records per bulk ingestion request
+    
+    # Scan retention (older months move to Parquet files under ARCHIVE_DIR)
+    ARCHIVE_DIR: str = os.getenv("ARCHIVE_DIR", "./archive")
+    SCAN_RETENTION_DAYS: int = int(os.getenv("SCAN_RETENTION_DAYS", "365"))
     
     # Email Settings (for notifications)
     SMTP_TLS: bool = True
@@ -50,9 +79,37 @@ class Settings(BaseSettings):
     # Redis (for caching and background tasks)
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
     
+    # Heatmap cells with fewer scans are left out so single households can't be located
+    HEATMAP_MIN_CELL_SCANS: int = int(os.getenv("HEATMAP_MIN_CELL_SCANS", "3"))
+    
+    # Background jobs run inside the API processes (one process per interval)
+    SCHEDULER_ENABLED: bool = os.getenv("SCHEDULER_ENABLED", "true").lower() == "true"
+    COMMUNITY_IMPACT_INTERVAL_SECONDS: float = float(os.getenv("COMMUNITY_IMPACT_INTERVAL_SECONDS", "900"))
+    
+    # Leaderboards are recounted from the points ledger this often; "redis" shares them across workers
+    LEADERBOARD_BACKEND: str = os.getenv("LEADERBOARD_BACKEND", "memory")
+    LEADERBOARD_REBUILD_SECONDS: float = float(os.getenv("LEADERBOARD_REBUILD_SECONDS", "300"))
+    
+    # Rate limiting ("<count>/<second|minute|hour|day>"); "redis" shares buckets across workers
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED_FOR", "false").lower() == "true"
+    LOGIN_RATE_LIMIT: str = os.getenv("LOGIN_RATE_LIMIT", "10/minute")
+    REGISTER_RATE_LIMIT: str = os.getenv("REGISTER_RATE_LIMIT", "5/minute")
+    PASSWORD_CHANGE_RATE_LIMIT: str = os.getenv("PASSWORD_CHANGE_RATE_LIMIT", "5/minute")
+    SCAN_RATE_LIMIT: str = os.getenv("SCAN_RATE_LIMIT", "30/minute")
+    BULK_SCAN_RATE_LIMIT: str = os.getenv("BULK_SCAN_RATE_LIMIT", "10/minute")
+    
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
-    
+
+    # Request timing (fraction of requests that record Server-Timing spans)
+    TIMING_SAMPLE_RATE: float = float(os.getenv("TIMING_SAMPLE_RATE", "1.0"))
+
+    # Query diagnostics
+    SLOW_QUERY_MS: float = float(os.getenv("SLOW_QUERY_MS", "200"))
+    N_PLUS_ONE_THRESHOLD: int = 5  # identical statements per request before warning
+
     # External APIs
     WEATHER_API_KEY: str = os.getenv("WEATHER_API_KEY", "")
     MAPS_API_KEY: str = os.getenv("MAPS_API_KEY", "")
@@ -70,6 +127,13 @@ class Settings(BaseSettings):
         "other"
     ]
     
+    # Seconds between checks for category edits made by other workers
+    CATEGORY_REFRESH_SECONDS: float = float(os.getenv("CATEGORY_REFRESH_SECONDS", "30"))
+    
+    # Per-region disposal rule files (*.json), re-read when they change
+    DISPOSAL_RULES_DIR: str = os.getenv("DISPOSAL_RULES_DIR", "./disposal_rules")
+    DISPOSAL_RULES_REFRESH_SECONDS: float = float(os.getenv("DISPOSAL_RULES_REFRESH_SECONDS", "30"))
+    
     # Eco Points System
     POINTS_PER_SCAN: int = 10
     POINTS_PER_CORRECT_SORT: int = 25
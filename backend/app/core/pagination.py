@@ -0,0 +1,95 @@
+"""
+Keyset (cursor) pagination over stable sort keys
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, Response, status
+from sqlalchemy import DateTime, String, and_, bindparam, or_
+from sqlalchemy.types import TypeDecorator
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class CursorDateTime(TypeDecorator):
+    """Bind cursor datetimes in the text form SQLAlchemy stores DateTime in on SQLite
+
+    Every timestamp keyset pages sort on is written with microseconds (see
+    migration 0012), so string comparison orders them like datetimes.
+    """
+
+    impl = DateTime
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "sqlite":
+            return dialect.type_descriptor(String())
+        return dialect.type_descriptor(DateTime(timezone=True))
+
+    def process_bind_param(self, value, dialect):
+        if dialect.name == "sqlite" and value is not None:
+            return value.strftime("%Y-%m-%d %H:%M:%S.%f")
+        return value
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode sort key values as an opaque cursor"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: Optional[str], columns: Sequence) -> Optional[Tuple]:
+    """Decode a cursor into typed sort key values for the given columns"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if not isinstance(payload, list) or len(payload) != len(columns):
+            raise ValueError("cursor does not match sort key")
+        values = []
+        for value, column in zip(payload, columns):
+            if column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            values.append(value)
+        return tuple(values)
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+def keyset_condition(columns: Sequence, values: Sequence, descending: bool = True):
+    """Rows strictly after the cursor position in (columns) order"""
+    values = [
+        bindparam(None, value, type_=CursorDateTime()) if isinstance(value, datetime) else value
+        for value in values
+    ]
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        after = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, after))
+    # Leading range bound keeps the condition sargable so the index seeks to the cursor
+    leading_bound = columns[0] <= values[0] if descending else columns[0] >= values[0]
+    return and_(leading_bound, or_(*clauses))
+
+def apply_keyset(query, columns: Sequence, cursor_values: Optional[Tuple], limit: int, descending: bool = True):
+    """Filter, order and limit a Query or Select for one page (plus a look-ahead row)"""
+    if cursor_values is not None:
+        query = query.filter(keyset_condition(columns, cursor_values, descending))
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+    return query.order_by(*ordering).limit(limit + 1)
+
+def finish_page(rows: List, limit: int, sort_key: Callable[[Any], Sequence]) -> Tuple[List, Optional[str]]:
+    """Trim the look-ahead row and build the cursor for the next page"""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(sort_key(page[-1]))
+
+def set_next_cursor(response: Response, next_cursor: Optional[str]):
+    """Expose the next page cursor to the client"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
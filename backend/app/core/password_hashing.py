@@ -0,0 +1,84 @@
+"""
+Bounded thread pool for bcrypt hashing and verification
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from app.core.timing import LatencyHistogram, timed
+
+class PasswordHasher:
+    """Runs bcrypt off the event loop with a concurrency cap
+
+    At most `workers` hashes run at once; further requests wait up to
+    `queue_timeout` seconds for a slot and are then rejected with 503, so a
+    login burst degrades into fast retries instead of a frozen worker.
+    """
+
+    def __init__(self, context: CryptContext, workers: int, queue_timeout: float):
+        self.context = context
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.rejected = 0
+        self.histograms = {name: LatencyHistogram() for name in ("hash", "verify", "queue_wait")}
+
+    async def _run(self, name: str, func: Callable, *args):
+        if self._slots is None:
+            # Created on first use so it binds to the server's event loop
+            self._slots = asyncio.Semaphore(self.workers)
+
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        waited_from = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent sign-ins, please retry",
+                headers={"Retry-After": str(max(1, round(self.queue_timeout)))}
+            )
+        finally:
+            self.queued -= 1
+        self.histograms["queue_wait"].observe((time.perf_counter() - waited_from) * 1000)
+
+        self.in_flight += 1
+        started = time.perf_counter()
+        try:
+            with timed(f"password_{name}"):
+                return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.histograms[name].observe((time.perf_counter() - started) * 1000)
+            self._slots.release()
+
+    async def hash(self, password: str) -> str:
+        """Generate a password hash on the pool"""
+        return await self._run("hash", self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password against its hash on the pool"""
+        return await self._run("verify", self.context.verify, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queue_timeout_seconds": self.queue_timeout,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "rejected": self.rejected,
+            **{name: histogram.to_dict() for name, histogram in self.histograms.items()}
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,128 @@
+"""
+Per-request SQL query counting, slow query logging and N+1 detection
+"""
+
+import logging
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+_EXPANDED_IN = re.compile(r"\((?:\s*(?:\?|%s|\$\d+|:\w+)\s*,)+\s*(?:\?|%s|\$\d+|:\w+)\s*\)")
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so repeated executions of one query compare equal"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    return _EXPANDED_IN.sub("(?)", shape)
+
+def parameter_shape(parameters) -> str:
+    """Describe bind parameters by type only (never log values)"""
+    def describe(params) -> str:
+        if isinstance(params, dict):
+            return "{" + ", ".join(f"{key}: {type(value).__name__}" for key, value in params.items()) + "}"
+        if isinstance(params, (list, tuple)):
+            return "(" + ", ".join(type(value).__name__ for value in params) + ")"
+        return type(params).__name__
+
+    if isinstance(parameters, list) and parameters and isinstance(parameters[0], (dict, list, tuple)):
+        return f"{len(parameters)} x {describe(parameters[0])}"
+    return describe(parameters)
+
+class QueryStats:
+    """Queries issued and time spent in the database for one unit of work"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, duration_ms: float):
+        shape = statement_shape(statement)
+        with self._lock:
+            self.count += 1
+            self.total_ms += duration_ms
+            self.shapes[shape] = self.shapes.get(shape, 0) + 1
+
+    def n_plus_one_suspects(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Statement shapes repeated at least `threshold` times"""
+        threshold = threshold or settings.N_PLUS_ONE_THRESHOLD
+        return sorted(
+            ((shape, count) for shape, count in self.shapes.items() if count >= threshold),
+            key=lambda item: item[1],
+            reverse=True
+        )
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+_collectors: List[QueryStats] = []
+_collectors_lock = threading.Lock()
+
+def start_query_stats() -> QueryStats:
+    """Start counting queries for the current request"""
+    stats = QueryStats()
+    _current_stats.set(stats)
+    return stats
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get("query_start_times")
+    if not start_times:
+        return
+    duration_ms = (time.perf_counter() - start_times.pop()) * 1000
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, duration_ms)
+    if _collectors:
+        with _collectors_lock:
+            for collector in _collectors:
+                collector.record(statement, duration_ms)
+
+    if duration_ms >= settings.SLOW_QUERY_MS:
+        logger.warning(
+            "Slow query (%.1f ms): %s params=%s",
+            duration_ms, statement_shape(statement), parameter_shape(parameters)
+        )
+
+def report_request(route: str, stats: QueryStats):
+    """Log N+1 suspects for a finished request"""
+    for shape, count in stats.n_plus_one_suspects():
+        logger.warning("Possible N+1 on %s: %d x %s", route, count, shape)
+
+@contextmanager
+def assert_max_queries(max_queries: int):
+    """Fail if the wrapped block issues more than `max_queries` statements
+
+    Counts every statement in the process while active, so it also sees
+    queries issued from a TestClient's worker thread.
+    """
+    stats = QueryStats()
+    with _collectors_lock:
+        _collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        with _collectors_lock:
+            _collectors.remove(stats)
+
+    if stats.count > max_queries:
+        repeated = "\n".join(f"  {count} x {shape}" for shape, count in stats.n_plus_one_suspects(2))
+        raise AssertionError(
+            f"Expected at most {max_queries} queries, got {stats.count}"
+            + (f"\nRepeated statements:\n{repeated}" if repeated else "")
+        )
@@ -0,0 +1,205 @@
+"""
+Token-bucket rate limiting keyed by client IP, user and route
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.security import verify_token
+
+try:
+    import redis.asyncio as aioredis
+    from redis.exceptions import RedisError
+except ImportError:  # Only needed for RATE_LIMIT_BACKEND=redis
+    aioredis = None
+    RedisError = OSError
+
+logger = logging.getLogger(__name__)
+
+PERIOD_SECONDS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+class Rate(NamedTuple):
+    capacity: int
+    per_second: float
+
+def parse_rate(value: str) -> Rate:
+    """Parse "<count>/<second|minute|hour|day>" into a bucket size and refill rate"""
+    count, _, period = value.partition("/")
+    if period not in PERIOD_SECONDS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f"Invalid rate limit '{value}', expected e.g. '10/minute'")
+    return Rate(int(count), int(count) / PERIOD_SECONDS[period])
+
+class MemoryBucketStore:
+    """Token buckets held in this process (LRU-bounded)"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    async def take(self, key: str, rate: Rate) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until a token is available)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rate.capacity, now))
+            tokens = min(rate.capacity, tokens + (now - updated) * rate.per_second)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / rate.per_second
+
+class RedisBucketStore:
+    """Token buckets shared by every worker through Redis
+
+    The bucket update runs as one Lua script using the Redis clock, so
+    workers neither race each other nor depend on their own clocks. If
+    Redis is unreachable requests fall back to a per-process bucket.
+    """
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local per_second = tonumber(ARGV[2])
+    local clock = redis.call("TIME")
+    local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+    local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated")
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * per_second)
+    local allowed = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+        allowed = 1
+    end
+    redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated", tostring(now))
+    redis.call("PEXPIRE", KEYS[1], math.ceil(capacity / per_second * 1000))
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+        self._fallback = MemoryBucketStore()
+        self._available = True
+
+    @classmethod
+    def from_url(cls, url: str) -> "RedisBucketStore":
+        if aioredis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis needs the redis package (pip install redis)")
+        return cls(aioredis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5))
+
+    async def take(self, key: str, rate: Rate) -> Tuple[bool, float]:
+        try:
+            allowed, tokens = await self._script(keys=[self.prefix + key], args=[rate.capacity, rate.per_second])
+        except (RedisError, OSError) as e:
+            if self._available:
+                logger.warning(f"Rate limit store unavailable, limiting per process: {e}")
+                self._available = False
+            return await self._fallback.take(key, rate)
+        if not self._available:
+            logger.info("Rate limit store reachable again")
+            self._available = True
+        tokens = float(tokens)
+        return bool(allowed), 0.0 if allowed else (1 - tokens) / rate.per_second
+
+class RateLimitMetrics:
+    """Allowed/limited counts per rule and per key (LRU-bounded)"""
+
+    def __init__(self, max_keys: int = 10_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._rules: Dict[str, Dict[str, int]] = {}
+        self._keys: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def record(self, rule: str, key: str, allowed: bool):
+        outcome = "allowed" if allowed else "limited"
+        with self._lock:
+            self._rules.setdefault(rule, {"allowed": 0, "limited": 0})[outcome] += 1
+            counts = self._keys.setdefault(key, {"allowed": 0, "limited": 0})
+            counts[outcome] += 1
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_keys:
+                self._keys.popitem(last=False)
+
+    def snapshot(self, top: int = 20) -> dict:
+        with self._lock:
+            limited = sorted(
+                ((key, counts) for key, counts in self._keys.items() if counts["limited"]),
+                key=lambda item: item[1]["limited"], reverse=True
+            )[:top]
+            return {
+                "rules": {rule: dict(counts) for rule, counts in self._rules.items()},
+                "top_limited_keys": [{"key": key, **counts} for key, counts in limited],
+                "tracked_keys": len(self._keys)
+            }
+
+    def reset(self):
+        with self._lock:
+            self._rules.clear()
+            self._keys.clear()
+
+def _create_store():
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisBucketStore.from_url(settings.REDIS_URL)
+    return MemoryBucketStore()
+
+# Global rate limiting state
+rate_limit_store = _create_store()
+rate_limit_metrics = RateLimitMetrics()
+
+def client_ip(request: Request) -> str:
+    """Client address, from X-Forwarded-For only when the proxy is trusted"""
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+def _token_subject(request: Request) -> Optional[str]:
+    """User id from a valid bearer token
+
+    The revocation check may query the database (periodic sync, filter hits),
+    so async callers run this in the threadpool.
+    """
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    payload = verify_token(token, "access")
+    return str(payload["sub"]) if payload and payload.get("sub") is not None else None
+
+def rate_limit(name: str, rate: str, per: str = "ip"):
+    """Dependency allowing `rate` requests per client IP or per user
+
+    With per="user" requests are keyed by the authenticated user id and
+    fall back to the client IP when there is no valid token.
+    """
+    parsed = parse_rate(rate)
+    if per not in ("ip", "user"):
+        raise ValueError("per must be 'ip' or 'user'")
+
+    async def limiter(request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        subject = await run_in_threadpool(_token_subject, request) if per == "user" else None
+        key = f"{name}:user:{subject}" if subject else f"{name}:ip:{client_ip(request)}"
+
+        allowed, retry_after = await rate_limit_store.take(key, parsed)
+        rate_limit_metrics.record(name, key, allowed)
+        if not allowed:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, please slow down",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+
+    return limiter
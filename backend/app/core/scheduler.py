@@ -0,0 +1,122 @@
+"""
+In-process scheduler for periodic background jobs
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+from sqlalchemy import Float, cast, insert
+from sqlalchemy.exc import IntegrityError
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+LEASE_KEY_PREFIX = "job_lease:"
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], object]
+    interval_seconds: float
+    runs: int = 0
+    failures: int = 0
+    skipped: int = 0
+    last_started_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    last_error: Optional[str] = None
+
+def acquire_lease(name: str, seconds: float) -> bool:
+    """Claim a job for `seconds` across every process sharing the primary database"""
+    from app.models.system import AppMeta
+
+    meta = AppMeta.__table__
+    key, now = LEASE_KEY_PREFIX + name, time.time()
+    with SessionLocal() as db:
+        # Only an expired lease is taken over; the UPDATE is atomic per row
+        taken = db.execute(
+            meta.update().where(meta.c.key == key, cast(meta.c.value, Float) < now).values(value=repr(now + seconds))
+        ).rowcount
+        if not taken:
+            try:
+                db.execute(insert(meta).values(key=key, value=repr(now + seconds)))
+            except IntegrityError:
+                db.rollback()
+                return False  # Held by another process
+        db.commit()
+        return True
+
+class JobScheduler:
+    """Runs registered jobs every interval on the event loop
+
+    Jobs are synchronous and run in a worker thread. Each run first takes a
+    lease in app_meta, so with several server processes a job still runs
+    about once per interval instead of once per process.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def add_job(self, name: str, func: Callable[[], object], interval_seconds: float):
+        self.jobs[name] = Job(name, func, interval_seconds)
+
+    async def run_job(self, job: Job):
+        # Slightly shorter than the interval so the holder can renew on its next tick
+        if not await asyncio.to_thread(acquire_lease, job.name, job.interval_seconds * 0.9):
+            job.skipped += 1
+            return
+        job.last_started_at = datetime.utcnow()
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(job.func)
+            job.runs += 1
+            job.last_error = None
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            logger.error(f"Scheduled job {job.name} failed: {e}")
+        finally:
+            job.last_duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    async def _loop(self, job: Job):
+        while True:
+            try:
+                await self.run_job(job)
+            except Exception as e:
+                logger.error(f"Could not schedule job {job.name}: {e}")
+            await asyncio.sleep(job.interval_seconds)
+
+    def start(self):
+        """Start every job on the running event loop, each running once right away"""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._loop(job)) for job in self.jobs.values()]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def status(self) -> List[Dict]:
+        return [
+            {
+                "name": job.name,
+                "interval_seconds": job.interval_seconds,
+                "running": bool(self._tasks),
+                "runs": job.runs,
+                "failures": job.failures,
+                "skipped": job.skipped,
+                "last_started_at": job.last_started_at.isoformat() if job.last_started_at else None,
+                "last_duration_ms": job.last_duration_ms,
+                "last_error": job.last_error
+            }
+            for job in self.jobs.values()
+        ]
+
+# Global scheduler instance
+scheduler = JobScheduler()
@@ -8,16 +8,23 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.core.config import settings
+from app.core.password_hashing import PasswordHasher
+from app.core.token_families import revoked_families
+from app.core.user_cache import UserSnapshot, user_cache
 from app.database import get_db
 from app.models.user import User
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(pwd_context, settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_QUEUE_TIMEOUT)
 
 # JWT token security
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
@@ -53,20 +60,23 @@ def verify_token(token: str, token_type: str = "access") -> Optional[dict]:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         if payload.get("type") != token_type:
             return None
+        # Logged-out or replayed token families (in-memory filter, no query on the hot path)
+        if payload.get("fid") and revoked_families.is_revoked(payload["fid"]):
+            return None
         return payload
     except JWTError:
         return None
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
-    credentials_exception = HTTPException(
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def _token_user_id(credentials: HTTPAuthorizationCredentials) -> int:
+    """User id from a valid access token"""
+    credentials_exception = _credentials_exception()
     
     try:
         token = credentials.credentials
@@ -74,20 +84,51 @@ def get_current_user(
         if payload is None:
             raise credentials_exception
         
-        user_id: int = payload.get("sub")
+        user_id = payload.get("sub")
         if user_id is None:
             raise credentials_exception
+        return int(user_id)
             
-    except JWTError:
+    except (JWTError, ValueError):
         raise credentials_exception
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> UserSnapshot:
+    """Get a read-only snapshot of the current user, cached per process"""
+    user_id = _token_user_id(credentials)
+    
+    snapshot = user_cache.get(user_id)
+    if snapshot is not None:
+        return snapshot
     
     user = db.query(User).filter(User.id == user_id).first()
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
+    
+    return user_cache.put(user)
+
+def get_optional_user_id(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)
+) -> Optional[int]:
+    """User id from the access token, or None for anonymous requests"""
+    return _token_user_id(credentials) if credentials is not None else None
+
+def get_current_user_for_update(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> User:
+    """Get the current user's live row, for endpoints that modify it"""
+    user_id = _token_user_id(credentials)
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is None:
+        raise _credentials_exception()
     
     return user
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_user(current_user: UserSnapshot = Depends(get_current_user)) -> UserSnapshot:
     """Get current active user"""
     if not current_user.is_active:
         raise HTTPException(
@@ -96,7 +137,7 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
         )
     return current_user
 
-def get_current_verified_user(current_user: User = Depends(get_current_active_user)) -> User:
+def get_current_verified_user(current_user: UserSnapshot = Depends(get_current_active_user)) -> UserSnapshot:
     """Get current verified user"""
     if not current_user.is_verified:
         raise HTTPException(
@@ -105,25 +146,25 @@ def get_current_verified_user(current_user: User = Depends(get_current_active_us
         )
     return current_user
 
-def authenticate_user(db: Session, email: str, password: str) -> Union[User, bool]:
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Union[User, bool]:
     """Authenticate user with email and password"""
-    user = db.query(User).filter(User.email == email).first()
+    user = (await db.execute(select(User).where(User.email == email))).scalar()
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await password_hasher.verify(password, user.hashed_password):
         return False
     return user
 
-def check_permissions(user: User, required_permission: str) -> bool:
+def check_permissions(user: Union[User, UserSnapshot], required_permission: str) -> bool:
     """Check if user has required permission"""
     # Basic permission system - can be extended
-    if required_permission == "admin" and not user.is_premium:
+    if required_permission == "admin" and not user.is_admin:
         return False
     return True
 
 def require_permission(permission: str):
     """Decorator to require specific permission"""
-    def permission_checker(current_user: User = Depends(get_current_active_user)):
+    def permission_checker(current_user: UserSnapshot = Depends(get_current_active_user)) -> UserSnapshot:
         if not check_permissions(current_user, permission):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
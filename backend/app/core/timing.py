@@ -0,0 +1,146 @@
+"""
+Per-request timing instrumentation with Server-Timing headers
+"""
+
+import random
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+
+# Histogram bucket upper bounds in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, duration_ms: float):
+        """Record a single duration"""
+        self.counts[bisect_left(self.buckets, duration_ms)] += 1
+        self.count += 1
+        self.total_ms += duration_ms
+        if duration_ms > self.max_ms:
+            self.max_ms = duration_ms
+
+    def percentile(self, q: float) -> float:
+        """Approximate percentile as the upper bound of the matching bucket"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return float(self.buckets[i]) if i < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {
+                **{f"le_{bound}": count for bound, count in zip(self.buckets, self.counts)},
+                "le_inf": self.counts[-1]
+            }
+        }
+
+class RequestTimer:
+    """Named spans recorded during a single request"""
+
+    def __init__(self):
+        self.spans: List[Tuple[str, float]] = []
+
+    def add(self, name: str, duration_ms: float):
+        self.spans.append((name, duration_ms))
+
+    def header_value(self, total_ms: Optional[float] = None) -> str:
+        """Format spans as a Server-Timing header value"""
+        entries = [f"{name};dur={duration_ms:.2f}" for name, duration_ms in self.spans]
+        if total_ms is not None:
+            entries.append(f"total;dur={total_ms:.2f}")
+        return ", ".join(entries)
+
+_current_timer: ContextVar[Optional[RequestTimer]] = ContextVar("request_timer", default=None)
+
+def start_request_timer() -> Optional[RequestTimer]:
+    """Start timing the current request if it is sampled"""
+    if settings.TIMING_SAMPLE_RATE <= 0:
+        return None
+    if settings.TIMING_SAMPLE_RATE < 1 and random.random() >= settings.TIMING_SAMPLE_RATE:
+        return None
+    timer = RequestTimer()
+    _current_timer.set(timer)
+    return timer
+
+def record_span(name: str, duration_ms: float):
+    """Record an externally measured span on the current request"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(name, duration_ms)
+
+@contextmanager
+def timed(name: str):
+    """Time a block of code as a named span of the current request"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, (time.perf_counter() - start) * 1000)
+
+class TimingRegistry:
+    """Per-route, per-stage latency histograms aggregated across requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+
+    def observe(self, route: str, stage: str, duration_ms: float):
+        key = (route, stage)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = LatencyHistogram()
+            histogram.observe(duration_ms)
+
+    def record_request(self, route: str, timer: RequestTimer, total_ms: float):
+        """Fold a finished request's spans into the histograms"""
+        for stage, duration_ms in timer.spans:
+            self.observe(route, stage, duration_ms)
+        self.observe(route, "total", total_ms)
+
+    def snapshot(self, route: Optional[str] = None) -> dict:
+        with self._lock:
+            items = [
+                (key, histogram.to_dict())
+                for key, histogram in self._histograms.items()
+                if route is None or key[0] == route
+            ]
+        result: Dict[str, Dict[str, dict]] = {}
+        for (route_path, stage), data in sorted(items):
+            result.setdefault(route_path, {})[stage] = data
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+# Global instance
+timing_registry = TimingRegistry()
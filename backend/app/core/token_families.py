@@ -0,0 +1,185 @@
+"""
+Refresh token families with rotation, reuse detection and revocation
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.user import RefreshToken, RevokedTokenFamily
+
+logger = logging.getLogger(__name__)
+
+# Revocations written by other workers are re-read with this much overlap
+SYNC_OVERLAP = timedelta(seconds=60)
+CONFIRMED_CACHE_SIZE = 10_000
+
+class TokenReuseError(Exception):
+    """A rotated refresh token was presented again; its family is now revoked"""
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (no false negatives)"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        step = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * step) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class RevocationFilter:
+    """In-memory Bloom filter of revoked token family ids
+
+    Rebuilt from revoked_token_families at startup and topped up from the
+    table every TOKEN_REVOCATION_SYNC_SECONDS, so revocations made by other
+    workers apply within that interval. Filter hits are confirmed against
+    the table, so a false positive never rejects a valid token.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filter = BloomFilter(capacity, error_rate)
+        self._confirmed: set = set()
+        self._synced_through: Optional[datetime] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def rebuild(self, db: Session):
+        """Reload every unexpired revocation and prune expired token rows (commits)"""
+        now = datetime.utcnow()
+        db.execute(RefreshToken.__table__.delete().where(RefreshToken.expires_at < now))
+        db.execute(RevokedTokenFamily.__table__.delete().where(RevokedTokenFamily.expires_at < now))
+        db.commit()
+
+        family_ids = db.scalars(select(RevokedTokenFamily.family_id)).all()
+        bloom = BloomFilter(max(self.capacity, 2 * len(family_ids)), self.error_rate)
+        for family_id in family_ids:
+            bloom.add(family_id)
+        with self._lock:
+            self._filter = bloom
+            self._confirmed = set()
+            self._synced_through = now
+            self._checked_at = time.monotonic()
+        logger.info(f"Loaded {len(family_ids)} revoked token families")
+
+    def add(self, family_id: str):
+        with self._lock:
+            self._filter.add(family_id)
+
+    def sync_if_stale(self):
+        """Add revocations recorded by other workers; checks at most once per interval"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < settings.TOKEN_REVOCATION_SYNC_SECONDS:
+                return
+            self._checked_at = now
+            since = (self._synced_through or datetime.min + SYNC_OVERLAP) - SYNC_OVERLAP
+
+        synced_through = datetime.utcnow()
+        with SessionLocal() as db:
+            if self._filter.count > self._filter.capacity:
+                self.rebuild(db)
+                return
+            family_ids = db.scalars(
+                select(RevokedTokenFamily.family_id).where(RevokedTokenFamily.revoked_at >= since)
+            ).all()
+        with self._lock:
+            for family_id in family_ids:
+                if family_id not in self._filter:
+                    self._filter.add(family_id)
+            self._synced_through = synced_through
+
+    def is_revoked(self, family_id: str) -> bool:
+        self.sync_if_stale()
+        if family_id not in self._filter:
+            return False
+        if family_id in self._confirmed:
+            return True
+        # Possible false positive: confirm with a primary key lookup
+        with SessionLocal() as db:
+            revoked = db.get(RevokedTokenFamily, family_id) is not None
+        if revoked:
+            with self._lock:
+                if len(self._confirmed) >= CONFIRMED_CACHE_SIZE:
+                    self._confirmed.clear()
+                self._confirmed.add(family_id)
+        return revoked
+
+# Global revocation filter instance
+revoked_families = RevocationFilter(settings.REVOKED_TOKEN_FILTER_CAPACITY, settings.REVOKED_TOKEN_FILTER_ERROR_RATE)
+
+def _new_refresh_token(db: Session, family_id: str, user_id: int) -> str:
+    now = datetime.utcnow()
+    jti = str(uuid.uuid4())
+    db.add(RefreshToken(
+        jti=jti, family_id=family_id, user_id=user_id,
+        issued_at=now, expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    ))
+    return jti
+
+def start_family(db: Session, user_id: int) -> Tuple[str, str]:
+    """Record the first refresh token of a new login; returns (family_id, jti) (caller commits)"""
+    family_id = str(uuid.uuid4())
+    return family_id, _new_refresh_token(db, family_id, user_id)
+
+def rotate_refresh_token(db: Session, jti: str, user_id: int) -> Optional[Tuple[str, str]]:
+    """Mark a refresh token used and issue the next one in its family (commits)
+
+    Returns None for unknown tokens and raises TokenReuseError if the token
+    was already rotated, revoking the whole family: either the client or
+    whoever copied its token is replaying it.
+    """
+    token = db.get(RefreshToken, jti)
+    if token is None or token.user_id != user_id:
+        return None
+
+    # Conditional update so two concurrent refreshes cannot both succeed
+    rotated = db.execute(
+        update(RefreshToken).where(
+            RefreshToken.jti == jti, RefreshToken.used_at.is_(None)
+        ).values(used_at=datetime.utcnow())
+    ).rowcount
+    if not rotated:
+        db.rollback()
+        revoke_family(db, token.family_id, user_id, "reuse")
+        db.commit()
+        logger.warning(f"Refresh token reuse for user {user_id}; revoked family {token.family_id}")
+        raise TokenReuseError(token.family_id)
+
+    next_jti = _new_refresh_token(db, token.family_id, user_id)
+    db.commit()
+    return token.family_id, next_jti
+
+def revoke_family(db: Session, family_id: str, user_id: int, reason: str):
+    """Revoke every access and refresh token of a family (caller commits)"""
+    if db.get(RevokedTokenFamily, family_id) is None:
+        now = datetime.utcnow()
+        db.add(RevokedTokenFamily(
+            family_id=family_id, user_id=user_id, reason=reason, revoked_at=now,
+            # No token of the family outlives a refresh token issued now
+            expires_at=now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+        ))
+    revoked_families.add(family_id)
@@ -0,0 +1,111 @@
+"""
+Per-process cache of authenticated user snapshots
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.user import User
+
+CHANGED_USERS_KEY = "changed_user_ids"
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Read-only copy of a users row, without the password hash"""
+    id: int
+    email: str
+    username: str
+    full_name: Optional[str]
+    avatar_url: Optional[str]
+    bio: Optional[str]
+    location: Optional[str]
+    phone: Optional[str]
+    is_active: bool
+    is_verified: bool
+    is_premium: bool
+    is_admin: bool
+    eco_points: int
+    total_scans: int
+    correct_sorts: int
+    eco_level: str
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    last_login: Optional[datetime]
+
+    eco_level_progress = User.eco_level_progress
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(**{field.name: getattr(user, field.name) for field in fields(cls)})
+
+class UserCache:
+    """TTL + LRU cache of UserSnapshot keyed by user id
+
+    Entries are dropped when a session commits changes to the user (see
+    the flush/commit hooks below); the TTL bounds how long other worker
+    processes can serve a snapshot from before such a change.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[float, UserSnapshot]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: int) -> Optional[UserSnapshot]:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, user: User) -> UserSnapshot:
+        snapshot = UserSnapshot.from_user(user)
+        with self._lock:
+            self._entries[snapshot.id] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._entries.move_to_end(snapshot.id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return snapshot
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+# Global user cache instance
+user_cache = UserCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+# Invalidation: remember users changed by a flush, drop them once committed
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = {obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)}
+    if changed:
+        session.info.setdefault(CHANGED_USERS_KEY, set()).update(changed)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop(CHANGED_USERS_KEY, ()):
+        user_cache.invalidate(user_id)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_changed_users(session, previous_transaction):
+    session.info.pop(CHANGED_USERS_KEY, None)
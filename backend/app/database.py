@@ -2,23 +2,385 @@
 Database configuration and session management
 """
 
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import (
+    BigInteger, Column, Index, Integer, MetaData, String, Table, cast, create_engine, func, insert, inspect, select
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
+# Alembic configuration lives next to main.py
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+# Async drivers for the sync URL schemes we support
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+def to_async_url(database_url: str) -> str:
+    """Map a sync database URL onto its async driver"""
+    scheme, separator, rest = database_url.partition("://")
+    if not separator:
+        return database_url
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
 # Create database engine
 engine = create_engine(
     settings.DATABASE_URL,
     connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
 )
 
-# Create session factory
+# Create async database engine (aiosqlite locally, asyncpg for Postgres)
+async_engine = create_async_engine(settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL))
+
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Heartbeat row written to the primary and read back from each replica
+REPLICA_HEARTBEAT_KEY = "replica_heartbeat"
+# Session.info key: primary clock time the replica a read session uses had replicated up to
+REPLICA_AS_OF_KEY = "replica_as_of"
+
+class ReadReplicas:
+    """Async read replicas with heartbeat lag tracking and primary fallback
+    
+    The primary writes the current time into app_meta every
+    REPLICA_CHECK_SECONDS; a replica's lag is how old that value is when
+    read back from it. Replicas that are unreachable or further behind than
+    REPLICA_MAX_LAG_SECONDS are skipped until they catch up, and reads go
+    to the primary when none are usable. Replica sessions carry the last
+    heartbeat seen on their replica in info[REPLICA_AS_OF_KEY], a lower
+    bound on how current their data is.
+    """
+    
+    def __init__(self, urls: List[str]):
+        self.urls = urls
+        self.engines = [create_async_engine(to_async_url(url)) for url in urls]
+        self.session_factories = [
+            async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+            for engine in self.engines
+        ]
+        self.lag_seconds: List[Optional[float]] = [None] * len(urls)
+        self.replicated_at: List[Optional[float]] = [None] * len(urls)
+        self._in_use: List[Optional[bool]] = [None] * len(urls)
+        self._round_robin = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+    
+    def usable(self) -> List[int]:
+        """Indexes of replicas within the staleness bound"""
+        return [
+            index for index, lag in enumerate(self.lag_seconds)
+            if lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+        ]
+    
+    def session(self) -> AsyncSession:
+        """Open a read session on the next usable replica, or on the primary"""
+        usable = self.usable()
+        if not usable:
+            return AsyncSessionLocal()
+        index = usable[next(self._round_robin) % len(usable)]
+        session = self.session_factories[index]()
+        session.info[REPLICA_AS_OF_KEY] = self.replicated_at[index]
+        return session
+    
+    async def write_heartbeat(self):
+        from app.models.system import AppMeta
+        
+        async with AsyncSessionLocal() as db:
+            await db.merge(AppMeta(key=REPLICA_HEARTBEAT_KEY, value=repr(time.time())))
+            await db.commit()
+    
+    async def check_lag(self):
+        """Measure every replica's replication lag from the heartbeat row"""
+        from app.models.system import AppMeta
+        
+        for index, engine in enumerate(self.engines):
+            error = None
+            try:
+                async with engine.connect() as connection:
+                    heartbeat = (await connection.execute(
+                        select(AppMeta.value).where(AppMeta.key == REPLICA_HEARTBEAT_KEY)
+                    )).scalar()
+                replicated_at = float(heartbeat) if heartbeat else None
+            except Exception as e:
+                error = e
+                replicated_at = None
+            lag = time.time() - replicated_at if replicated_at is not None else None
+            self.replicated_at[index] = replicated_at
+            self.lag_seconds[index] = lag
+            
+            # Log only when a replica starts or stops serving reads
+            in_use = lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS
+            if in_use != self._in_use[index]:
+                if in_use:
+                    logger.info(f"Read replica {index} serving reads ({lag:.1f}s behind)")
+                else:
+                    reason = error or ("no heartbeat" if lag is None else f"{lag:.1f}s behind")
+                    logger.warning(f"Read replica {index} not used, reading from primary: {reason}")
+                self._in_use[index] = in_use
+    
+    async def _monitor(self):
+        while True:
+            try:
+                await self.write_heartbeat()
+                await self.check_lag()
+            except Exception as e:
+                logger.error(f"Replica heartbeat failed: {e}")
+            await asyncio.sleep(settings.REPLICA_CHECK_SECONDS)
+    
+    def start(self):
+        """Begin heartbeating and lag checks on the running event loop"""
+        if self.engines and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._monitor())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for engine in self.engines:
+            await engine.dispose()
+    
+    def status(self) -> List[Dict]:
+        usable = self.usable()
+        return [
+            {
+                "replica": index,
+                "lag_seconds": round(lag, 3) if lag is not None else None,
+                "in_use": index in usable
+            }
+            for index, lag in enumerate(self.lag_seconds)
+        ]
+
+read_replicas = ReadReplicas([url.strip() for url in settings.READ_REPLICA_URLS.split(",") if url.strip()])
 
 # Create base class for models
 Base = declarative_base()
 
+# Scan tables live on the shard that owns the user's id bucket; users,
+# products, categories and everything else stay on the primary
+SHARDED_TABLES = ("waste_scans", "waste_scan_monthly_rollups", "waste_scan_daily_rollups")
+SHARD_BUCKETS = 1024
+SHARD_MAP_VERSION_KEY = "scan_shard_map_version"
+SCAN_ID_NEXT_KEY = "scan_id_next"
+SCAN_ID_BLOCK_SIZE = 100
+
+# Bucket -> shard assignments, kept on the primary
+scan_shard_buckets = Table(
+    "scan_shard_buckets", Base.metadata,
+    Column("bucket", Integer, primary_key=True),
+    Column("shard", Integer, nullable=False),
+)
+
+def _connect_args(url: str) -> dict:
+    return {"check_same_thread": False} if "sqlite" in url else {}
+
+def shard_schema() -> MetaData:
+    """Sharded tables without foreign keys to tables that only exist on the primary"""
+    metadata = MetaData()
+    for name in SHARDED_TABLES:
+        table = Base.metadata.tables[name]
+        Table(
+            name, metadata,
+            *[
+                Column(
+                    column.name, column.type,
+                    primary_key=column.primary_key,
+                    nullable=column.nullable,
+                    autoincrement=column.autoincrement,
+                    server_default=column.server_default.arg if column.server_default is not None else None
+                )
+                for column in table.columns
+            ],
+            *[
+                Index(index.name, *[column.name for column in index.columns], unique=index.unique)
+                for index in table.indexes
+            ]
+        )
+    return metadata
+
+class ScanShards:
+    """Routes scan tables to per-user shards listed in SCAN_SHARD_URLS
+    
+    user_id maps to one of SHARD_BUCKETS buckets and each bucket to a shard,
+    through a map stored on the primary (scan_shard_buckets) and cached in
+    process behind a version stamp. Resharding moves whole buckets, so the
+    number of shards can grow without rehashing every user. Scan ids come
+    from blocks reserved on the primary, keeping them unique across shards
+    so rows keep their ids when moved.
+    
+    With no SCAN_SHARD_URLS every scan table stays on the primary and
+    routing is a no-op.
+    """
+    
+    def __init__(self, urls: List[str]):
+        self.enabled = bool(urls)
+        if self.enabled:
+            # A shard on the primary database shares its engines (and SQLite write lock)
+            self.engines = [
+                engine if url == settings.DATABASE_URL else create_engine(url, connect_args=_connect_args(url))
+                for url in urls
+            ]
+            self.async_engines = [
+                async_engine if url == settings.DATABASE_URL else create_async_engine(to_async_url(url))
+                for url in urls
+            ]
+        else:
+            self.engines = [engine]
+            self.async_engines = [async_engine]
+        self._buckets = (0,) * SHARD_BUCKETS
+        self._stamp: Optional[str] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._id_limit = 0
+    
+    def initialize(self):
+        """Create missing scan tables on every shard and load the bucket map"""
+        if not self.enabled:
+            return
+        schema = shard_schema()
+        for shard_engine in self.engines:
+            if shard_engine is not engine:
+                schema.create_all(bind=shard_engine)
+        with SessionLocal() as db:
+            self.load_map(db)
+    
+    def load_map(self, db: Session):
+        """Load bucket assignments, recording all-on-shard-0 on first use"""
+        from app.models.system import AppMeta
+        
+        rows = db.execute(select(scan_shard_buckets)).all()
+        if not rows:
+            # Scans already stored live on the first shard until resharded
+            try:
+                db.execute(insert(scan_shard_buckets), [{"bucket": bucket, "shard": 0} for bucket in range(SHARD_BUCKETS)])
+                AppMeta.set(db, SHARD_MAP_VERSION_KEY, "1")
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+            rows = db.execute(select(scan_shard_buckets)).all()
+        
+        buckets = [0] * SHARD_BUCKETS
+        for row in rows:
+            if row.shard >= len(self.engines):
+                raise RuntimeError(
+                    f"Bucket {row.bucket} is on shard {row.shard} but only {len(self.engines)} SCAN_SHARD_URLS are configured"
+                )
+            buckets[row.bucket] = row.shard
+        with self._lock:
+            self._buckets = tuple(buckets)
+            self._stamp = AppMeta.get(db, SHARD_MAP_VERSION_KEY)
+            self._checked_at = time.monotonic()
+    
+    def refresh_if_stale(self):
+        """Reload the bucket map if a reshard changed it; checks at most once per interval"""
+        from app.models.system import AppMeta
+        
+        now = time.monotonic()
+        if not self.enabled or now - self._checked_at < settings.SHARD_MAP_REFRESH_SECONDS:
+            return
+        with self._lock:
+            if now - self._checked_at < settings.SHARD_MAP_REFRESH_SECONDS:
+                return
+            self._checked_at = now
+        with SessionLocal() as db:
+            if AppMeta.get(db, SHARD_MAP_VERSION_KEY) != self._stamp:
+                self.load_map(db)
+    
+    @property
+    def buckets(self) -> Tuple[int, ...]:
+        return self._buckets
+    
+    def shard_for(self, user_id: int) -> int:
+        self.refresh_if_stale()
+        return self._buckets[user_id % SHARD_BUCKETS]
+    
+    def route(self, db: Union[Session, AsyncSession], user_id: int) -> int:
+        """Bind a session's scan tables to the shard that owns a user's scans"""
+        shard = self.shard_for(user_id)
+        self.route_to_shard(db, shard)
+        return shard
+    
+    def route_to_shard(self, db: Union[Session, AsyncSession], shard: int):
+        if not self.enabled:
+            return
+        if isinstance(db, AsyncSession):
+            db, shard_engine = db.sync_session, self.async_engines[shard].sync_engine
+        else:
+            shard_engine = self.engines[shard]
+        for name in SHARDED_TABLES:
+            db.bind_table(Base.metadata.tables[name], shard_engine)
+    
+    def _max_scan_id(self) -> int:
+        scans = shard_schema().tables["waste_scans"]
+        highest = 0
+        for shard_engine in self.engines:
+            with shard_engine.connect() as connection:
+                highest = max(highest, connection.scalar(select(func.max(scans.c.id))) or 0)
+        return highest
+    
+    def _reserve_ids(self, count: int) -> int:
+        """Reserve `count` scan ids on the primary and return the first"""
+        from app.models.system import AppMeta
+        
+        meta = AppMeta.__table__
+        while True:
+            with SessionLocal() as db:
+                # A single UPDATE takes the row (Postgres) or database (SQLite) write lock
+                updated = db.execute(
+                    meta.update().where(meta.c.key == SCAN_ID_NEXT_KEY).values(
+                        value=cast(cast(meta.c.value, BigInteger) + count, String(255))
+                    )
+                ).rowcount
+                if updated:
+                    next_free = int(db.scalar(select(meta.c.value).where(meta.c.key == SCAN_ID_NEXT_KEY)))
+                    db.commit()
+                    return next_free - count
+                try:
+                    # First allocation: continue after the highest id on any shard
+                    first = self._max_scan_id() + 1
+                    db.execute(insert(meta).values(key=SCAN_ID_NEXT_KEY, value=str(first + count)))
+                    db.commit()
+                    return first
+                except IntegrityError:
+                    db.rollback()  # Another process initialized it; take the UPDATE path
+    
+    def allocate_scan_ids(self, count: int) -> Optional[List[int]]:
+        """Globally unique scan ids when sharded; None lets the database assign them"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if self._id_limit - self._next_id < count:
+                size = max(count, SCAN_ID_BLOCK_SIZE)
+                self._next_id = self._reserve_ids(size)
+                self._id_limit = self._next_id + size
+            ids = list(range(self._next_id, self._next_id + count))
+            self._next_id += count
+        return ids
+    
+    def next_scan_id(self) -> Optional[int]:
+        ids = self.allocate_scan_ids(1)
+        return ids[0] if ids else None
+
+scan_shards = ScanShards([url.strip() for url in settings.SCAN_SHARD_URLS.split(",") if url.strip()])
+
 # Dependency to get database session
 def get_db():
     db = SessionLocal()
@@ -26,3 +388,31 @@ def get_db():
         yield db
     finally:
         db.close()
+
+# Dependency to get an async database session for async route handlers
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# Dependency for read-only routes that tolerate bounded replication lag
+async def get_read_db():
+    async with read_replicas.session() as db:
+        yield db
+
+def init_db():
+    """Create a fresh schema or migrate an existing one to the latest revision"""
+    from alembic import command
+    from alembic.config import Config
+    # Register every model on Base.metadata, as alembic/env.py does
+    from app.models import user, waste, system  # noqa: F401
+    from app.routers import shop, smart_card, diy_projects  # noqa: F401
+
+    alembic_config = Config(ALEMBIC_INI)
+    alembic_config.attributes["configure_logger"] = False
+    if not inspect(engine).has_table("users"):
+        # Fresh database: build from the models and mark it as up to date
+        Base.metadata.create_all(bind=engine)
+        command.stamp(alembic_config, "head")
+    else:
+        command.upgrade(alembic_config, "head")
+    scan_shards.initialize()
@@ -0,0 +1,34 @@
+"""
+Application metadata model for version markers and stamps
+"""
+
+from typing import Optional
+from sqlalchemy import Column, String, DateTime
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+from app.database import Base
+
+class AppMeta(Base):
+    __tablename__ = "app_meta"
+    
+    key = Column(String(100), primary_key=True)
+    value = Column(String(255), nullable=True)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    def __repr__(self):
+        return f"<AppMeta(key='{self.key}', value='{self.value}')>"
+    
+    @staticmethod
+    def get(db: Session, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Read a metadata value"""
+        entry = db.get(AppMeta, key)
+        return entry.value if entry is not None else default
+    
+    @staticmethod
+    def set(db: Session, key: str, value: str):
+        """Create or update a metadata value (caller commits)"""
+        entry = db.get(AppMeta, key)
+        if entry is None:
+            db.add(AppMeta(key=key, value=value))
+        else:
+            entry.value = value
@@ -2,8 +2,9 @@
 User model for authentication and profile management
 """
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float
-from sqlalchemy.sql import func
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Float, ForeignKey
+from sqlalchemy.sql import false, func
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -26,6 +27,8 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     is_verified = Column(Boolean, default=False)
     is_premium = Column(Boolean, default=False)
+    # Operators: admin endpoints and scans ingested on behalf of other users
+    is_admin = Column(Boolean, default=False, server_default=false(), nullable=False)
     
     # Eco metrics
     eco_points = Column(Integer, default=0)
@@ -43,6 +46,7 @@ class User(Base):
     smart_cards = relationship("SmartCard", back_populates="user")
     orders = relationship("Order", back_populates="user")
     diy_projects = relationship("DIYProject", back_populates="user")
+    eco_point_events = relationship("EcoPointEvent", lazy="write_only")
     
     def __repr__(self):
         return f"<User(id={self.id}, username='{self.username}', email='{self.email}')>"
@@ -89,8 +93,10 @@ class User(Base):
         }
     
     def add_eco_points(self, points: int, reason: str = ""):
-        """Add eco points and update level if necessary"""
+        """Add eco points, record them in the ledger and update level if necessary"""
         self.eco_points += points
+        if points:
+            self.eco_point_events.add(EcoPointEvent(points=points, reason=reason, created_at=datetime.utcnow()))
         
         # Update level based on points
         if self.eco_points >= 5000:
@@ -103,3 +109,40 @@ class User(Base):
             self.eco_level = "Eco Enthusiast"
         else:
             self.eco_level = "Eco Beginner"
+
+class EcoPointEvent(Base):
+    """Ledger of awarded eco points; leaderboards sum it per period"""
+    __tablename__ = "eco_point_events"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    points = Column(Integer, nullable=False)
+    reason = Column(String(50), nullable=True)
+    created_at = Column(DateTime, nullable=False, index=True)
+
+class RefreshToken(Base):
+    """Issued refresh token; rotation marks it used and issues the next one in its family"""
+    __tablename__ = "refresh_tokens"
+    
+    jti = Column(String(36), primary_key=True)
+    family_id = Column(String(36), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    issued_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    used_at = Column(DateTime, nullable=True)
+    
+    def __repr__(self):
+        return f"<RefreshToken(jti='{self.jti}', family_id='{self.family_id}', user_id={self.user_id})>"
+
+class RevokedTokenFamily(Base):
+    """Token family revoked by logout or refresh token reuse; kept until its last token expires"""
+    __tablename__ = "revoked_token_families"
+    
+    family_id = Column(String(36), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    reason = Column(String(50), nullable=False)
+    revoked_at = Column(DateTime, nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    
+    def __repr__(self):
+        return f"<RevokedTokenFamily(family_id='{self.family_id}', reason='{self.reason}')>"
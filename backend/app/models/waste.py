@@ -2,7 +2,8 @@
 Waste detection and management models
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, JSON
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, Date, DateTime, Text, Boolean, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.database import Base
@@ -23,11 +24,13 @@ class WasteScan(Base):
     confidence_score = Column(Float, nullable=False)
     alternative_categories = Column(JSON, nullable=True)  # List of other possible categories
     
-    # Classification details
+    # Classification details (guidance text is resolved from the category at read time)
     is_recyclable = Column(Boolean, nullable=True)
-    disposal_method = Column(String(255), nullable=True)
-    environmental_impact = Column(Text, nullable=True)
-    recycling_tips = Column(Text, nullable=True)
+    category_id = Column(Integer, ForeignKey("waste_categories.id"), nullable=True)
+    category_version = Column(Integer, nullable=True)  # content version shown to the user
+    
+    # Idempotency key from kiosks and offline clients (bulk ingestion)
+    client_scan_id = Column(String(64), nullable=True)
     
     # User feedback
     user_confirmed = Column(Boolean, nullable=True)
@@ -38,17 +41,89 @@ class WasteScan(Base):
     scan_location = Column(String(255), nullable=True)
     latitude = Column(Float, nullable=True)
     longitude = Column(Float, nullable=True)
+    geohash = Column(String(12), nullable=True)  # set from latitude/longitude on insert
     
-    # Timestamps
-    scanned_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Timestamps (client-side default keeps microseconds for keyset cursors)
+    scanned_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     # Relationships
     user = relationship("User", back_populates="waste_scans")
     
+    __table_args__ = (
+        Index("ix_waste_scans_user_scanned_at", "user_id", "scanned_at"),
+        Index("ix_waste_scans_user_category", "user_id", "detected_category"),
+        Index("ux_waste_scans_user_client_scan_id", "user_id", "client_scan_id", unique=True),
+        Index("ix_waste_scans_geohash", "geohash"),
+    )
+    
     def __repr__(self):
         return f"<WasteScan(id={self.id}, category='{self.detected_category}', confidence={self.confidence_score})>"
 
+class ScanMonthlyRollup(Base):
+    """Per-user monthly scan counts for months moved to cold storage"""
+    __tablename__ = "waste_scan_monthly_rollups"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(String(7), primary_key=True)  # YYYY-MM
+    detected_category = Column(String(100), primary_key=True)
+    
+    scan_count = Column(Integer, nullable=False, default=0)
+    confirmed_count = Column(Integer, nullable=False, default=0)
+    corrected_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ScanMonthlyRollup(user_id={self.user_id}, month='{self.month}', category='{self.detected_category}')>"
+
+class ScanDailyRollup(Base):
+    """Per-user daily scan counts for scans still in waste_scans, kept current on every write"""
+    __tablename__ = "waste_scan_daily_rollups"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC date of scanned_at
+    detected_category = Column(String(100), primary_key=True)
+    
+    scan_count = Column(Integer, nullable=False, default=0)
+    feedback_count = Column(Integer, nullable=False, default=0)
+    confirmed_count = Column(Integer, nullable=False, default=0)
+    corrected_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ScanDailyRollup(user_id={self.user_id}, day='{self.day}', category='{self.detected_category}')>"
+
+class ScanGeoCell(Base):
+    """Scans per geohash cell and category at a few cell sizes, kept current on every write"""
+    __tablename__ = "scan_geo_cells"
+    
+    precision = Column(Integer, primary_key=True)  # geohash length
+    geohash = Column(String(12), primary_key=True)
+    detected_category = Column(String(100), primary_key=True)
+    
+    scan_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<ScanGeoCell(geohash='{self.geohash}', category='{self.detected_category}', scans={self.scan_count})>"
+
+class CommunityImpactSnapshot(Base):
+    """Latest community-wide (region NULL) and per-region impact totals, recomputed by a scheduled job"""
+    __tablename__ = "community_impact_snapshots"
+    
+    id = Column(Integer, primary_key=True)
+    region = Column(String(255), nullable=True)
+    computed_at = Column(DateTime, nullable=False)
+    
+    users = Column(Integer, nullable=False)  # users with at least one scan
+    scan_count = Column(Integer, nullable=False)
+    plastic_items_recycled = Column(Integer, nullable=False)
+    trees_saved = Column(Float, nullable=False)
+    water_saved_liters = Column(Float, nullable=False)
+    co2_reduced_kg = Column(Float, nullable=False)
+    category_counts = Column(JSON, nullable=False)
+    daily_trends = Column(JSON, nullable=True)  # community row only: {"dates": [...], "categories": {...}}
+    
+    def __repr__(self):
+        return f"<CommunityImpactSnapshot(region='{self.region}', computed_at='{self.computed_at}')>"
+
 class WasteCategory(Base):
     __tablename__ = "waste_categories"
     
@@ -79,6 +154,9 @@ class WasteCategory(Base):
     scan_count = Column(Integer, default=0)
     accuracy_rate = Column(Float, default=0.0)
     
+    # Bumped whenever the guidance text changes
+    content_version = Column(Integer, default=1, server_default="1", nullable=False)
+    
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -86,6 +164,31 @@ class WasteCategory(Base):
     def __repr__(self):
         return f"<WasteCategory(id={self.id}, name='{self.name}')>"
 
+class WasteCategoryRevision(Base):
+    """Guidance a category showed before an edit, for scans that reference that version"""
+    __tablename__ = "waste_category_revisions"
+    
+    id = Column(Integer, primary_key=True)
+    category_id = Column(Integer, ForeignKey("waste_categories.id"), nullable=False)
+    content_version = Column(Integer, nullable=False)  # the version this guidance was shown as
+    
+    # Guidance the category had before an edit replaced it
+    is_recyclable = Column(Boolean, default=False)
+    disposal_method = Column(String(255), nullable=True)
+    environmental_impact = Column(Text, nullable=True)
+    sorting_tips = Column(Text, nullable=True)
+    preparation_steps = Column(Text, nullable=True)
+    color_code = Column(String(7), nullable=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    __table_args__ = (
+        Index("ux_waste_category_revisions_category_version", "category_id", "content_version", unique=True),
+    )
+    
+    def __repr__(self):
+        return f"<WasteCategoryRevision(category_id={self.category_id}, content_version={self.content_version})>"
+
 class RecyclingTip(Base):
     __tablename__ = "recycling_tips"
     
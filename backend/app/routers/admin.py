@@ -0,0 +1,178 @@
+"""
+Admin router for operational insight into the running API
+"""
+
+import json
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from pydantic import BaseModel
+from app.database import SessionLocal, get_db, read_replicas
+from app.models.waste import WasteCategory
+from app.core.analytics_cache import analytics_cache
+from app.core.config import settings
+from app.core.rate_limit import rate_limit_metrics
+from app.core.scheduler import scheduler
+from app.core.security import password_hasher, require_permission
+from app.core.user_cache import UserSnapshot
+from app.core.timing import timing_registry
+from app.services.bulk_export import EXPORT_DATASETS, require_pyarrow, stream_export
+from app.services.category_registry import category_registry, category_revision
+from app.services.disposal_rules import disposal_rules
+
+router = APIRouter()
+
+# Pydantic models
+class CategoryGuidanceUpdate(BaseModel):
+    is_recyclable: Optional[bool] = None
+    disposal_method: Optional[str] = None
+    environmental_impact: Optional[str] = None
+    recycling_tips: Optional[str] = None
+    preparation_steps: Optional[List[str]] = None
+    color_code: Optional[str] = None
+
+@router.get("/timings")
+async def get_request_timings(
+    route: Optional[str] = None,
+    current_user: UserSnapshot = Depends(require_permission("admin"))
+):
+    """Get per-route, per-stage latency histograms"""
+    return timing_registry.snapshot(route)
+
+@router.delete("/timings")
+async def reset_request_timings(current_user: UserSnapshot = Depends(require_permission("admin"))):
+    """Reset collected latency histograms"""
+    timing_registry.reset()
+    return {"message": "Timing histograms reset"}
+
+@router.get("/replicas")
+async def get_replica_status(current_user: UserSnapshot = Depends(require_permission("admin"))):
+    """Get read replica lag and whether each one is serving reads"""
+    return {
+        "max_lag_seconds": settings.REPLICA_MAX_LAG_SECONDS,
+        "replicas": read_replicas.status()
+    }
+
+@router.get("/password-hashing")
+async def get_password_hashing_stats(current_user: UserSnapshot = Depends(require_permission("admin"))):
+    """Get bcrypt pool queue depth, rejections and latency histograms"""
+    return password_hasher.stats()
+
+@router.get("/rate-limits")
+async def get_rate_limit_stats(
+    top: int = 20,
+    current_user: UserSnapshot = Depends(require_permission("admin"))
+):
+    """Get allowed/limited counts per rule and the most limited keys"""
+    return {
+        "enabled": settings.RATE_LIMIT_ENABLED,
+        "backend": settings.RATE_LIMIT_BACKEND,
+        **rate_limit_metrics.snapshot(top)
+    }
+
+@router.delete("/rate-limits")
+async def reset_rate_limit_stats(current_user: UserSnapshot = Depends(require_permission("admin"))):
+    """Reset rate limit counters"""
+    rate_limit_metrics.reset()
+    return {"message": "Rate limit counters reset"}
+
+@router.get("/analytics-cache")
+async def get_analytics_cache_stats(current_user: UserSnapshot = Depends(require_permission("admin"))):
+    """Get analytics response cache size and hit rates per route"""
+    return analytics_cache.stats()
+
+@router.delete("/analytics-cache")
+async def clear_analytics_cache(current_user: UserSnapshot = Depends(require_permission("admin"))):
+    """Drop every cached analytics response in this process"""
+    analytics_cache.clear()
+    return {"message": "Analytics cache cleared"}
+
+@router.get("/jobs")
+async def get_scheduled_jobs(current_user: UserSnapshot = Depends(require_permission("admin"))):
+    """Get run counts and last results of this process's scheduled jobs"""
+    return {"enabled": settings.SCHEDULER_ENABLED, "jobs": scheduler.status()}
+
+@router.get("/exports/{dataset}")
+async def export_dataset(
+    dataset: str,
+    format: str = Query("csv", regex="^(csv|parquet)$"),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category: Optional[str] = None,
+    current_user: UserSnapshot = Depends(require_permission("admin"))
+):
+    """Stream every scan, order or DIY project row in a date range as CSV or Parquet"""
+    
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown dataset; choose one of {', '.join(EXPORT_DATASETS)}"
+        )
+    if format == "parquet":
+        try:
+            require_pyarrow()
+        except RuntimeError as e:
+            raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    
+    def chunks():
+        # The request's session is closed before the body is sent, so the export opens its own
+        with SessionLocal() as db:
+            yield from stream_export(db, dataset, format, start, end, category)
+    
+    filename = f"{dataset}-{date.today().isoformat()}.{format}"
+    return StreamingResponse(
+        chunks(),
+        media_type="text/csv" if format == "csv" else "application/vnd.apache.parquet",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/disposal-rules")
+async def get_disposal_rules(current_user: UserSnapshot = Depends(require_permission("admin"))):
+    """Get the regions loaded from disposal rule files and any files that failed to load"""
+    return disposal_rules.status()
+
+@router.post("/disposal-rules/reload")
+async def reload_disposal_rules(current_user: UserSnapshot = Depends(require_permission("admin"))):
+    """Recompile disposal rule files in this process without waiting for the change check"""
+    disposal_rules.load()
+    return disposal_rules.status()
+
+@router.put("/categories/{category_name}")
+def update_category_guidance(
+    category_name: str,
+    update: CategoryGuidanceUpdate,
+    current_user: UserSnapshot = Depends(require_permission("admin")),
+    db: Session = Depends(get_db)
+):
+    """Edit a waste category's disposal guidance"""
+    
+    category = db.query(WasteCategory).filter(WasteCategory.name == category_name).first()
+    if not category:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Category not found"
+        )
+    
+    # Scans shown the current text keep resolving it by version
+    db.add(category_revision(category))
+    
+    changes = update.dict(exclude_unset=True)
+    if "recycling_tips" in changes:
+        changes["sorting_tips"] = changes.pop("recycling_tips")
+    if "preparation_steps" in changes:
+        changes["preparation_steps"] = json.dumps(changes["preparation_steps"])
+    for column, value in changes.items():
+        setattr(category, column, value)
+    
+    category.content_version = (category.content_version or 1) + 1
+    category_registry.bump_version(db)
+    db.commit()
+    category_registry.load(db)
+    
+    return {
+        "name": category_name,
+        "content_version": category.content_version,
+        **category_registry.info(category_name)
+    }
@@ -3,14 +3,27 @@ Analytics router for waste management insights
 """
 
 from typing import List, Optional
-from fastapi import APIRouter, Depends, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func, extract
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel
-from app.database import get_db
+from app.database import REPLICA_AS_OF_KEY, get_read_db, scan_shards
 from app.models.user import User
-from app.models.waste import WasteScan
-from app.core.security import get_current_user
+from app.models.waste import CommunityImpactSnapshot
+from app.core.analytics_cache import analytics_cache
+from app.core.config import settings
+from app.core.security import get_current_user, get_optional_user_id
+from app.core.user_cache import UserSnapshot
+from app.services.scan_archive import (
+    archived_category_counts, archived_daily_counts, archived_monthly_counts,
+    get_archive_cutoff, merge_category_counts
+)
+from app.services.community_impact import IMPACT_FACTORS
+from app.services.leaderboard import leaderboard
+from app.services.scan_analytics import ScanSummary, scan_summary
+from app.services.scan_geo import heatmap_cells, zoom_precision
+from app.services.scan_trends import analyze, category_daily_counts, fill_matrix, trend_insights
 from datetime import datetime, timedelta
 
 router = APIRouter()
@@ -42,23 +55,28 @@ class EnvironmentalImpact(BaseModel):
 
 @router.get("/overview")
 async def get_analytics_overview(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    include_archived: bool = False,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get comprehensive analytics overview"""
     
+    cached, looked_up_at = analytics_cache.get("overview", current_user.id, include_archived)
+    if cached is not None:
+        return cached
+    
+    scan_shards.route(db, current_user.id)
+    
     # Basic stats
     total_scans = current_user.total_scans
     correct_sorts = current_user.correct_sorts
     accuracy_rate = (correct_sorts / max(total_scans, 1)) * 100
     
-    # Category breakdown
-    category_stats = db.query(
-        WasteScan.detected_category,
-        func.count(WasteScan.id).label('count')
-    ).filter(
-        WasteScan.user_id == current_user.id
-    ).group_by(WasteScan.detected_category).all()
+    # Category breakdown, recent activity and daily series in two grouped queries
+    summary = await scan_summary(db, current_user.id, days=7)
+    category_stats = summary.categories
+    if include_archived:
+        category_stats = merge_category_counts(category_stats, await archived_category_counts(db, current_user.id))
     
     total_categorized = sum(stat.count for stat in category_stats)
     
@@ -75,64 +93,56 @@ async def get_analytics_overview(
     # Environmental impact calculation
     environmental_impact = calculate_environmental_impact(category_stats)
     
-    # Recent activity (last 30 days)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent_scans = db.query(WasteScan).filter(
-        WasteScan.user_id == current_user.id,
-        WasteScan.scanned_at >= thirty_days_ago
-    ).count()
-    
     # Time series data (last 7 days)
-    time_series = []
-    for i in range(7):
-        date = datetime.utcnow() - timedelta(days=i)
-        day_scans = db.query(WasteScan).filter(
-            WasteScan.user_id == current_user.id,
-            func.date(WasteScan.scanned_at) == date.date()
-        ).count()
-        
-        time_series.append({
-            "date": date.strftime("%Y-%m-%d"),
+    time_series = [
+        {
+            "date": day,
             "scans": day_scans,
             "eco_points": day_scans * 10  # Simplified calculation
-        })
+        }
+        for day, day_scans in summary.daily_series(7)
+    ]
     
-    return {
+    return analytics_cache.put("overview", current_user.id, include_archived, {
         "overview": {
             "total_scans": total_scans,
             "correct_sorts": correct_sorts,
             "accuracy_rate": round(accuracy_rate, 1),
             "eco_points": current_user.eco_points,
             "eco_level": current_user.eco_level,
-            "recent_activity": recent_scans
+            "recent_activity": summary.recent
         },
         "category_breakdown": category_breakdown,
         "environmental_impact": environmental_impact,
-        "time_series": list(reversed(time_series)),
+        "time_series": time_series,
         "achievements": get_user_achievements(current_user),
         "goals": get_user_goals(current_user)
-    }
+    }, looked_up_at, db.info.get(REPLICA_AS_OF_KEY))
 
 @router.get("/environmental-impact")
 async def get_environmental_impact(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    include_archived: bool = False,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get detailed environmental impact metrics"""
     
-    category_stats = db.query(
-        WasteScan.detected_category,
-        func.count(WasteScan.id).label('count')
-    ).filter(
-        WasteScan.user_id == current_user.id
-    ).group_by(WasteScan.detected_category).all()
+    cached, looked_up_at = analytics_cache.get("environmental-impact", current_user.id, include_archived)
+    if cached is not None:
+        return cached
+    
+    scan_shards.route(db, current_user.id)
+    summary = await scan_summary(db, current_user.id, months=6)
+    category_stats = summary.categories
+    if include_archived:
+        category_stats = merge_category_counts(category_stats, await archived_category_counts(db, current_user.id))
     
     impact = calculate_environmental_impact(category_stats)
     
     # Additional metrics
-    monthly_impact = calculate_monthly_impact(current_user, db)
+    monthly_impact = await calculate_monthly_impact(current_user, db, include_archived, summary)
     
-    return {
+    return analytics_cache.put("environmental-impact", current_user.id, include_archived, {
         "total_impact": impact,
         "monthly_trends": monthly_impact,
         "comparisons": {
@@ -152,85 +162,178 @@ async def get_environmental_impact(
             "yearly_water_saved": impact["water_saved_liters"] * 12,
             "yearly_trees_saved": impact["trees_saved"] * 12
         }
-    }
+    }, looked_up_at, db.info.get(REPLICA_AS_OF_KEY))
 
 @router.get("/leaderboard")
 async def get_leaderboard(
     period: str = Query("monthly", regex="^(weekly|monthly|all_time)$"),
-    db: Session = Depends(get_db)
+    limit: int = Query(10, ge=1, le=100),
+    neighbors: int = Query(2, ge=0, le=10),
+    user_id: Optional[int] = Depends(get_optional_user_id),
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get leaderboard rankings"""
-    
-    # Calculate date filter based on period
-    if period == "weekly":
-        date_filter = datetime.utcnow() - timedelta(days=7)
-    elif period == "monthly":
-        date_filter = datetime.utcnow() - timedelta(days=30)
-    else:
-        date_filter = datetime.min
-    
-    # Get top users by eco points
-    top_users = db.query(User).filter(
-        User.is_active == True,
-        User.created_at >= date_filter if period != "all_time" else True
-    ).order_by(User.eco_points.desc()).limit(10).all()
-    
-    leaderboard = []
-    for i, user in enumerate(top_users, 1):
-        leaderboard.append({
-            "rank": i,
-            "username": user.username,
-            "eco_points": user.eco_points,
-            "eco_level": user.eco_level,
-            "total_scans": user.total_scans,
-            "accuracy_rate": (user.correct_sorts / max(user.total_scans, 1)) * 100
-        })
+    """Get leaderboard rankings by points earned this week, this month or ever"""
+    
+    top_users = await leaderboard.top(period, limit)
+    around_user = await leaderboard.neighbors(period, user_id, neighbors) if user_id is not None else []
+    
+    # One lookup for everyone shown
+    user_ids = {entry[1] for entry in top_users} | {entry[1] for entry in around_user}
+    users = {
+        user.id: user
+        for user in (await db.execute(select(User).where(User.id.in_(user_ids)))).scalars()
+    } if user_ids else {}
+    
+    def ranking(entries) -> list:
+        return [
+            {
+                "rank": rank,
+                "username": users[member].username,
+                "points": points,
+                "eco_points": users[member].eco_points,
+                "eco_level": users[member].eco_level,
+                "total_scans": users[member].total_scans,
+                "accuracy_rate": (users[member].correct_sorts / max(users[member].total_scans, 1)) * 100
+            }
+            for rank, member, points in entries if member in users
+        ]
     
     return {
         "period": period,
-        "leaderboard": leaderboard,
-        "user_rank": get_user_rank(db, period),
-        "total_participants": len(leaderboard)
+        "leaderboard": ranking(top_users),
+        "user_rank": await get_user_rank(period, user_id) if user_id is not None else None,
+        "neighbors": ranking(around_user),
+        "total_participants": await leaderboard.participants(period)
+    }
+
+@router.get("/community")
+async def get_community_impact(
+    regions: int = Query(10, ge=0, le=100),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get the latest community-wide impact snapshot and its top regions"""
+    
+    community = (await db.execute(
+        select(CommunityImpactSnapshot).where(CommunityImpactSnapshot.region.is_(None))
+    )).scalar_one_or_none()
+    if community is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Community impact has not been computed yet",
+            headers={"Retry-After": "60"}
+        )
+    top_regions = (await db.execute(
+        select(CommunityImpactSnapshot).where(
+            CommunityImpactSnapshot.region.isnot(None)
+        ).order_by(CommunityImpactSnapshot.scan_count.desc()).limit(regions)
+    )).scalars().all() if regions else []
+    
+    def impact(snapshot: CommunityImpactSnapshot) -> dict:
+        return {
+            "plastic_items_recycled": snapshot.plastic_items_recycled,
+            "trees_saved": snapshot.trees_saved,
+            "water_saved_liters": snapshot.water_saved_liters,
+            "co2_reduced_kg": snapshot.co2_reduced_kg
+        }
+    
+    return {
+        "computed_at": community.computed_at.isoformat(),
+        "participants": community.users,
+        "total_scans": community.scan_count,
+        "total_impact": impact(community),
+        "category_breakdown": [
+            {
+                "category": category,
+                "count": count,
+                "percentage": count / max(community.scan_count, 1) * 100
+            }
+            for category, count in sorted(community.category_counts.items(), key=lambda item: -item[1])
+        ],
+        "daily_trends": community.daily_trends,
+        "regions": [
+            {
+                "region": snapshot.region,
+                "participants": snapshot.users,
+                "total_scans": snapshot.scan_count,
+                "total_impact": impact(snapshot)
+            }
+            for snapshot in top_regions
+        ]
+    }
+
+@router.get("/heatmap")
+async def get_scan_heatmap(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    zoom: int = Query(10, ge=0, le=22),
+    category: Optional[str] = None,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Get scan counts per map cell inside a bounding box, sized for the zoom level"""
+    
+    if min_lat > max_lat or min_lon > max_lon:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Bounding box minimums must not exceed its maximums"
+        )
+    precision = zoom_precision(zoom)
+    cells = await heatmap_cells(
+        db, (min_lat, min_lon, max_lat, max_lon), precision, category, settings.HEATMAP_MIN_CELL_SCANS
+    )
+    return {
+        "zoom": zoom,
+        "precision": precision,
+        "category": category,
+        "max_count": max((cell["count"] for cell in cells), default=0),
+        "cells": cells
     }
 
 @router.get("/trends")
 async def get_waste_trends(
     days: int = Query(30, ge=7, le=365),
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    include_archived: bool = False,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get waste detection trends over time"""
     
-    start_date = datetime.utcnow() - timedelta(days=days)
-    
-    # Daily scan counts
-    daily_scans = db.query(
-        func.date(WasteScan.scanned_at).label('date'),
-        func.count(WasteScan.id).label('count')
-    ).filter(
-        WasteScan.user_id == current_user.id,
-        WasteScan.scanned_at >= start_date
-    ).group_by(func.date(WasteScan.scanned_at)).all()
-    
-    # Category trends
-    category_trends = db.query(
-        WasteScan.detected_category,
-        func.date(WasteScan.scanned_at).label('date'),
-        func.count(WasteScan.id).label('count')
-    ).filter(
-        WasteScan.user_id == current_user.id,
-        WasteScan.scanned_at >= start_date
-    ).group_by(WasteScan.detected_category, func.date(WasteScan.scanned_at)).all()
-    
-    return {
+    cached, looked_up_at = analytics_cache.get("trends", current_user.id, (days, include_archived))
+    if cached is not None:
+        return cached
+    
+    scan_shards.route(db, current_user.id)
+    today = datetime.utcnow().date()
+    since = today - timedelta(days=days - 1)
+    rows = list(await category_daily_counts(db, current_user.id, since))
+    
+    # Days before the archive cutoff live in Parquet files
+    cutoff = await get_archive_cutoff(db) if include_archived else None
+    if cutoff is not None and since < cutoff:
+        _, archived_categories = await run_in_threadpool(
+            archived_daily_counts, current_user.id,
+            datetime.combine(since, datetime.min.time()), datetime.combine(cutoff, datetime.min.time())
+        )
+        rows.extend(archived_categories)
+    
+    matrix = fill_matrix(since, today, rows)
+    analysis = analyze(matrix)
+    days_labels = [str(day) for day in matrix.days]
+    return analytics_cache.put("trends", current_user.id, (days, include_archived), {
         "period": f"Last {days} days",
         "daily_scans": [
-            {"date": str(scan.date), "count": scan.count}
-            for scan in daily_scans
+            {"date": day, "count": int(count)}
+            for day, count in zip(days_labels, matrix.daily)
         ],
-        "category_trends": organize_category_trends(category_trends),
-        "insights": generate_trend_insights(daily_scans, category_trends)
-    }
+        "category_trends": {
+            category: [{"date": day, "count": int(count)} for day, count in zip(days_labels, matrix.counts[:, i])]
+            for i, category in enumerate(matrix.categories)
+        },
+        "analysis": analysis,
+        "insights": trend_insights(matrix, analysis)
+    }, looked_up_at, db.info.get(REPLICA_AS_OF_KEY))
 
 def get_category_impact(category: str) -> str:
     """Get environmental impact description for category"""
@@ -250,19 +353,6 @@ def get_category_impact(category: str) -> str:
 def calculate_environmental_impact(category_stats) -> dict:
     """Calculate environmental impact based on waste categories"""
     
-    # Impact factors per item (simplified calculations)
-    impact_factors = {
-        "plastic": {"co2": 0.5, "water": 2.0, "trees": 0.001},
-        "paper": {"co2": 0.3, "water": 1.5, "trees": 0.01},
-        "glass": {"co2": 0.2, "water": 0.5, "trees": 0.0},
-        "metal": {"co2": 0.8, "water": 3.0, "trees": 0.002},
-        "organic": {"co2": 0.1, "water": 0.2, "trees": 0.0},
-        "electronic": {"co2": 2.0, "water": 5.0, "trees": 0.005},
-        "hazardous": {"co2": 1.0, "water": 2.0, "trees": 0.001},
-        "textile": {"co2": 0.4, "water": 1.0, "trees": 0.002},
-        "other": {"co2": 0.2, "water": 0.5, "trees": 0.001}
-    }
-    
     total_co2 = 0
     total_water = 0
     total_trees = 0
@@ -272,8 +362,8 @@ def calculate_environmental_impact(category_stats) -> dict:
         category = stat.detected_category
         count = stat.count
         
-        if category in impact_factors:
-            factors = impact_factors[category]
+        if category in IMPACT_FACTORS:
+            factors = IMPACT_FACTORS[category]
             total_co2 += count * factors["co2"]
             total_water += count * factors["water"]
             total_trees += count * factors["trees"]
@@ -288,29 +378,29 @@ def calculate_environmental_impact(category_stats) -> dict:
         "co2_reduced_kg": round(total_co2, 1)
     }
 
-def calculate_monthly_impact(user: User, db: Session) -> list:
-    """Calculate monthly environmental impact trends"""
-    
+async def calculate_monthly_impact(
+    user: UserSnapshot,
+    db: AsyncSession,
+    include_archived: bool = False,
+    summary: Optional[ScanSummary] = None
+) -> list:
+    """Calculate monthly environmental impact trends for the last 6 calendar months"""
+    
+    if summary is None:
+        summary = await scan_summary(db, user.id, months=6)
+    archived = await archived_monthly_counts(db, user.id) if include_archived else {}
     monthly_data = []
-    for i in range(6):  # Last 6 months
-        month_start = datetime.utcnow().replace(day=1) - timedelta(days=30*i)
-        month_end = month_start + timedelta(days=30)
-        
-        month_scans = db.query(WasteScan).filter(
-            WasteScan.user_id == user.id,
-            WasteScan.scanned_at >= month_start,
-            WasteScan.scanned_at < month_end
-        ).count()
-        
+    for month, month_scans in summary.monthly_series(6):
+        month_scans += archived.get(month, 0)
         monthly_data.append({
-            "month": month_start.strftime("%Y-%m"),
+            "month": month,
             "scans": month_scans,
             "estimated_impact": month_scans * 0.5  # Simplified
         })
     
-    return list(reversed(monthly_data))
+    return monthly_data
 
-def get_user_achievements(user: User) -> list:
+def get_user_achievements(user: UserSnapshot) -> list:
     """Get user achievements based on activity"""
     
     achievements = []
@@ -344,7 +434,7 @@ def get_user_achievements(user: User) -> list:
     
     return achievements
 
-def get_user_goals(user: User) -> list:
+def get_user_goals(user: UserSnapshot) -> list:
     """Get user goals and progress"""
     
     return [
@@ -366,37 +456,7 @@ def get_user_goals(user: User) -> list:
         }
     ]
 
-def get_user_rank(db: Session, period: str) -> int:
-    """Get user's rank in leaderboard"""
-    # Simplified - would need actual user context
-    return 42
-
-def organize_category_trends(category_trends) -> dict:
-    """Organize category trends by category"""
-    organized = {}
-    for trend in category_trends:
-        category = trend.detected_category
-        if category not in organized:
-            organized[category] = []
-        organized[category].append({
-            "date": str(trend.date),
-            "count": trend.count
-        })
-    return organized
-
-def generate_trend_insights(daily_scans, category_trends) -> list:
-    """Generate insights from trend data"""
-    insights = []
-    
-    if len(daily_scans) > 1:
-        recent_avg = sum(scan.count for scan in daily_scans[-7:]) / 7
-        older_avg = sum(scan.count for scan in daily_scans[:-7]) / max(len(daily_scans) - 7, 1)
-        
-        if recent_avg > older_avg:
-            insights.append("Your scanning activity has increased recently!")
-        elif recent_avg < older_avg:
-            insights.append("Your scanning activity has decreased. Try to scan more items!")
-    
-    insights.append("Keep up the great work contributing to environmental sustainability!")
-    
-    return insights
+async def get_user_rank(period: str, user_id: int) -> Optional[int]:
+    """Get user's rank in leaderboard, or None if they earned no points in the period"""
+    found = await leaderboard.rank(period, user_id)
+    return found[0] if found is not None else None
@@ -3,24 +3,35 @@ Authentication router for user registration, login, and token management
 """
 
 from datetime import timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordRequestForm
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer, OAuth2PasswordRequestForm
+from sqlalchemy import func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models.user import User
 from app.core.security import (
     authenticate_user,
     create_access_token,
     create_refresh_token,
-    get_password_hash,
     get_current_user,
+    get_current_user_for_update,
+    password_hasher,
     verify_token
 )
+from app.core.user_cache import UserSnapshot
 from app.core.config import settings
+from app.core.rate_limit import rate_limit
+from app.core.token_families import TokenReuseError, revoke_family, rotate_refresh_token, start_family
+from app.core.timing import timed
 
 router = APIRouter()
 
+# Logout works with or without a token
+optional_bearer = HTTPBearer(auto_error=False)
+
 # Pydantic models for request/response
 class UserCreate(BaseModel):
     email: EmailStr
@@ -50,14 +61,17 @@ class Token(BaseModel):
 class TokenRefresh(BaseModel):
     refresh_token: str
 
-@router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+@router.post(
+    "/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit("register", settings.REGISTER_RATE_LIMIT))]
+)
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     
     # Check if user already exists
-    existing_user = db.query(User).filter(
-        (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    existing_user = (await db.execute(
+        select(User).where(or_(User.email == user_data.email, User.username == user_data.username)).limit(1)
+    )).scalar()
     
     if existing_user:
         if existing_user.email == user_data.email:
@@ -72,7 +86,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
             )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     new_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -81,19 +95,23 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     return new_user
 
-@router.post("/login", response_model=Token)
+@router.post(
+    "/login", response_model=Token,
+    dependencies=[Depends(rate_limit("login", settings.LOGIN_RATE_LIMIT))]
+)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login user and return access token"""
     
-    user = authenticate_user(db, form_data.username, form_data.password)
+    with timed("authenticate"):
+        user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -107,17 +125,17 @@ async def login(
             detail="Inactive user"
         )
     
-    # Create tokens
+    # Create tokens (a new family; refreshes rotate within it)
+    family_id, jti = start_family(db.sync_session, user.id)
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
+        data={"sub": str(user.id), "fid": family_id}, expires_delta=access_token_expires
     )
-    refresh_token = create_refresh_token(data={"sub": str(user.id)})
+    refresh_token = create_refresh_token(data={"sub": str(user.id), "fid": family_id, "jti": jti})
     
     # Update last login
-    from sqlalchemy import func
     user.last_login = func.now()
-    db.commit()
+    await db.commit()
     
     return {
         "access_token": access_token,
@@ -127,7 +145,7 @@ async def login(
     }
 
 @router.post("/refresh", response_model=Token)
-async def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db)):
+def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db)):
     """Refresh access token using refresh token"""
     
     payload = verify_token(token_data.refresh_token, "refresh")
@@ -146,12 +164,27 @@ async def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db))
             detail="User not found or inactive"
         )
     
+    # Rotate: the presented token is spent and the next one joins its family
+    try:
+        rotated = rotate_refresh_token(db, payload.get("jti") or "", user.id)
+    except TokenReuseError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token already used; please log in again"
+        )
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
+    family_id, jti = rotated
+    
     # Create new tokens
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": str(user.id)}, expires_delta=access_token_expires
+        data={"sub": str(user.id), "fid": family_id}, expires_delta=access_token_expires
     )
-    new_refresh_token = create_refresh_token(data={"sub": str(user.id)})
+    new_refresh_token = create_refresh_token(data={"sub": str(user.id), "fid": family_id, "jti": jti})
     
     return {
         "access_token": access_token,
@@ -161,24 +194,31 @@ async def refresh_token(token_data: TokenRefresh, db: Session = Depends(get_db))
     }
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: UserSnapshot = Depends(get_current_user)):
     """Get current user information"""
     return current_user
 
 @router.post("/logout")
-async def logout():
-    """Logout user (client should discard tokens)"""
+def logout(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_bearer),
+    db: Session = Depends(get_db)
+):
+    """Logout user, revoking the access and refresh tokens of this login"""
+    payload = verify_token(credentials.credentials, "access") if credentials else None
+    if payload and payload.get("fid"):
+        revoke_family(db, payload["fid"], int(payload["sub"]), "logout")
+        db.commit()
     return {"message": "Successfully logged out"}
 
 @router.post("/verify-email")
-async def verify_email(current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def verify_email(current_user: User = Depends(get_current_user_for_update), db: Session = Depends(get_db)):
     """Verify user email (simplified - in production, send verification email)"""
     current_user.is_verified = True
     db.commit()
     return {"message": "Email verified successfully"}
 
 @router.post("/forgot-password")
-async def forgot_password(email: EmailStr, db: Session = Depends(get_db)):
+def forgot_password(email: EmailStr, db: Session = Depends(get_db)):
     """Request password reset (simplified - in production, send reset email)"""
     user = db.query(User).filter(User.email == email).first()
     if not user:
@@ -189,7 +229,7 @@ async def forgot_password(email: EmailStr, db: Session = Depends(get_db)):
     return {"message": "If email exists, password reset instructions have been sent"}
 
 @router.get("/validate-token")
-async def validate_token(current_user: User = Depends(get_current_user)):
+async def validate_token(current_user: UserSnapshot = Depends(get_current_user)):
     """Validate if current token is valid"""
     return {
         "valid": True,
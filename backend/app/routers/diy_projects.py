@@ -2,19 +2,21 @@
 DIY Projects router for upcycling and creative waste reuse
 """
 
+from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from sqlalchemy.orm import Session
-from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, JSON
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Response
+from sqlalchemy.orm import Session, relationship
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey, JSON, Index
 from sqlalchemy.sql import func
 from pydantic import BaseModel
 from app.database import get_db, Base
 from app.models.user import User
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_current_user_for_update
+from app.core.user_cache import UserSnapshot
 from app.core.config import settings
+from app.core.pagination import apply_keyset, decode_cursor, finish_page, set_next_cursor
 import os
 import uuid
-import aiofiles
 
 router = APIRouter()
 
@@ -51,9 +53,17 @@ class DIYProject(Base):
     is_approved = Column(Boolean, default=True)
     is_public = Column(Boolean, default=True)
     
-    # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Timestamps (client-side default keeps microseconds for keyset cursors)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User", back_populates="diy_projects")
+    
+    __table_args__ = (
+        Index("ix_diy_projects_user_created_at", "user_id", "created_at"),
+        Index("ix_diy_projects_listing", "is_public", "is_approved", "created_at"),
+    )
 
 # Pydantic models
 class DIYProjectCreate(BaseModel):
@@ -138,22 +148,16 @@ SAMPLE_PROJECTS = [
 ]
 
 @router.get("/", response_model=List[DIYProjectResponse])
-async def get_diy_projects(
+def get_diy_projects(
+    response: Response,
     category: Optional[str] = None,
     difficulty: Optional[str] = None,
     featured: Optional[bool] = None,
-    skip: int = 0,
-    limit: int = 20,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
     db: Session = Depends(get_db)
 ):
-    """Get DIY projects with optional filtering"""
-    
-    # Initialize sample projects if empty
-    if db.query(DIYProject).count() == 0:
-        for project_data in SAMPLE_PROJECTS:
-            project = DIYProject(**project_data)
-            db.add(project)
-        db.commit()
+    """Get DIY projects with optional filtering, newest first (next page cursor in X-Next-Cursor)"""
     
     query = db.query(DIYProject).filter(
         DIYProject.is_public == True,
@@ -167,7 +171,13 @@ async def get_diy_projects(
     if featured is not None:
         query = query.filter(DIYProject.is_featured == featured)
     
-    projects = query.order_by(DIYProject.created_at.desc()).offset(skip).limit(limit).all()
+    sort_columns = (DIYProject.created_at, DIYProject.id)
+    projects, next_cursor = finish_page(
+        apply_keyset(query, sort_columns, decode_cursor(cursor, sort_columns), limit).all(),
+        limit,
+        lambda project: (project.created_at, project.id)
+    )
+    set_next_cursor(response, next_cursor)
     
     # Add author information
     result = []
@@ -197,7 +207,7 @@ async def get_diy_projects(
     return result
 
 @router.get("/{project_id}", response_model=DIYProjectResponse)
-async def get_diy_project(project_id: int, db: Session = Depends(get_db)):
+def get_diy_project(project_id: int, db: Session = Depends(get_db)):
     """Get specific DIY project details"""
     
     project = db.query(DIYProject).filter(
@@ -240,9 +250,9 @@ async def get_diy_project(project_id: int, db: Session = Depends(get_db)):
     }
 
 @router.post("/", response_model=DIYProjectResponse)
-async def create_diy_project(
+def create_diy_project(
     project_data: DIYProjectCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_for_update),
     db: Session = Depends(get_db)
 ):
     """Create a new DIY project"""
@@ -289,10 +299,10 @@ async def create_diy_project(
     }
 
 @router.post("/{project_id}/images")
-async def upload_project_images(
+def upload_project_images(
     project_id: int,
     images: List[UploadFile] = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Upload images for a DIY project"""
@@ -329,9 +339,8 @@ async def upload_project_images(
             os.makedirs(os.path.dirname(file_path), exist_ok=True)
             
             # Save file
-            async with aiofiles.open(file_path, 'wb') as f:
-                content = await image.read()
-                await f.write(content)
+            with open(file_path, 'wb') as f:
+                f.write(image.file.read())
             
             uploaded_urls.append(f"/uploads/diy_images/{unique_filename}")
             
@@ -349,9 +358,9 @@ async def upload_project_images(
     }
 
 @router.post("/{project_id}/like")
-async def like_project(
+def like_project(
     project_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Like a DIY project"""
@@ -370,8 +379,8 @@ async def like_project(
     return {"message": "Project liked successfully", "total_likes": project.likes}
 
 @router.get("/my/projects", response_model=List[DIYProjectResponse])
-async def get_my_projects(
-    current_user: User = Depends(get_current_user),
+def get_my_projects(
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get current user's DIY projects"""
@@ -406,7 +415,7 @@ async def get_my_projects(
     return result
 
 @router.get("/categories/stats")
-async def get_category_stats(db: Session = Depends(get_db)):
+def get_category_stats(db: Session = Depends(get_db)):
     """Get statistics for DIY project categories"""
     
     # Get all waste categories used in projects
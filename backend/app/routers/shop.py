@@ -2,15 +2,19 @@
 Eco Shop router for sustainable products
 """
 
+from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import Column, Integer, String, Float, Text, Boolean, DateTime, ForeignKey
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.orm import Session, relationship
+from sqlalchemy import Column, Integer, String, Float, Text, Boolean, DateTime, ForeignKey, Index
 from sqlalchemy.sql import func
 from pydantic import BaseModel
 from app.database import get_db, Base
 from app.models.user import User
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_current_user_for_update
+from app.core.user_cache import UserSnapshot
+from app.core.config import settings
+from app.core.pagination import apply_keyset, decode_cursor, finish_page, set_next_cursor
 
 router = APIRouter()
 
@@ -58,9 +62,16 @@ class Order(Base):
     shipping_address = Column(Text, nullable=True)
     tracking_number = Column(String(100), nullable=True)
     
-    # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Timestamps (client-side default keeps microseconds for keyset cursors)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow, server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User", back_populates="orders")
+    
+    __table_args__ = (
+        Index("ix_orders_user_created_at", "user_id", "created_at"),
+    )
 
 # Pydantic models
 class ProductResponse(BaseModel):
@@ -95,7 +106,7 @@ class OrderResponse(BaseModel):
     status: str
     shipping_address: str
     tracking_number: Optional[str]
-    created_at: str
+    created_at: datetime
     
     class Config:
         from_attributes = True
@@ -170,23 +181,17 @@ SAMPLE_PRODUCTS = [
 ]
 
 @router.get("/products", response_model=List[ProductResponse])
-async def get_products(
+def get_products(
+    response: Response,
     category: Optional[str] = Query(None),
     min_price: Optional[float] = Query(None),
     max_price: Optional[float] = Query(None),
     eco_rating: Optional[int] = Query(None),
-    skip: int = Query(0),
-    limit: int = Query(20),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
     db: Session = Depends(get_db)
 ):
-    """Get products with optional filtering"""
-    
-    # Initialize products if empty (for demo)
-    if db.query(Product).count() == 0:
-        for product_data in SAMPLE_PRODUCTS:
-            product = Product(**product_data)
-            db.add(product)
-        db.commit()
+    """Get products with optional filtering (next page cursor in X-Next-Cursor)"""
     
     query = db.query(Product).filter(Product.is_available == True)
     
@@ -199,11 +204,17 @@ async def get_products(
     if eco_rating is not None:
         query = query.filter(Product.eco_rating >= eco_rating)
     
-    products = query.offset(skip).limit(limit).all()
+    sort_columns = (Product.id,)
+    products, next_cursor = finish_page(
+        apply_keyset(query, sort_columns, decode_cursor(cursor, sort_columns), limit, descending=False).all(),
+        limit,
+        lambda product: (product.id,)
+    )
+    set_next_cursor(response, next_cursor)
     return products
 
 @router.get("/products/{product_id}", response_model=ProductResponse)
-async def get_product(product_id: int, db: Session = Depends(get_db)):
+def get_product(product_id: int, db: Session = Depends(get_db)):
     """Get specific product details"""
     
     product = db.query(Product).filter(Product.id == product_id).first()
@@ -216,7 +227,7 @@ async def get_product(product_id: int, db: Session = Depends(get_db)):
     return product
 
 @router.get("/categories")
-async def get_categories(db: Session = Depends(get_db)):
+def get_categories(db: Session = Depends(get_db)):
     """Get all product categories"""
     
     categories = db.query(Product.category).distinct().all()
@@ -242,9 +253,9 @@ async def get_categories(db: Session = Depends(get_db)):
     ]
 
 @router.post("/orders", response_model=OrderResponse)
-async def create_order(
+def create_order(
     order_data: OrderCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_for_update),
     db: Session = Depends(get_db)
 ):
     """Create a new order"""
@@ -314,19 +325,29 @@ async def create_order(
     return new_order
 
 @router.get("/orders", response_model=List[OrderResponse])
-async def get_user_orders(
-    current_user: User = Depends(get_current_user),
+def get_user_orders(
+    response: Response,
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Get user's order history"""
-    
-    orders = db.query(Order).filter(Order.user_id == current_user.id).order_by(Order.created_at.desc()).all()
+    """Get user's order history, newest first (next page cursor in X-Next-Cursor)"""
+    
+    sort_columns = (Order.created_at, Order.id)
+    query = db.query(Order).filter(Order.user_id == current_user.id)
+    orders, next_cursor = finish_page(
+        apply_keyset(query, sort_columns, decode_cursor(cursor, sort_columns), limit).all(),
+        limit,
+        lambda order: (order.created_at, order.id)
+    )
+    set_next_cursor(response, next_cursor)
     return orders
 
 @router.get("/orders/{order_id}", response_model=OrderResponse)
-async def get_order(
+def get_order(
     order_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get specific order details"""
@@ -345,8 +366,8 @@ async def get_order(
     return order
 
 @router.get("/recommendations")
-async def get_recommendations(
-    current_user: User = Depends(get_current_user),
+def get_recommendations(
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get personalized product recommendations"""
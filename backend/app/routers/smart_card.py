@@ -4,13 +4,13 @@ Smart Card management router
 
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
+from sqlalchemy.orm import Session, relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Index
 from sqlalchemy.sql import func
 from pydantic import BaseModel
 from app.database import get_db, Base
-from app.models.user import User
 from app.core.security import get_current_user
+from app.core.user_cache import UserSnapshot
 import uuid
 from datetime import datetime, timedelta
 
@@ -41,6 +41,13 @@ class SmartCard(Base):
     # Timestamps
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    user = relationship("User", back_populates="smart_cards")
+    
+    __table_args__ = (
+        Index("ix_smart_cards_user_active", "user_id", "is_active"),
+    )
 
 # Pydantic models
 class SmartCardCreate(BaseModel):
@@ -81,9 +88,9 @@ def generate_card_number() -> str:
     return f"{prefix}-{suffix}"
 
 @router.post("/create", response_model=SmartCardResponse)
-async def create_smart_card(
+def create_smart_card(
     card_data: SmartCardCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Create a new smart card for user"""
@@ -145,8 +152,8 @@ async def create_smart_card(
     return card_response
 
 @router.get("/", response_model=SmartCardResponse)
-async def get_smart_card(
-    current_user: User = Depends(get_current_user),
+def get_smart_card(
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Get user's active smart card"""
@@ -197,9 +204,9 @@ async def get_smart_card(
     return card_response
 
 @router.put("/", response_model=SmartCardResponse)
-async def update_smart_card(
+def update_smart_card(
     card_data: SmartCardUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Update smart card details"""
@@ -248,8 +255,8 @@ async def update_smart_card(
     return card_response
 
 @router.post("/renew")
-async def renew_smart_card(
-    current_user: User = Depends(get_current_user),
+def renew_smart_card(
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Renew smart card (extend validity)"""
@@ -275,8 +282,8 @@ async def renew_smart_card(
     }
 
 @router.delete("/")
-async def deactivate_smart_card(
-    current_user: User = Depends(get_current_user),
+def deactivate_smart_card(
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Deactivate smart card"""
@@ -298,7 +305,7 @@ async def deactivate_smart_card(
     return {"message": "Smart card deactivated successfully"}
 
 @router.get("/validate/{card_number}")
-async def validate_card_number(card_number: str, db: Session = Depends(get_db)):
+def validate_card_number(card_number: str, db: Session = Depends(get_db)):
     """Validate card number (public endpoint for verification)"""
     
     card = db.query(SmartCard).filter(
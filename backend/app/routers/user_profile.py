@@ -6,13 +6,15 @@ import os
 import uuid
 from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, EmailStr
-from app.database import get_db
+from app.database import get_async_db, get_db
 from app.models.user import User
-from app.core.security import get_current_user, get_password_hash, verify_password
+from app.core.security import get_current_user, get_current_user_for_update, password_hasher
+from app.core.user_cache import UserSnapshot
 from app.core.config import settings
-import aiofiles
+from app.core.rate_limit import rate_limit
 
 router = APIRouter()
 
@@ -50,14 +52,14 @@ class ProfileResponse(BaseModel):
         from_attributes = True
 
 @router.get("/", response_model=ProfileResponse)
-async def get_profile(current_user: User = Depends(get_current_user)):
+async def get_profile(current_user: UserSnapshot = Depends(get_current_user)):
     """Get current user's profile"""
     return current_user
 
 @router.put("/", response_model=ProfileResponse)
-async def update_profile(
+def update_profile(
     profile_data: ProfileUpdate,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_for_update),
     db: Session = Depends(get_db)
 ):
     """Update user profile"""
@@ -78,9 +80,9 @@ async def update_profile(
     return current_user
 
 @router.post("/avatar")
-async def upload_avatar(
+def upload_avatar(
     avatar: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_for_update),
     db: Session = Depends(get_db)
 ):
     """Upload user avatar"""
@@ -117,9 +119,8 @@ async def upload_avatar(
                 os.remove(old_path)
         
         # Save new avatar
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await avatar.read()
-            await f.write(content)
+        with open(file_path, 'wb') as f:
+            f.write(avatar.file.read())
         
         # Update user record
         current_user.avatar_url = f"/uploads/user_avatars/{unique_filename}"
@@ -137,8 +138,8 @@ async def upload_avatar(
         )
 
 @router.delete("/avatar")
-async def delete_avatar(
-    current_user: User = Depends(get_current_user),
+def delete_avatar(
+    current_user: User = Depends(get_current_user_for_update),
     db: Session = Depends(get_db)
 ):
     """Delete user avatar"""
@@ -161,16 +162,22 @@ async def delete_avatar(
     
     return {"message": "Avatar deleted successfully"}
 
-@router.post("/change-password")
+@router.post(
+    "/change-password",
+    dependencies=[Depends(rate_limit("change_password", settings.PASSWORD_CHANGE_RATE_LIMIT, per="user"))]
+)
 async def change_password(
     password_data: PasswordChange,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Change user password"""
     
+    # Hashing is awaited, so the row is loaded and saved with the async session
+    user = await db.get(User, current_user.id)
+    
     # Verify current password
-    if not verify_password(password_data.current_password, current_user.hashed_password):
+    if not await password_hasher.verify(password_data.current_password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect current password"
@@ -184,13 +191,13 @@ async def change_password(
         )
     
     # Update password
-    current_user.hashed_password = get_password_hash(password_data.new_password)
-    db.commit()
+    user.hashed_password = await password_hasher.hash(password_data.new_password)
+    await db.commit()
     
     return {"message": "Password changed successfully"}
 
 @router.get("/eco-progress")
-async def get_eco_progress(current_user: User = Depends(get_current_user)):
+async def get_eco_progress(current_user: UserSnapshot = Depends(get_current_user)):
     """Get detailed eco progress information"""
     
     progress = current_user.eco_level_progress
@@ -236,8 +243,8 @@ async def get_eco_progress(current_user: User = Depends(get_current_user)):
     }
 
 @router.post("/deactivate")
-async def deactivate_account(
-    current_user: User = Depends(get_current_user),
+def deactivate_account(
+    current_user: User = Depends(get_current_user_for_update),
     db: Session = Depends(get_db)
 ):
     """Deactivate user account"""
@@ -248,7 +255,7 @@ async def deactivate_account(
     return {"message": "Account deactivated successfully"}
 
 @router.get("/export-data")
-async def export_user_data(current_user: User = Depends(get_current_user)):
+async def export_user_data(current_user: UserSnapshot = Depends(get_current_user)):
     """Export user data (GDPR compliance)"""
     
     # In a real implementation, this would generate a comprehensive data export
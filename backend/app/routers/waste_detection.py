@@ -4,17 +4,30 @@ Waste detection router for AI-powered image classification
 
 import os
 import uuid
+from datetime import datetime
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form, Query, Request, Response
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
 from pydantic import BaseModel
-from app.database import get_db
+from app.database import get_db, get_async_db, scan_shards
 from app.models.user import User
 from app.models.waste import WasteScan, WasteCategory
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_current_user_for_update, check_permissions
+from app.core.user_cache import UserSnapshot
 from app.services.ai_detection import waste_detector
+from app.services.category_registry import category_registry
+from app.services.disposal_rules import disposal_rules
+from app.services.scan_analytics import category_summary, feedback_accuracy
+from app.services.scan_ingest import ingest_scans
+from app.services.scan_geo import encode_geohash, record_scan_cell
+from app.services.scan_rollups import record_feedback, record_scan
+from app.core.analytics_cache import analytics_cache
 from app.core.config import settings
-import aiofiles
+from app.core.rate_limit import rate_limit
+from app.core.timing import timed
+from app.core.pagination import apply_keyset, decode_cursor, finish_page, set_next_cursor
 
 router = APIRouter()
 
@@ -24,15 +37,30 @@ class WasteScanResponse(BaseModel):
     detected_category: str
     confidence_score: float
     is_recyclable: bool
-    disposal_method: str
-    environmental_impact: str
-    recycling_tips: str
+    disposal_method: Optional[str]
+    environmental_impact: Optional[str]
+    recycling_tips: Optional[str]
     image_url: str
-    scanned_at: str
+    scanned_at: datetime
     
     class Config:
         from_attributes = True
 
+class BulkScanRecord(BaseModel):
+    client_scan_id: str
+    user_id: Optional[int] = None  # admins may ingest on behalf of other users
+    detected_category: Optional[str] = None
+    confidence_score: Optional[float] = None
+    image_base64: Optional[str] = None
+    image_filename: Optional[str] = None
+    scanned_at: Optional[datetime] = None
+    location: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+
+class BulkScanRequest(BaseModel):
+    scans: List[BulkScanRecord]
+
 class DetectionResult(BaseModel):
     detected_category: str
     confidence_score: float
@@ -47,13 +75,34 @@ class FeedbackRequest(BaseModel):
     user_correction: Optional[str] = None
     feedback_notes: Optional[str] = None
 
-@router.post("/scan", response_model=DetectionResult)
-async def scan_waste(
+def serialize_scan(scan: WasteScan) -> dict:
+    """Build a scan response, resolving guidance text from its category version and location"""
+    category_info = disposal_rules.resolve(
+        category_registry.info_for_scan(scan.category_id, scan.detected_category, scan.category_version),
+        scan.detected_category, scan.latitude, scan.longitude, scan.scan_location
+    )
+    return {
+        "id": scan.id,
+        "detected_category": scan.detected_category,
+        "confidence_score": scan.confidence_score,
+        "is_recyclable": scan.is_recyclable,
+        "disposal_method": category_info["disposal_method"],
+        "environmental_impact": category_info["environmental_impact"],
+        "recycling_tips": category_info["recycling_tips"],
+        "image_url": scan.image_url,
+        "scanned_at": scan.scanned_at
+    }
+
+@router.post(
+    "/scan", response_model=DetectionResult,
+    dependencies=[Depends(rate_limit("scan", settings.SCAN_RATE_LIMIT, per="user"))]
+)
+def scan_waste(
     image: UploadFile = File(...),
     location: Optional[str] = Form(None),
     latitude: Optional[float] = Form(None),
     longitude: Optional[float] = Form(None),
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_for_update),
     db: Session = Depends(get_db)
 ):
     """Scan waste image and classify using AI"""
@@ -72,6 +121,10 @@ async def scan_waste(
             detail=f"File too large. Maximum size is {settings.MAX_IMAGE_SIZE / (1024*1024):.1f}MB"
         )
     
+    category_registry.refresh_if_stale(db)
+    disposal_rules.refresh_if_stale()
+    scan_shards.route(db, current_user.id)
+    
     try:
         # Generate unique filename
         file_extension = image.filename.split('.')[-1]
@@ -82,42 +135,56 @@ async def scan_waste(
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
         
         # Save uploaded file
-        async with aiofiles.open(file_path, 'wb') as f:
-            content = await image.read()
-            await f.write(content)
+        with timed("upload"):
+            content = image.file.read()
+        with timed("disk_write"):
+            with open(file_path, 'wb') as f:
+                f.write(content)
         
         # Analyze image quality
-        quality_analysis = waste_detector.analyze_image_quality(file_path)
+        with timed("quality"):
+            quality_analysis = waste_detector.analyze_image_quality(file_path)
         
-        # Perform AI detection
+        # Perform AI detection (records preprocess/predict spans)
         detection_result = waste_detector.detect_waste(file_path)
         
-        # Save scan to database
+        # Local rules override the global guidance where the scan was taken
+        detected_category = detection_result["detected_category"]
+        detection_result["category_info"] = disposal_rules.resolve(
+            detection_result["category_info"], detected_category, latitude, longitude, location
+        )
+        
+        # Save scan to database (guidance text is referenced, not copied)
         waste_scan = WasteScan(
+            id=scan_shards.next_scan_id(),
             user_id=current_user.id,
             image_url=f"/uploads/waste_images/{unique_filename}",
             image_filename=unique_filename,
             image_size=image.size,
-            detected_category=detection_result["detected_category"],
+            detected_category=detected_category,
             confidence_score=detection_result["confidence_score"],
             alternative_categories=detection_result["alternatives"],
             is_recyclable=detection_result["category_info"]["is_recyclable"],
-            disposal_method=detection_result["category_info"]["disposal_method"],
-            environmental_impact=detection_result["category_info"]["environmental_impact"],
-            recycling_tips=detection_result["category_info"]["recycling_tips"],
+            category_id=category_registry.category_id(detected_category),
+            category_version=category_registry.content_version(detected_category),
             scan_location=location,
             latitude=latitude,
-            longitude=longitude
+            longitude=longitude,
+            geohash=encode_geohash(latitude, longitude),
+            scanned_at=datetime.utcnow()
         )
         
         db.add(waste_scan)
+        record_scan(db, waste_scan)
+        record_scan_cell(db, waste_scan)
         
         # Update user statistics
         current_user.total_scans += 1
         current_user.add_eco_points(settings.POINTS_PER_SCAN, "waste_scan")
         
-        db.commit()
-        db.refresh(waste_scan)
+        with timed("db_commit"):
+            db.commit()
+            db.refresh(waste_scan)
         
         # Combine results
         result = {
@@ -138,34 +205,72 @@ async def scan_waste(
             detail=f"Error processing image: {str(e)}"
         )
 
+@router.post(
+    "/scans/bulk",
+    dependencies=[Depends(rate_limit("bulk_scan", settings.BULK_SCAN_RATE_LIMIT, per="user"))]
+)
+def bulk_ingest_scans(
+    payload: BulkScanRequest,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Ingest buffered scans from kiosks and offline clients"""
+    
+    if len(payload.scans) > settings.MAX_BULK_SCANS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Too many scans. Maximum is {settings.MAX_BULK_SCANS} per request"
+        )
+    
+    if any(record.user_id not in (None, current_user.id) for record in payload.scans):
+        if not check_permissions(current_user, "admin"):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+    
+    category_registry.refresh_if_stale(db)
+    disposal_rules.refresh_if_stale()
+    return ingest_scans(db, payload.scans, current_user.id)
+
 @router.get("/history", response_model=List[WasteScanResponse])
 async def get_scan_history(
-    skip: int = 0,
-    limit: int = 20,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
     category: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get user's scan history"""
+    """Get user's scan history, newest first (next page cursor in X-Next-Cursor)"""
     
-    query = db.query(WasteScan).filter(WasteScan.user_id == current_user.id)
+    scan_shards.route(db, current_user.id)
+    sort_columns = (WasteScan.scanned_at, WasteScan.id)
+    query = select(WasteScan).where(WasteScan.user_id == current_user.id)
     
     if category:
-        query = query.filter(WasteScan.detected_category == category)
+        query = query.where(WasteScan.detected_category == category)
     
-    scans = query.order_by(WasteScan.scanned_at.desc()).offset(skip).limit(limit).all()
+    result = await db.execute(
+        apply_keyset(query, sort_columns, decode_cursor(cursor, sort_columns), limit)
+    )
+    scans, next_cursor = finish_page(
+        result.scalars().all(), limit, lambda scan: (scan.scanned_at, scan.id)
+    )
+    set_next_cursor(response, next_cursor)
     
-    return scans
+    return [serialize_scan(scan) for scan in scans]
 
 @router.post("/feedback")
-async def submit_feedback(
+def submit_feedback(
     feedback: FeedbackRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_for_update),
     db: Session = Depends(get_db)
 ):
     """Submit feedback on scan results"""
     
     # Get the scan
+    scan_shards.route(db, current_user.id)
     scan = db.query(WasteScan).filter(
         WasteScan.id == feedback.scan_id,
         WasteScan.user_id == current_user.id
@@ -178,9 +283,11 @@ async def submit_feedback(
         )
     
     # Update scan with feedback
+    previous = (scan.user_confirmed, scan.user_correction)
     scan.user_confirmed = feedback.user_confirmed
     scan.user_correction = feedback.user_correction
     scan.feedback_notes = feedback.feedback_notes
+    record_feedback(db, scan, previous)
     
     # Award points for correct classification
     if feedback.user_confirmed:
@@ -195,49 +302,34 @@ async def submit_feedback(
     }
 
 @router.get("/categories")
-async def get_waste_categories(db: Session = Depends(get_db)):
+def get_waste_categories(request: Request, db: Session = Depends(get_db)):
     """Get all waste categories with information"""
     
-    categories = []
-    for category_name in settings.WASTE_CATEGORIES:
-        category_info = waste_detector._get_category_info(category_name)
-        categories.append({
-            "name": category_name,
-            "display_name": category_name.title(),
-            **category_info
-        })
+    category_registry.refresh_if_stale(db)
+    snapshot = category_registry.snapshot
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
     
-    return categories
+    if request.headers.get("if-none-match") == snapshot.etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
 
 @router.get("/stats")
 async def get_detection_stats(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get user's detection statistics"""
     
-    # Get category breakdown
-    category_stats = db.query(
-        WasteScan.detected_category,
-        db.func.count(WasteScan.id).label('count')
-    ).filter(
-        WasteScan.user_id == current_user.id
-    ).group_by(WasteScan.detected_category).all()
-    
-    # Calculate accuracy
-    total_feedback = db.query(WasteScan).filter(
-        WasteScan.user_id == current_user.id,
-        WasteScan.user_confirmed.isnot(None)
-    ).count()
+    cached, looked_up_at = analytics_cache.get("detection-stats", current_user.id)
+    if cached is not None:
+        return cached
     
-    correct_feedback = db.query(WasteScan).filter(
-        WasteScan.user_id == current_user.id,
-        WasteScan.user_confirmed == True
-    ).count()
+    # Category breakdown and feedback accuracy in one grouped query
+    scan_shards.route(db, current_user.id)
+    category_stats = await category_summary(db, current_user.id)
+    accuracy = feedback_accuracy(category_stats)
     
-    accuracy = (correct_feedback / total_feedback * 100) if total_feedback > 0 else 0
-    
-    return {
+    return analytics_cache.put("detection-stats", current_user.id, (), {
         "total_scans": current_user.total_scans,
         "correct_sorts": current_user.correct_sorts,
         "accuracy_percentage": round(accuracy, 1),
@@ -248,16 +340,17 @@ async def get_detection_stats(
             for stat in category_stats
         ],
         "level_progress": current_user.eco_level_progress
-    }
+    }, looked_up_at)
 
 @router.delete("/scan/{scan_id}")
-async def delete_scan(
+def delete_scan(
     scan_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """Delete a scan record"""
     
+    scan_shards.route(db, current_user.id)
     scan = db.query(WasteScan).filter(
         WasteScan.id == scan_id,
         WasteScan.user_id == current_user.id
@@ -269,12 +362,15 @@ async def delete_scan(
             detail="Scan not found"
         )
     
-    # Delete image file
-    image_path = os.path.join(settings.UPLOAD_DIR, "waste_images", scan.image_filename)
-    if os.path.exists(image_path):
-        os.remove(image_path)
+    # Delete image file (pre-classified bulk scans may have none)
+    if scan.image_filename:
+        image_path = os.path.join(settings.UPLOAD_DIR, "waste_images", scan.image_filename)
+        if os.path.exists(image_path):
+            os.remove(image_path)
     
     # Delete database record
+    record_scan(db, scan, sign=-1)
+    record_scan_cell(db, scan, sign=-1)
     db.delete(scan)
     db.commit()
     
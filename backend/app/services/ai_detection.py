@@ -5,10 +5,12 @@ AI-powered waste detection service using TensorFlow
 import os
 import cv2
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Mapping, Tuple, Optional
 from PIL import Image
 import tensorflow as tf
 from app.core.config import settings
+from app.core.timing import timed
+from app.services.category_registry import category_registry
 import logging
 
 logger = logging.getLogger(__name__)
@@ -71,10 +73,12 @@ class WasteDetectionService:
         """Detect waste category from image"""
         try:
             # Preprocess image
-            processed_image = self.preprocess_image(image_path)
+            with timed("preprocess"):
+                processed_image = self.preprocess_image(image_path)
             
             # Make prediction
-            predictions = self.model.predict(processed_image)
+            with timed("predict"):
+                predictions = self.model.predict(processed_image)
             predicted_class_idx = np.argmax(predictions[0])
             confidence = float(predictions[0][predicted_class_idx])
             
@@ -107,129 +111,9 @@ class WasteDetectionService:
             logger.error(f"Error in waste detection: {e}")
             raise
     
-    def _get_category_info(self, category: str) -> Dict:
+    def _get_category_info(self, category: str) -> Mapping:
         """Get detailed information about waste category"""
-        category_data = {
-            "plastic": {
-                "is_recyclable": True,
-                "disposal_method": "Recycling bin (clean containers only)",
-                "environmental_impact": "Takes 450+ years to decompose. Causes marine pollution.",
-                "recycling_tips": "Clean containers, remove labels, separate by type",
-                "color_code": "#FF6B6B",
-                "preparation_steps": [
-                    "Rinse containers thoroughly",
-                    "Remove all labels and caps",
-                    "Check recycling number",
-                    "Separate by plastic type"
-                ]
-            },
-            "paper": {
-                "is_recyclable": True,
-                "disposal_method": "Paper recycling bin",
-                "environmental_impact": "Decomposes in 2-6 weeks. Saves trees when recycled.",
-                "recycling_tips": "Keep dry, remove staples, no wax coating",
-                "color_code": "#4ECDC4",
-                "preparation_steps": [
-                    "Remove any plastic coating",
-                    "Take out staples and clips",
-                    "Keep paper dry",
-                    "Separate by paper type"
-                ]
-            },
-            "glass": {
-                "is_recyclable": True,
-                "disposal_method": "Glass recycling bin",
-                "environmental_impact": "Takes 1 million years to decompose. 100% recyclable.",
-                "recycling_tips": "Separate by color, remove caps and lids",
-                "color_code": "#45B7D1",
-                "preparation_steps": [
-                    "Remove all caps and lids",
-                    "Rinse containers",
-                    "Separate by color",
-                    "Remove any metal parts"
-                ]
-            },
-            "metal": {
-                "is_recyclable": True,
-                "disposal_method": "Metal recycling bin",
-                "environmental_impact": "Takes 50-200 years to decompose. Highly valuable for recycling.",
-                "recycling_tips": "Clean cans, separate aluminum from steel",
-                "color_code": "#96CEB4",
-                "preparation_steps": [
-                    "Clean all food residue",
-                    "Remove labels if possible",
-                    "Separate aluminum from steel",
-                    "Flatten cans to save space"
-                ]
-            },
-            "organic": {
-                "is_recyclable": False,
-                "disposal_method": "Compost bin or organic waste",
-                "environmental_impact": "Decomposes in 2-5 months. Creates methane in landfills.",
-                "recycling_tips": "Compost at home or use organic waste collection",
-                "color_code": "#FECA57",
-                "preparation_steps": [
-                    "Remove any packaging",
-                    "Cut into smaller pieces",
-                    "Mix with brown materials",
-                    "Keep compost moist"
-                ]
-            },
-            "electronic": {
-                "is_recyclable": True,
-                "disposal_method": "E-waste collection center",
-                "environmental_impact": "Contains toxic materials. Valuable metals can be recovered.",
-                "recycling_tips": "Take to certified e-waste recycler, remove batteries",
-                "color_code": "#FF9FF3",
-                "preparation_steps": [
-                    "Remove all batteries",
-                    "Delete personal data",
-                    "Keep original packaging if possible",
-                    "Take to certified recycler"
-                ]
-            },
-            "hazardous": {
-                "is_recyclable": False,
-                "disposal_method": "Hazardous waste facility",
-                "environmental_impact": "Extremely harmful to environment and health.",
-                "recycling_tips": "Never put in regular trash. Use special collection events.",
-                "color_code": "#FF6B6B",
-                "preparation_steps": [
-                    "Keep in original container",
-                    "Do not mix with other materials",
-                    "Label clearly",
-                    "Take to hazardous waste facility"
-                ]
-            },
-            "textile": {
-                "is_recyclable": True,
-                "disposal_method": "Textile recycling or donation",
-                "environmental_impact": "Takes 200+ years to decompose. Fast fashion increases waste.",
-                "recycling_tips": "Donate if usable, recycle if damaged",
-                "color_code": "#A8E6CF",
-                "preparation_steps": [
-                    "Clean and dry items",
-                    "Separate by condition",
-                    "Remove non-textile parts",
-                    "Donate or recycle appropriately"
-                ]
-            },
-            "other": {
-                "is_recyclable": False,
-                "disposal_method": "General waste bin",
-                "environmental_impact": "Varies by material type.",
-                "recycling_tips": "Check local guidelines for specific items",
-                "color_code": "#95A5A6",
-                "preparation_steps": [
-                    "Check local recycling guidelines",
-                    "Consider if item can be reused",
-                    "Separate any recyclable components",
-                    "Dispose according to local rules"
-                ]
-            }
-        }
-        
-        return category_data.get(category, category_data["other"])
+        return category_registry.info(category)
     
     def analyze_image_quality(self, image_path: str) -> Dict:
         """Analyze image quality for better detection"""
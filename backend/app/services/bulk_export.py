@@ -0,0 +1,151 @@
+"""
+Streaming bulk exports of scans, orders and DIY projects as CSV or Parquet
+"""
+
+import csv
+import io
+import json
+import logging
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, NamedTuple, Optional, Sequence
+from sqlalchemy import DateTime, JSON, Table, select
+from sqlalchemy.orm import Session
+from app.database import scan_shards
+from app.models.waste import WasteScan
+from app.routers.shop import Order
+from app.routers.diy_projects import DIYProject
+from app.services.scan_archive import arrow_row, arrow_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Only needed for Parquet exports
+    pa = pq = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("csv", "parquet")
+
+class ExportDataset(NamedTuple):
+    table: Table
+    date_column: str
+    category_column: str
+    sharded: bool = False
+    category_is_list: bool = False  # JSON list column, matched per row
+
+EXPORT_DATASETS = {
+    "scans": ExportDataset(WasteScan.__table__, "scanned_at", "detected_category", sharded=True),
+    "orders": ExportDataset(Order.__table__, "created_at", "status"),
+    "diy-projects": ExportDataset(DIYProject.__table__, "created_at", "waste_categories", category_is_list=True)
+}
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Parquet exports need pyarrow (pip install pyarrow)")
+
+def _partitions(db: Session, dataset: ExportDataset, start: Optional[date], end: Optional[date],
+                category: Optional[str], batch_size: int) -> Iterator[Sequence]:
+    """Yield batches of matching rows, read with a server-side cursor shard by shard"""
+    table = dataset.table
+    filters = []
+    if start is not None:
+        filters.append(table.c[dataset.date_column] >= datetime.combine(start, datetime.min.time()))
+    if end is not None:
+        filters.append(table.c[dataset.date_column] < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    if category is not None and not dataset.category_is_list:
+        filters.append(table.c[dataset.category_column] == category)
+
+    for shard in range(len(scan_shards.engines)) if dataset.sharded else [None]:
+        if shard is not None:
+            scan_shards.route_to_shard(db, shard)
+        result = db.execute(
+            select(table).where(*filters).order_by(table.c.id).execution_options(yield_per=batch_size)
+        )
+        for partition in result.partitions():
+            if category is not None and dataset.category_is_list:
+                partition = [row for row in partition if category in (row._mapping[dataset.category_column] or [])]
+            if partition:
+                yield partition
+
+def _csv_value(column, value):
+    if value is None:
+        return ""
+    if isinstance(column.type, JSON):
+        return json.dumps(value)
+    if isinstance(column.type, DateTime):
+        return value.isoformat()
+    return value
+
+def _csv_chunks(table: Table, partitions: Iterator[Sequence]) -> Iterator[bytes]:
+    columns = list(table.columns)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column.name for column in columns])
+    for partition in partitions:
+        writer.writerows([_csv_value(column, row._mapping[column.name]) for column in columns] for row in partition)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()  # Header of an empty export
+
+class _ChunkSink:
+    """Write-only file handing the bytes written so far back to the caller"""
+
+    closed = False
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def _parquet_chunks(table: Table, partitions: Iterator[Sequence]) -> Iterator[bytes]:
+    """One row group per batch, each sent as soon as it is encoded"""
+    schema = arrow_schema(table)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema)
+    try:
+        for partition in partitions:
+            writer.write_table(pa.Table.from_pylist([arrow_row(table, row) for row in partition], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()  # Footer
+
+def stream_export(db: Session, name: str, format: str = "csv", start: Optional[date] = None,
+                  end: Optional[date] = None, category: Optional[str] = None,
+                  batch_size: int = 10_000) -> Iterator[bytes]:
+    """Encoded chunks of an export, holding at most one batch of rows at a time
+
+    `start` and `end` are inclusive days on the dataset's date column;
+    `category` matches scans' detected category, orders' status or a waste
+    category used by a DIY project.
+    """
+    dataset = EXPORT_DATASETS[name]
+    if format == "parquet":
+        require_pyarrow()
+    partitions = _partitions(db, dataset, start, end, category, batch_size)
+    chunks = _parquet_chunks if format == "parquet" else _csv_chunks
+    exported = 0
+    for chunk in chunks(dataset.table, partitions):
+        exported += len(chunk)
+        yield chunk
+    logger.info(f"Exported {name} as {format}: {exported} bytes")
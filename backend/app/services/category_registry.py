@@ -0,0 +1,302 @@
+"""
+Database-backed waste category registry with an in-process, versioned cache
+"""
+
+import hashlib
+import json
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Mapping, NamedTuple, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.system import AppMeta
+from app.models.waste import WasteCategory, WasteCategoryRevision
+
+CATEGORIES_VERSION_KEY = "categories_version"
+
+# Built-in disposal guidance; seeds the waste_categories table
+CATEGORY_DEFAULTS = {
+    "plastic": {
+        "is_recyclable": True,
+        "disposal_method": "Recycling bin (clean containers only)",
+        "environmental_impact": "Takes 450+ years to decompose. Causes marine pollution.",
+        "recycling_tips": "Clean containers, remove labels, separate by type",
+        "color_code": "#FF6B6B",
+        "preparation_steps": [
+            "Rinse containers thoroughly",
+            "Remove all labels and caps",
+            "Check recycling number",
+            "Separate by plastic type"
+        ]
+    },
+    "paper": {
+        "is_recyclable": True,
+        "disposal_method": "Paper recycling bin",
+        "environmental_impact": "Decomposes in 2-6 weeks. Saves trees when recycled.",
+        "recycling_tips": "Keep dry, remove staples, no wax coating",
+        "color_code": "#4ECDC4",
+        "preparation_steps": [
+            "Remove any plastic coating",
+            "Take out staples and clips",
+            "Keep paper dry",
+            "Separate by paper type"
+        ]
+    },
+    "glass": {
+        "is_recyclable": True,
+        "disposal_method": "Glass recycling bin",
+        "environmental_impact": "Takes 1 million years to decompose. 100% recyclable.",
+        "recycling_tips": "Separate by color, remove caps and lids",
+        "color_code": "#45B7D1",
+        "preparation_steps": [
+            "Remove all caps and lids",
+            "Rinse containers",
+            "Separate by color",
+            "Remove any metal parts"
+        ]
+    },
+    "metal": {
+        "is_recyclable": True,
+        "disposal_method": "Metal recycling bin",
+        "environmental_impact": "Takes 50-200 years to decompose. Highly valuable for recycling.",
+        "recycling_tips": "Clean cans, separate aluminum from steel",
+        "color_code": "#96CEB4",
+        "preparation_steps": [
+            "Clean all food residue",
+            "Remove labels if possible",
+            "Separate aluminum from steel",
+            "Flatten cans to save space"
+        ]
+    },
+    "organic": {
+        "is_recyclable": False,
+        "disposal_method": "Compost bin or organic waste",
+        "environmental_impact": "Decomposes in 2-5 months. Creates methane in landfills.",
+        "recycling_tips": "Compost at home or use organic waste collection",
+        "color_code": "#FECA57",
+        "preparation_steps": [
+            "Remove any packaging",
+            "Cut into smaller pieces",
+            "Mix with brown materials",
+            "Keep compost moist"
+        ]
+    },
+    "electronic": {
+        "is_recyclable": True,
+        "disposal_method": "E-waste collection center",
+        "environmental_impact": "Contains toxic materials. Valuable metals can be recovered.",
+        "recycling_tips": "Take to certified e-waste recycler, remove batteries",
+        "color_code": "#FF9FF3",
+        "preparation_steps": [
+            "Remove all batteries",
+            "Delete personal data",
+            "Keep original packaging if possible",
+            "Take to certified recycler"
+        ]
+    },
+    "hazardous": {
+        "is_recyclable": False,
+        "disposal_method": "Hazardous waste facility",
+        "environmental_impact": "Extremely harmful to environment and health.",
+        "recycling_tips": "Never put in regular trash. Use special collection events.",
+        "color_code": "#FF6B6B",
+        "preparation_steps": [
+            "Keep in original container",
+            "Do not mix with other materials",
+            "Label clearly",
+            "Take to hazardous waste facility"
+        ]
+    },
+    "textile": {
+        "is_recyclable": True,
+        "disposal_method": "Textile recycling or donation",
+        "environmental_impact": "Takes 200+ years to decompose. Fast fashion increases waste.",
+        "recycling_tips": "Donate if usable, recycle if damaged",
+        "color_code": "#A8E6CF",
+        "preparation_steps": [
+            "Clean and dry items",
+            "Separate by condition",
+            "Remove non-textile parts",
+            "Donate or recycle appropriately"
+        ]
+    },
+    "other": {
+        "is_recyclable": False,
+        "disposal_method": "General waste bin",
+        "environmental_impact": "Varies by material type.",
+        "recycling_tips": "Check local guidelines for specific items",
+        "color_code": "#95A5A6",
+        "preparation_steps": [
+            "Check local recycling guidelines",
+            "Consider if item can be reused",
+            "Separate any recyclable components",
+            "Dispose according to local rules"
+        ]
+    }
+}
+
+def category_row_values(name: str, info: Dict) -> Dict:
+    """Map category guidance onto WasteCategory columns"""
+    return {
+        "name": name,
+        "is_recyclable": info["is_recyclable"],
+        "is_compostable": name == "organic",
+        "is_hazardous": name == "hazardous",
+        "disposal_method": info["disposal_method"],
+        "environmental_impact": info["environmental_impact"],
+        "sorting_tips": info["recycling_tips"],
+        "preparation_steps": json.dumps(info["preparation_steps"]),
+        "color_code": info["color_code"],
+    }
+
+class CategorySnapshot(NamedTuple):
+    """One immutable load of the waste_categories table"""
+    stamp: str
+    ids: Mapping[str, int]
+    names: Mapping[int, str]
+    versions: Mapping[str, int]
+    infos: Mapping[str, Mapping]
+    history: Mapping[Tuple[str, int], Mapping]  # superseded guidance by (name, content version)
+    body: bytes
+    etag: str
+
+def category_info_from_row(category, name: Optional[str] = None) -> Mapping:
+    """Read-only guidance for a category or revision row, falling back to built-in text for blank columns"""
+    defaults = CATEGORY_DEFAULTS.get(name or category.name, CATEGORY_DEFAULTS["other"])
+    steps = json.loads(category.preparation_steps) if category.preparation_steps else defaults["preparation_steps"]
+    return MappingProxyType({
+        "is_recyclable": bool(category.is_recyclable),
+        "disposal_method": category.disposal_method or defaults["disposal_method"],
+        "environmental_impact": category.environmental_impact or defaults["environmental_impact"],
+        "recycling_tips": category.sorting_tips or defaults["recycling_tips"],
+        "color_code": category.color_code or defaults["color_code"],
+        "preparation_steps": tuple(steps),
+    })
+
+def category_revision(category: WasteCategory) -> WasteCategoryRevision:
+    """Copy of a category's current guidance, saved before an edit replaces it"""
+    return WasteCategoryRevision(
+        category_id=category.id,
+        content_version=category.content_version or 1,
+        is_recyclable=category.is_recyclable,
+        disposal_method=category.disposal_method,
+        environmental_impact=category.environmental_impact,
+        sorting_tips=category.sorting_tips,
+        preparation_steps=category.preparation_steps,
+        color_code=category.color_code,
+    )
+
+def _default_infos() -> Dict[str, Mapping]:
+    return {
+        name: MappingProxyType({**info, "preparation_steps": tuple(info["preparation_steps"])})
+        for name, info in CATEGORY_DEFAULTS.items()
+    }
+
+def _build_snapshot(
+    stamp: str, ids: Dict[str, int], versions: Dict[str, int], infos: Dict[str, Mapping],
+    history: Dict[Tuple[str, int], Mapping]
+) -> CategorySnapshot:
+    listing = [
+        {
+            "name": name,
+            "display_name": name.title(),
+            **{key: list(value) if isinstance(value, tuple) else value
+               for key, value in infos.get(name, infos["other"]).items()}
+        }
+        for name in settings.WASTE_CATEGORIES
+    ]
+    body = json.dumps(listing, separators=(",", ":")).encode("utf-8")
+    return CategorySnapshot(
+        stamp=stamp,
+        ids=MappingProxyType(dict(ids)),
+        names=MappingProxyType({category_id: name for name, category_id in ids.items()}),
+        versions=MappingProxyType(dict(versions)),
+        infos=MappingProxyType(dict(infos)),
+        history=MappingProxyType(dict(history)),
+        body=body,
+        etag=f'"{hashlib.sha1(body).hexdigest()}"'
+    )
+
+class CategoryRegistry:
+    """Waste category guidance loaded from the database and held in memory
+    
+    Every load builds a new immutable CategorySnapshot and swaps it in whole,
+    so readers never lock and never see a half-updated table. Writers bump
+    the ``categories_version`` stamp in app_meta; each worker notices the new
+    stamp within CATEGORY_REFRESH_SECONDS and reloads.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = _build_snapshot("", {}, {}, _default_infos(), {})
+        self._checked_at = 0.0
+    
+    @property
+    def snapshot(self) -> CategorySnapshot:
+        return self._snapshot
+    
+    def load(self, db: Session):
+        """Load every category and the current version stamp from the database"""
+        stamp = AppMeta.get(db, CATEGORIES_VERSION_KEY, "0")
+        rows = db.query(WasteCategory).all()
+        names = {row.id: row.name for row in rows}
+        snapshot = _build_snapshot(
+            stamp,
+            {row.name: row.id for row in rows},
+            {row.name: row.content_version for row in rows},
+            {**_default_infos(), **{row.name: category_info_from_row(row) for row in rows}},
+            {
+                (names[revision.category_id], revision.content_version):
+                    category_info_from_row(revision, names[revision.category_id])
+                for revision in db.query(WasteCategoryRevision).all()
+            }
+        )
+        with self._lock:
+            self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+    
+    def refresh_if_stale(self, db: Session) -> bool:
+        """Reload if another worker changed the categories; checks at most once per interval"""
+        now = time.monotonic()
+        if now - self._checked_at < settings.CATEGORY_REFRESH_SECONDS:
+            return False
+        with self._lock:
+            if now - self._checked_at < settings.CATEGORY_REFRESH_SECONDS:
+                return False
+            self._checked_at = now
+        
+        if AppMeta.get(db, CATEGORIES_VERSION_KEY, "0") == self._snapshot.stamp:
+            return False
+        self.load(db)
+        return True
+    
+    def bump_version(self, db: Session) -> str:
+        """Advance the version stamp so every worker reloads (caller commits)"""
+        stamp = str(int(AppMeta.get(db, CATEGORIES_VERSION_KEY, "0")) + 1)
+        AppMeta.set(db, CATEGORIES_VERSION_KEY, stamp)
+        return stamp
+    
+    def category_id(self, name: str) -> Optional[int]:
+        return self._snapshot.ids.get(name)
+    
+    def content_version(self, name: str) -> Optional[int]:
+        return self._snapshot.versions.get(name)
+    
+    def info(self, name: str) -> Mapping:
+        """Disposal guidance for a category name"""
+        infos = self._snapshot.infos
+        return infos.get(name, infos["other"])
+    
+    def info_for_scan(self, category_id: Optional[int], name: str, version: Optional[int] = None) -> Mapping:
+        """Resolve a scan's guidance from its category reference, as of the version it was shown"""
+        snapshot = self._snapshot
+        name = snapshot.names.get(category_id, name)
+        if version is not None and version != snapshot.versions.get(name):
+            info = snapshot.history.get((name, version))
+            if info is not None:
+                return info
+        return self.info(name)
+
+# Global instance
+category_registry = CategoryRegistry()
@@ -0,0 +1,160 @@
+"""
+Community-wide and per-region environmental impact snapshots
+"""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database import SessionLocal, scan_shards
+from app.models.user import User
+from app.models.waste import CommunityImpactSnapshot, ScanDailyRollup, ScanMonthlyRollup
+
+logger = logging.getLogger(__name__)
+
+# Impact factors per item (simplified calculations)
+IMPACT_FACTORS = {
+    "plastic": {"co2": 0.5, "water": 2.0, "trees": 0.001},
+    "paper": {"co2": 0.3, "water": 1.5, "trees": 0.01},
+    "glass": {"co2": 0.2, "water": 0.5, "trees": 0.0},
+    "metal": {"co2": 0.8, "water": 3.0, "trees": 0.002},
+    "organic": {"co2": 0.1, "water": 0.2, "trees": 0.0},
+    "electronic": {"co2": 2.0, "water": 5.0, "trees": 0.005},
+    "hazardous": {"co2": 1.0, "water": 2.0, "trees": 0.001},
+    "textile": {"co2": 0.4, "water": 1.0, "trees": 0.002},
+    "other": {"co2": 0.2, "water": 0.5, "trees": 0.001}
+}
+
+TREND_DAYS = 30
+STREAM_BATCH_SIZE = 10_000
+
+def impact_totals(counts: np.ndarray, categories: List[str]) -> np.ndarray:
+    """Impact of (rows x categories) item counts as (rows x [co2, water, trees, plastic])"""
+    factors = np.array([
+        [IMPACT_FACTORS.get(category, {}).get(name, 0.0) for name in ("co2", "water", "trees")]
+        + [1.0 if category == "plastic" else 0.0]
+        for category in categories
+    ])
+    return counts @ factors
+
+def _regions(db: Session) -> Tuple[np.ndarray, List[str]]:
+    """Region index per user id (-1 without a location) and region names
+
+    Locations are free text, so they are grouped case- and
+    whitespace-insensitively under the first spelling seen.
+    """
+    max_id = db.scalar(select(func.max(User.id))) or 0
+    region_of = np.full(max_id + 1, -1, dtype=np.int64)
+    names: List[str] = []
+    index: Dict[str, int] = {}
+    rows = db.execute(
+        select(User.id, User.location).where(User.location.isnot(None)).execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    for user_id, location in rows:
+        name = " ".join(location.split())
+        if not name:
+            continue
+        key = name.casefold()
+        if key not in index:
+            index[key] = len(names)
+            names.append(name)
+        region_of[user_id] = index[key]
+    return region_of, names
+
+def _user_category_counts(db: Session):
+    """Yield (user_ids, category names, counts) batches of lifetime scans, hot and archived, from every shard"""
+    for shard in range(len(scan_shards.engines)):
+        scan_shards.route_to_shard(db, shard)
+        for model in (ScanDailyRollup, ScanMonthlyRollup):
+            result = db.execute(
+                select(model.user_id, model.detected_category, func.sum(model.scan_count)).group_by(
+                    model.user_id, model.detected_category
+                ).execution_options(yield_per=STREAM_BATCH_SIZE)
+            )
+            for partition in result.partitions():
+                user_ids, categories, counts = zip(*partition)
+                yield np.array(user_ids, dtype=np.int64), categories, np.array(counts, dtype=np.int64)
+
+def _daily_trends(db: Session, categories: List[str], column: Dict[str, int], today) -> dict:
+    """Community scans per category for each of the last TREND_DAYS days"""
+    start = today - timedelta(days=TREND_DAYS - 1)
+    matrix = np.zeros((TREND_DAYS, len(categories)), dtype=np.int64)
+    for shard in range(len(scan_shards.engines)):
+        scan_shards.route_to_shard(db, shard)
+        rows = db.execute(
+            select(ScanDailyRollup.day, ScanDailyRollup.detected_category, func.sum(ScanDailyRollup.scan_count)).where(
+                ScanDailyRollup.day >= start
+            ).group_by(ScanDailyRollup.day, ScanDailyRollup.detected_category)
+        ).all()
+        if rows:
+            days = np.array([(day - start).days for day, _, _ in rows])
+            inside = (days >= 0) & (days < TREND_DAYS)
+            columns = np.array([column.get(category, column["other"]) for _, category, _ in rows])
+            np.add.at(matrix, (days[inside], columns[inside]), np.array([count for _, _, count in rows])[inside])
+    return {
+        "dates": [(start + timedelta(days=offset)).isoformat() for offset in range(TREND_DAYS)],
+        "categories": {category: matrix[:, i].tolist() for i, category in enumerate(categories) if matrix[:, i].any()}
+    }
+
+def _snapshot_rows(region: Optional[str], users: int, counts: np.ndarray, impact: np.ndarray,
+                   categories: List[str], computed_at: datetime) -> dict:
+    return {
+        "region": region,
+        "computed_at": computed_at,
+        "users": int(users),
+        "scan_count": int(counts.sum()),
+        "co2_reduced_kg": round(float(impact[0]), 1),
+        "water_saved_liters": round(float(impact[1]), 1),
+        "trees_saved": round(float(impact[2]), 2),
+        "plastic_items_recycled": int(impact[3]),
+        "category_counts": {category: int(count) for category, count in zip(categories, counts) if count},
+        "daily_trends": None
+    }
+
+def compute_community_impact(db: Session) -> Dict:
+    """Recompute and store the community impact snapshot (commits)
+
+    Per-user category counts are streamed from the rollups of every shard
+    and folded into a regions x categories matrix; impact is one matrix
+    product with the factor table. The previous snapshot is replaced in
+    the same transaction, so readers always see a complete one.
+    """
+    computed_at = datetime.utcnow()
+    categories = list(dict.fromkeys([*settings.WASTE_CATEGORIES, *IMPACT_FACTORS]))
+    column = {category: i for i, category in enumerate(categories)}
+    region_of, regions = _regions(db)
+
+    # Last row collects users without a location
+    region_counts = np.zeros((len(regions) + 1, len(categories)), dtype=np.int64)
+    contributed = np.zeros(len(region_of), dtype=bool)
+    for user_ids, names, counts in _user_category_counts(db):
+        known = user_ids < len(region_of)  # Scans of users created after the region lookup
+        user_ids, counts = user_ids[known], counts[known]
+        columns = np.array([column.get(name, column["other"]) for name in names])[known]
+        np.add.at(region_counts, (region_of[user_ids], columns), counts)
+        np.logical_or.at(contributed, user_ids, counts > 0)
+
+    region_users = np.bincount(region_of[contributed] % (len(regions) + 1), minlength=len(regions) + 1)
+    totals = region_counts.sum(axis=0)
+    impacts = impact_totals(np.vstack([totals, region_counts]).astype(float), categories)
+
+    community = _snapshot_rows(None, contributed.sum(), totals, impacts[0], categories, computed_at)
+    community["daily_trends"] = _daily_trends(db, categories, column, computed_at.date())
+    rows = [community] + [
+        _snapshot_rows(name, region_users[i], region_counts[i], impacts[i + 1], categories, computed_at)
+        for i, name in enumerate(regions) if region_counts[i].any()
+    ]
+
+    db.execute(delete(CommunityImpactSnapshot))
+    db.execute(CommunityImpactSnapshot.__table__.insert(), rows)
+    db.commit()
+    logger.info(f"Community impact: {community['scan_count']} scans, {len(rows) - 1} regions")
+    return {"computed_at": computed_at.isoformat(), "scans": community["scan_count"], "regions": len(rows) - 1}
+
+def refresh_community_impact():
+    """Scheduled job entry point"""
+    with SessionLocal() as db:
+        compute_community_impact(db)
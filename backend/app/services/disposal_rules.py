@@ -0,0 +1,244 @@
+"""
+Region-specific disposal guidance loaded from rule files into a geohash trie
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.services.scan_geo import BASE32, cover_indices, cell_size, encode_geohash
+
+logger = logging.getLogger(__name__)
+
+OVERRIDABLE_FIELDS = ("is_recyclable", "disposal_method", "environmental_impact", "recycling_tips", "preparation_steps")
+TRIE_DEPTH = 9  # matches the geohash stored on scans
+POLYGON_PRECISION = 6  # ~1.2 km x 0.6 km cells
+MAX_POLYGON_CELLS = 20_000
+
+class RegionRules(NamedTuple):
+    name: str
+    source: str
+    categories: Mapping[str, Mapping]
+
+class _TrieNode:
+    __slots__ = ("children", "region")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.region: Optional[RegionRules] = None
+
+class RulesSnapshot(NamedTuple):
+    """One immutable compile of the rule files"""
+    signature: Tuple
+    root: _TrieNode
+    aliases: Mapping[str, RegionRules]
+    regions: List[Dict]
+    errors: List[str]
+    loaded_at: float
+
+def polygon_prefixes(polygon: List[List[float]]) -> List[str]:
+    """Geohash cells whose centers lie inside a [[lat, lon], ...] polygon
+
+    Cells are POLYGON_PRECISION long, or coarser for polygons that would
+    need more than MAX_POLYGON_CELLS of them.
+    """
+    points = np.array(polygon, dtype=float)
+    if points.ndim != 2 or points.shape[1] != 2 or len(points) < 3:
+        raise ValueError("polygon needs at least three [lat, lon] points")
+    box = (points[:, 0].min(), points[:, 1].min(), points[:, 0].max(), points[:, 1].max())
+    precision = POLYGON_PRECISION
+    while precision > 1 and np.prod([len(axis) for axis in cover_indices(box, precision)]) > MAX_POLYGON_CELLS:
+        precision -= 1
+
+    height, width = cell_size(precision)
+    rows, columns = cover_indices(box, precision)
+    lat, lon = np.meshgrid(
+        -90 + (np.array(rows) + 0.5) * height, -180 + (np.array(columns) + 0.5) * width, indexing="ij"
+    )
+    lat, lon = lat.ravel(), lon.ravel()
+
+    # Even-odd ray casting, every cell center against every edge at once
+    inside = np.zeros(len(lat), dtype=bool)
+    start, end = points, np.roll(points, -1, axis=0)
+    for (lat1, lon1), (lat2, lon2) in zip(start, end):
+        if lat1 == lat2:
+            continue
+        crosses = (lat1 > lat) != (lat2 > lat)
+        edge_lon = lon1 + (lat - lat1) * (lon2 - lon1) / (lat2 - lat1)
+        inside ^= crosses & (lon < edge_lon)
+    return merge_prefixes([encode_geohash(a, b, precision) for a, b in zip(lat[inside], lon[inside])])
+
+def merge_prefixes(prefixes: List[str]) -> List[str]:
+    """Replace every complete set of 32 sibling cells by their parent, repeatedly"""
+    cells = set(prefixes)
+    for length in range(max(map(len, cells), default=0), 1, -1):
+        siblings: Dict[str, int] = {}
+        for cell in cells:
+            if len(cell) == length:
+                siblings[cell[:-1]] = siblings.get(cell[:-1], 0) + 1
+        for parent, count in siblings.items():
+            if count == len(BASE32):
+                cells.difference_update(parent + char for char in BASE32)
+                cells.add(parent)
+    return sorted(cells)
+
+def _parse_rule_file(path: str) -> Tuple[RegionRules, List[str], List[str]]:
+    """(rules, geohash prefixes, location aliases) of one rule file; raises ValueError"""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    name = data.get("region") or os.path.splitext(os.path.basename(path))[0]
+    categories = {}
+    for category, overrides in (data.get("categories") or {}).items():
+        unknown = set(overrides) - set(OVERRIDABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown fields for {category}: {', '.join(sorted(unknown))}")
+        if "preparation_steps" in overrides:
+            overrides = {**overrides, "preparation_steps": tuple(overrides["preparation_steps"])}
+        categories[category] = MappingProxyType(dict(overrides))
+    if not categories:
+        raise ValueError("no category overrides")
+
+    prefixes = [prefix.lower() for prefix in data.get("geohashes", [])]
+    invalid = [prefix for prefix in prefixes if not prefix or len(prefix) > TRIE_DEPTH or set(prefix) - set(BASE32)]
+    if invalid:
+        raise ValueError(f"invalid geohash prefixes: {', '.join(invalid)}")
+    if data.get("polygon"):
+        prefixes.extend(polygon_prefixes(data["polygon"]))
+    aliases = [" ".join(alias.split()).casefold() for alias in data.get("locations", [])]
+    if not prefixes and not aliases:
+        raise ValueError("needs geohashes, a polygon or locations")
+    return RegionRules(name, os.path.basename(path), MappingProxyType(categories)), prefixes, aliases
+
+def _rules_signature(paths: List[str]) -> Tuple:
+    signature = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def compile_rules(directory: str) -> RulesSnapshot:
+    """Compile every *.json rule file in a directory; broken files are skipped and reported"""
+    paths = sorted(glob.glob(os.path.join(directory, "*.json")))
+    root = _TrieNode()
+    aliases: Dict[str, RegionRules] = {}
+    regions, errors = [], []
+    for path in paths:
+        try:
+            rules, prefixes, names = _parse_rule_file(path)
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            errors.append(f"{os.path.basename(path)}: {e}")
+            continue
+        for prefix in prefixes:
+            node = root
+            for char in prefix:
+                node = node.children.setdefault(char, _TrieNode())
+            if node.region is not None and node.region.name != rules.name:
+                errors.append(f"{rules.source}: {prefix} already belongs to {node.region.name}, overriding")
+            node.region = rules
+        for alias in names:
+            aliases[alias] = rules
+        regions.append({
+            "region": rules.name,
+            "file": rules.source,
+            "prefixes": len(prefixes),
+            "locations": len(names),
+            "categories": sorted(rules.categories)
+        })
+    for error in errors:
+        logger.warning(f"Disposal rules: {error}")
+    return RulesSnapshot(_rules_signature(paths), root, MappingProxyType(aliases), regions, errors, time.time())
+
+class DisposalRules:
+    """Per-region overrides of category guidance, matched by scan location
+
+    Rule files in DISPOSAL_RULES_DIR are compiled into a trie of geohash
+    prefixes; a lookup walks at most TRIE_DEPTH nodes and the region with
+    the longest matching prefix that overrides the category wins. Scans
+    without coordinates fall back to their free-text location. Files are re-read when their modification times
+    change, checked at most every DISPOSAL_RULES_REFRESH_SECONDS, and the
+    compiled snapshot is swapped in whole.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._snapshot = RulesSnapshot((), _TrieNode(), MappingProxyType({}), [], [], 0.0)
+        self._checked_at = 0.0
+
+    @property
+    def snapshot(self) -> RulesSnapshot:
+        return self._snapshot
+
+    def load(self):
+        snapshot = compile_rules(self.directory)
+        with self._lock:
+            self._snapshot = snapshot
+            self._checked_at = time.monotonic()
+        logger.info(f"Loaded disposal rules for {len(snapshot.regions)} regions")
+
+    def refresh_if_stale(self) -> bool:
+        """Recompile if a rule file was added, changed or removed; checks at most once per interval"""
+        now = time.monotonic()
+        if now - self._checked_at < settings.DISPOSAL_RULES_REFRESH_SECONDS:
+            return False
+        with self._lock:
+            if now - self._checked_at < settings.DISPOSAL_RULES_REFRESH_SECONDS:
+                return False
+            self._checked_at = now
+
+        paths = sorted(glob.glob(os.path.join(self.directory, "*.json")))
+        if _rules_signature(paths) == self._snapshot.signature:
+            return False
+        self.load()
+        return True
+
+    def regions_for(self, latitude: Optional[float], longitude: Optional[float],
+                    location: Optional[str] = None) -> List[RegionRules]:
+        """Regions containing a location, most specific first"""
+        snapshot = self._snapshot
+        found = []
+        geohash = encode_geohash(latitude, longitude, TRIE_DEPTH)
+        if geohash is not None:
+            node = snapshot.root
+            for char in geohash:
+                node = node.children.get(char)
+                if node is None:
+                    break
+                if node.region is not None:
+                    found.append(node.region)
+            found.reverse()
+        if not found and location:
+            alias = snapshot.aliases.get(" ".join(location.split()).casefold())
+            if alias is not None:
+                found.append(alias)
+        return found
+
+    def resolve(self, info: Mapping, category: str, latitude: Optional[float] = None,
+                longitude: Optional[float] = None, location: Optional[str] = None) -> Mapping:
+        """Category guidance with the most specific local overrides applied, and their region's name"""
+        for region in self.regions_for(latitude, longitude, location):
+            overrides = region.categories.get(category)
+            if overrides is not None:
+                return MappingProxyType({**info, **overrides, "region": region.name})
+        return MappingProxyType({**info, "region": None})
+
+    def status(self) -> Dict:
+        snapshot = self._snapshot
+        return {
+            "directory": self.directory,
+            "loaded_at": snapshot.loaded_at or None,
+            "regions": snapshot.regions,
+            "errors": snapshot.errors
+        }
+
+# Global instance
+disposal_rules = DisposalRules(settings.DISPOSAL_RULES_DIR)
@@ -0,0 +1,409 @@
+"""
+Per-period eco point leaderboards with O(log n) rank lookups
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sortedcontainers import SortedList
+from sqlalchemy import event, func, select, true
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database import AsyncSessionLocal
+from app.models.user import EcoPointEvent, User
+
+try:
+    from redis import Redis
+    from redis.exceptions import RedisError
+except ImportError:  # Only needed for LEADERBOARD_BACKEND=redis
+    Redis = None
+    RedisError = OSError
+
+logger = logging.getLogger(__name__)
+
+PERIODS = ("weekly", "monthly", "all_time")
+PENDING_POINTS_KEY = "pending_eco_points"
+ZADD_CHUNK_SIZE = 1000
+# Awards held per board while it is stale; a recount only needs the ones committed after it started
+PENDING_AWARDS_LIMIT = 10_000
+
+Entry = Tuple[int, int]  # (user_id, points)
+Award = Tuple[int, int, int]  # (event id, user_id, points)
+
+# Boards are recounted while awards keep arriving. Awards are held while a
+# board is stale and, on replace, those with an event id above the highest
+# id the recount saw (its watermark) are added on top. The watermark stays
+# with the board, so an award committed before the recount but recorded
+# after it is not counted twice.
+
+def period_key(period: str, when: datetime) -> str:
+    """Board for the calendar week (ISO) or month containing `when`, or the all-time board"""
+    if period == "weekly":
+        year, week, _ = when.isocalendar()
+        return f"weekly:{year}-W{week:02d}"
+    if period == "monthly":
+        return f"monthly:{when:%Y-%m}"
+    return "all_time"
+
+def period_start(period: str, now: datetime) -> Optional[datetime]:
+    midnight = datetime(now.year, now.month, now.day)
+    if period == "weekly":
+        return midnight - timedelta(days=now.weekday())
+    if period == "monthly":
+        return midnight.replace(day=1)
+    return None
+
+class RankedScores:
+    """Scores kept in rank order: best score first, ties by lower user id"""
+
+    def __init__(self, scores: Optional[Dict[int, int]] = None):
+        self._scores: Dict[int, int] = dict(scores or {})
+        self._order = SortedList((-score, member) for member, score in self._scores.items())
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def increment(self, member: int, points: int):
+        score = self._scores.get(member)
+        if score is not None:
+            self._order.remove((-score, member))
+        score = (score or 0) + points
+        self._scores[member] = score
+        self._order.add((-score, member))
+
+    def rank(self, member: int) -> Optional[Tuple[int, int]]:
+        """(0-based position, score), or None if the member has no points"""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        return self._order.index((-score, member)), score
+
+    def range(self, start: int, stop: int) -> List[Entry]:
+        return [(member, -negated) for negated, member in self._order[max(start, 0):stop]]
+
+class MemoryLeaderboardStore:
+    """Boards held in this process; other workers' awards appear at the next rebuild"""
+
+    blocking = False
+
+    def __init__(self, rebuild_seconds: float):
+        self.rebuild_seconds = rebuild_seconds
+        self._boards: Dict[str, Tuple[float, int, RankedScores]] = {}  # key -> (built at, watermark, scores)
+        self._pending: Dict[str, Deque[Award]] = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, key: str) -> bool:
+        board = self._boards.get(key)
+        return board is not None and time.monotonic() - board[0] < self.rebuild_seconds
+
+    def _drop_other_periods(self, key: str):
+        # Boards of finished weeks and months are no longer read
+        period = key.split(":")[0]
+        for boards in (self._boards, self._pending):
+            for stale in [name for name in boards if name != key and name.split(":")[0] == period]:
+                del boards[stale]
+
+    def is_fresh(self, key: str) -> bool:
+        with self._lock:
+            return self._fresh(key)
+
+    def replace(self, key: str, scores: Dict[int, int], watermark: int):
+        board = RankedScores(scores)
+        with self._lock:
+            if self._fresh(key) and self._boards[key][1] >= watermark:
+                return  # A recount that saw more events finished first
+            for event_id, member, points in self._pending.pop(key, ()):
+                if event_id > watermark:
+                    board.increment(member, points)
+            self._drop_other_periods(key)
+            self._boards[key] = (time.monotonic(), watermark, board)
+
+    def increment(self, key: str, member: int, points: int, event_id: int):
+        with self._lock:
+            if self._fresh(key):
+                _, watermark, board = self._boards[key]
+                if event_id > watermark:  # The recount already counted older events
+                    board.increment(member, points)
+                return
+            if key not in self._pending:
+                self._drop_other_periods(key)
+                self._pending[key] = deque(maxlen=PENDING_AWARDS_LIMIT)
+            self._pending[key].append((event_id, member, points))
+
+    def rank(self, key: str, member: int) -> Optional[Tuple[int, int]]:
+        with self._lock:
+            return self._boards[key][2].rank(member) if key in self._boards else None
+
+    def range(self, key: str, start: int, stop: int) -> List[Entry]:
+        with self._lock:
+            return self._boards[key][2].range(start, stop) if key in self._boards else []
+
+    def count(self, key: str) -> int:
+        with self._lock:
+            return len(self._boards[key][2]) if key in self._boards else 0
+
+# KEYS: board, built marker, watermark, pending awards
+# ARGV: member, points, event id, pending limit
+REDIS_INCREMENT = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    local watermark = redis.call('GET', KEYS[3])
+    if not watermark or tonumber(ARGV[3]) > tonumber(watermark) then
+        redis.call('ZINCRBY', KEYS[1], ARGV[2], ARGV[1])
+    end
+else
+    redis.call('ZADD', KEYS[4], ARGV[3], ARGV[3] .. ':' .. ARGV[1] .. ':' .. ARGV[2])
+    redis.call('ZREMRANGEBYRANK', KEYS[4], 0, -tonumber(ARGV[4]) - 1)
+    redis.call('EXPIRE', KEYS[4], 32 * 86400)
+end
+"""
+
+# KEYS: board, built marker, watermark, pending awards, freshly built board
+# ARGV: watermark, built marker ttl (ms), board ttl (s, 0 = none)
+REDIS_REPLACE = """
+local current = redis.call('GET', KEYS[3])
+if redis.call('EXISTS', KEYS[2]) == 1 and current and tonumber(current) >= tonumber(ARGV[1]) then
+    redis.call('DEL', KEYS[5])
+    return 0
+end
+if redis.call('EXISTS', KEYS[5]) == 1 then
+    redis.call('RENAME', KEYS[5], KEYS[1])
+else
+    redis.call('DEL', KEYS[1])
+end
+for _, award in ipairs(redis.call('ZRANGEBYSCORE', KEYS[4], '(' .. ARGV[1], '+inf')) do
+    local member, points = string.match(award, '^%d+:(%d+):(-?%d+)$')
+    redis.call('ZINCRBY', KEYS[1], points, member)
+end
+redis.call('DEL', KEYS[4])
+redis.call('SET', KEYS[3], ARGV[1])
+if tonumber(ARGV[3]) > 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    redis.call('EXPIRE', KEYS[3], ARGV[3])
+end
+redis.call('SET', KEYS[2], '1', 'PX', ARGV[2])
+return 1
+"""
+
+class RedisLeaderboardStore:
+    """Boards shared by every worker as Redis sorted sets
+
+    A marker key expiring after `rebuild_seconds` triggers the periodic
+    recount from the ledger; replacing a board and holding awards while it
+    is stale run as Lua scripts, so every worker sees one atomic swap. If
+    Redis is unreachable boards fall back to this process. Calls block, so
+    the Leaderboard runs them off the event loop.
+    """
+
+    blocking = True
+
+    def __init__(self, client, rebuild_seconds: float, prefix: str = "leaderboard:"):
+        self.client = client
+        self.rebuild_seconds = rebuild_seconds
+        self.prefix = prefix
+        self._fallback = MemoryLeaderboardStore(rebuild_seconds)
+        self._available = True
+        self._increment_script = client.register_script(REDIS_INCREMENT)
+        self._replace_script = client.register_script(REDIS_REPLACE)
+
+    @classmethod
+    def from_url(cls, url: str, rebuild_seconds: float) -> "RedisLeaderboardStore":
+        if Redis is None:
+            raise RuntimeError("LEADERBOARD_BACKEND=redis needs the redis package (pip install redis)")
+        return cls(Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5), rebuild_seconds)
+
+    def _call(self, name: str, *args):
+        try:
+            result = getattr(self, f"_{name}")(*args)
+        except (RedisError, OSError) as e:
+            if self._available:
+                logger.warning(f"Leaderboard store unavailable, ranking per process: {e}")
+                self._available = False
+            return getattr(self._fallback, name)(*args)
+        if not self._available:
+            logger.info("Leaderboard store reachable again")
+            self._available = True
+        return result
+
+    def is_fresh(self, key: str) -> bool:
+        return self._call("is_fresh", key)
+
+    def replace(self, key: str, scores: Dict[int, int], watermark: int):
+        self._call("replace", key, scores, watermark)
+
+    def increment(self, key: str, member: int, points: int, event_id: int):
+        self._call("increment", key, member, points, event_id)
+
+    def rank(self, key: str, member: int) -> Optional[Tuple[int, int]]:
+        return self._call("rank", key, member)
+
+    def range(self, key: str, start: int, stop: int) -> List[Entry]:
+        return self._call("range", key, start, stop)
+
+    def count(self, key: str) -> int:
+        return self._call("count", key)
+
+    def _is_fresh(self, key: str) -> bool:
+        return bool(self.client.exists(f"{self.prefix}{key}:built"))
+
+    def _keys(self, key: str) -> List[str]:
+        board = self.prefix + key
+        return [board, f"{board}:built", f"{board}:watermark", f"{board}:pending"]
+
+    def _replace(self, key: str, scores: Dict[int, int], watermark: int):
+        building = f"{self.prefix}{key}:building:{uuid.uuid4().hex}"
+        items = list(scores.items())
+        if items:
+            pipe = self.client.pipeline()
+            for start in range(0, len(items), ZADD_CHUNK_SIZE):
+                pipe.zadd(building, dict(items[start:start + ZADD_CHUNK_SIZE]))
+            pipe.execute()
+        # Week and month boards outlive their period only briefly
+        self._replace_script(
+            keys=[*self._keys(key), building],
+            args=[watermark, max(1, int(self.rebuild_seconds * 1000)), 0 if key == "all_time" else 32 * 86400]
+        )
+
+    def _increment(self, key: str, member: int, points: int, event_id: int):
+        self._increment_script(keys=self._keys(key), args=[member, points, event_id, PENDING_AWARDS_LIMIT])
+
+    def _rank(self, key: str, member: int) -> Optional[Tuple[int, int]]:
+        pipe = self.client.pipeline()
+        pipe.zrevrank(self.prefix + key, member)
+        pipe.zscore(self.prefix + key, member)
+        position, score = pipe.execute()
+        return None if position is None else (position, int(score))
+
+    def _range(self, key: str, start: int, stop: int) -> List[Entry]:
+        if stop <= max(start, 0):
+            return []
+        return [
+            (int(member), int(score))
+            for member, score in self.client.zrevrange(self.prefix + key, max(start, 0), stop - 1, withscores=True)
+        ]
+
+    def _count(self, key: str) -> int:
+        return self.client.zcard(self.prefix + key)
+
+class Leaderboard:
+    """Weekly, monthly and all-time rankings of awarded eco points
+
+    Boards are recounted on the primary from eco_point_events when missing
+    or older than LEADERBOARD_REBUILD_SECONDS and incremented as awards are
+    committed in between (see the session hooks below).
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    async def _call(self, name: str, *args):
+        method = getattr(self.store, name)
+        if self.store.blocking:
+            return await run_in_threadpool(method, *args)
+        return method(*args)
+
+    async def _recount(self, period: str, now: datetime) -> Tuple[Dict[int, int], int]:
+        """Points per active user in the period, and the highest event id the count saw"""
+        totals = select(
+            EcoPointEvent.user_id, func.sum(EcoPointEvent.points).label("points")
+        ).join(User, User.id == EcoPointEvent.user_id).where(User.is_active == True).group_by(EcoPointEvent.user_id)
+        start = period_start(period, now)
+        if start is not None:
+            totals = totals.where(EcoPointEvent.created_at >= start)
+        totals = totals.subquery()
+        latest = select(func.max(EcoPointEvent.id).label("watermark")).subquery()
+        # One statement, so the totals and the watermark come from the same snapshot
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(latest.c.watermark, totals.c.user_id, totals.c.points).select_from(
+                    latest.outerjoin(totals, true())
+                )
+            )).all()
+        scores = {user_id: int(points) for _, user_id, points in rows if points}
+        return scores, (rows[0].watermark or 0) if rows else 0
+
+    async def _board(self, period: str) -> str:
+        now = datetime.utcnow()
+        key = period_key(period, now)
+        if not await self._call("is_fresh", key):
+            scores, watermark = await self._recount(period, now)
+            await self._call("replace", key, scores, watermark)
+        return key
+
+    def _increment(self, increments: List[Tuple[str, int, int, int]]):
+        for increment in increments:
+            self.store.increment(*increment)
+
+    def record(self, awards: Iterable[Tuple[int, int, int, datetime]]):
+        """Add committed (event_id, user_id, points, awarded_at) to every board they count towards"""
+        increments = [
+            (period_key(period, awarded_at), user_id, points, event_id)
+            for event_id, user_id, points, awarded_at in awards
+            for period in PERIODS
+        ]
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is not None and self.store.blocking:
+            loop.run_in_executor(None, self._increment, increments)
+        else:
+            self._increment(increments)
+
+    async def top(self, period: str, limit: int) -> List[Tuple[int, int, int]]:
+        """(rank, user_id, points) of the best `limit` users"""
+        key = await self._board(period)
+        entries = await self._call("range", key, 0, limit)
+        return [(rank, user_id, points) for rank, (user_id, points) in enumerate(entries, 1)]
+
+    async def rank(self, period: str, user_id: int) -> Optional[Tuple[int, int]]:
+        """(rank, points) of a user, or None if they earned nothing in the period"""
+        key = await self._board(period)
+        found = await self._call("rank", key, user_id)
+        return None if found is None else (found[0] + 1, found[1])
+
+    async def neighbors(self, period: str, user_id: int, radius: int) -> List[Tuple[int, int, int]]:
+        """(rank, user_id, points) of up to `radius` users either side of a user, including them"""
+        key = await self._board(period)
+        found = await self._call("rank", key, user_id)
+        if found is None:
+            return []
+        start = max(found[0] - radius, 0)
+        entries = await self._call("range", key, start, found[0] + radius + 1)
+        return [(rank, member, points) for rank, (member, points) in enumerate(entries, start + 1)]
+
+    async def participants(self, period: str) -> int:
+        return await self._call("count", await self._board(period))
+
+def _create_store():
+    if settings.LEADERBOARD_BACKEND == "redis":
+        return RedisLeaderboardStore.from_url(settings.REDIS_URL, settings.LEADERBOARD_REBUILD_SECONDS)
+    return MemoryLeaderboardStore(settings.LEADERBOARD_REBUILD_SECONDS)
+
+# Global leaderboard instance
+leaderboard = Leaderboard(_create_store())
+
+# Updates: remember points flushed by a session, add them once committed
+@event.listens_for(Session, "after_flush")
+def _collect_awards(session, flush_context):
+    awards = [
+        (obj.id, obj.user_id, obj.points, obj.created_at)
+        for obj in session.new if isinstance(obj, EcoPointEvent)
+    ]
+    if awards:
+        session.info.setdefault(PENDING_POINTS_KEY, []).extend(awards)
+
+@event.listens_for(Session, "after_commit")
+def _apply_awards(session):
+    awards = session.info.pop(PENDING_POINTS_KEY, None)
+    if awards:
+        leaderboard.record(awards)
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_awards(session, previous_transaction):
+    session.info.pop(PENDING_POINTS_KEY, None)
@@ -0,0 +1,90 @@
+"""
+EXPLAIN-based checks that hot query shapes are served by an index
+"""
+
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+from sqlalchemy import select, func
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import Select
+from app.core.pagination import apply_keyset
+from app.models.waste import ScanDailyRollup, ScanGeoCell, WasteScan
+from app.routers.shop import Order
+from app.routers.smart_card import SmartCard
+from app.routers.diy_projects import DIYProject
+
+def _since() -> datetime:
+    return datetime.utcnow() - timedelta(days=30)
+
+# Representative statements for every per-user and listing query path
+HOT_QUERIES: Dict[str, Callable[[], Select]] = {
+    "scan_history": lambda: select(WasteScan).where(
+        WasteScan.user_id == 1
+    ).order_by(WasteScan.scanned_at.desc()).limit(20),
+    "scan_history_page": lambda: apply_keyset(
+        select(WasteScan).where(WasteScan.user_id == 1),
+        (WasteScan.scanned_at, WasteScan.id),
+        (datetime.utcnow(), 1000),
+        20
+    ),
+    "scan_history_by_category": lambda: select(WasteScan).where(
+        WasteScan.user_id == 1,
+        WasteScan.detected_category == "plastic"
+    ).limit(20),
+    "category_breakdown": lambda: select(
+        ScanDailyRollup.detected_category, func.sum(ScanDailyRollup.scan_count)
+    ).where(ScanDailyRollup.user_id == 1).group_by(ScanDailyRollup.detected_category),
+    "daily_trends": lambda: select(
+        ScanDailyRollup.day, func.sum(ScanDailyRollup.scan_count)
+    ).where(
+        ScanDailyRollup.user_id == 1,
+        ScanDailyRollup.day >= _since().date()
+    ).group_by(ScanDailyRollup.day),
+    "heatmap_cells": lambda: select(
+        func.substr(ScanGeoCell.geohash, 1, 4), ScanGeoCell.detected_category, func.sum(ScanGeoCell.scan_count)
+    ).where(
+        ScanGeoCell.precision == 5,
+        ScanGeoCell.geohash >= "u33",
+        ScanGeoCell.geohash < "u33{"
+    ).group_by(func.substr(ScanGeoCell.geohash, 1, 4), ScanGeoCell.detected_category),
+    "order_history": lambda: select(Order).where(
+        Order.user_id == 1
+    ).order_by(Order.created_at.desc()),
+    "active_smart_card": lambda: select(SmartCard).where(
+        SmartCard.user_id == 1,
+        SmartCard.is_active == True
+    ),
+    "diy_listing": lambda: select(DIYProject).where(
+        DIYProject.is_public == True,
+        DIYProject.is_approved == True
+    ).order_by(DIYProject.created_at.desc()).limit(20),
+    "my_diy_projects": lambda: select(DIYProject).where(
+        DIYProject.user_id == 1
+    ).order_by(DIYProject.created_at.desc()),
+}
+
+def explain(engine: Engine, statement: Select) -> List[str]:
+    """Return the database's plan for a statement, one line per step"""
+    compiled = statement.compile(dialect=engine.dialect)
+    if compiled.positional:
+        params = tuple(compiled.params[name] for name in compiled.positiontup)
+    else:
+        params = compiled.params
+
+    with engine.connect() as connection:
+        if engine.dialect.name == "sqlite":
+            rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+            return [row[-1] for row in rows]
+        if engine.dialect.name == "postgresql":
+            # Empty tables make sequential scans look cheapest; ask whether an index is usable
+            connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        rows = connection.exec_driver_sql(f"EXPLAIN {compiled}", params).all()
+        return [row[0] for row in rows]
+
+def is_full_scan(plan_line: str) -> bool:
+    """Whether a plan line reads a whole table without an index"""
+    line = plan_line.strip()
+    if line.startswith("SCAN "):
+        # SQLite: "SCAN waste_scans" vs "SCAN waste_scans USING INDEX ..."
+        return "USING" not in line
+    return "Seq Scan" in line
@@ -0,0 +1,162 @@
+"""
+Moving scan data between shards when SCAN_SHARD_URLS changes
+"""
+
+import logging
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from app.core.config import settings
+from app.database import (
+    SHARD_BUCKETS, SHARD_MAP_VERSION_KEY, SHARDED_TABLES, SessionLocal, scan_shard_buckets, scan_shards, shard_schema
+)
+from app.models.system import AppMeta
+from app.services.scan_rollups import recount_rollups
+
+logger = logging.getLogger(__name__)
+
+# Keeps IN lists well under driver bind parameter limits
+CHUNK_SIZE = 500
+
+def _chunks(values: Sequence, size: int = CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def _bucket_of(table):
+    return table.c.user_id % SHARD_BUCKETS
+
+def plan_moves(buckets: Sequence[int], shard_count: int) -> Dict[Tuple[int, int], List[int]]:
+    """Buckets to move, grouped by (source, target); bucket b belongs on shard b % shard_count"""
+    moves: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for bucket, shard in enumerate(buckets):
+        if shard != bucket % shard_count:
+            moves[(shard, bucket % shard_count)].append(bucket)
+    return dict(moves)
+
+def _copy_rows(table, source: int, target: int, buckets: List[int], batch_size: int) -> int:
+    """Copy rows in `buckets` from source to target, skipping primary keys already there"""
+    primary_key = list(table.primary_key.columns)
+    lead = primary_key[0]
+    copied = 0
+    with scan_shards.engines[source].connect() as source_conn, scan_shards.engines[target].connect() as target_conn:
+        for chunk in _chunks(buckets):
+            result = source_conn.execute(
+                select(table).where(_bucket_of(table).in_(chunk)).execution_options(yield_per=batch_size)
+            )
+            for partition in result.partitions():
+                rows = [row._asdict() for row in partition]
+                existing = set()
+                for leads in _chunks(sorted({row[lead.name] for row in rows})):
+                    existing.update(
+                        tuple(key) for key in target_conn.execute(select(*primary_key).where(lead.in_(leads)))
+                    )
+                new_rows = [
+                    row for row in rows
+                    if tuple(row[column.name] for column in primary_key) not in existing
+                ]
+                if new_rows:
+                    target_conn.execute(insert(table), new_rows)
+                    target_conn.commit()
+                    copied += len(new_rows)
+    return copied
+
+def _delete_rows(table, shard: int, buckets: List[int]) -> int:
+    deleted = 0
+    with scan_shards.engines[shard].begin() as conn:
+        for chunk in _chunks(buckets):
+            deleted += conn.execute(table.delete().where(_bucket_of(table).in_(chunk))).rowcount
+    return deleted
+
+def _recount_moved_rollups(shard: int, buckets: List[int]):
+    """Daily rollup rows copied before the switch missed later increments; recount them"""
+    with SessionLocal() as db:
+        scan_shards.route_to_shard(db, shard)
+        recount_rollups(db, buckets=buckets)
+        db.commit()
+
+def _switch_map(moves: Dict[Tuple[int, int], List[int]]):
+    """Point moved buckets at their new shard and bump the map version (commits)"""
+    with SessionLocal() as db:
+        for (_, target), buckets in moves.items():
+            for chunk in _chunks(buckets):
+                db.execute(
+                    update(scan_shard_buckets).where(scan_shard_buckets.c.bucket.in_(chunk)).values(shard=target)
+                )
+        version = int(AppMeta.get(db, SHARD_MAP_VERSION_KEY, "0")) + 1
+        AppMeta.set(db, SHARD_MAP_VERSION_KEY, str(version))
+        db.commit()
+        scan_shards.load_map(db)
+
+def reshard(batch_size: int = 5000, dry_run: bool = False, settle_seconds: Optional[float] = None) -> Dict:
+    """Spread scan buckets evenly over every configured shard
+
+    Moved buckets are copied while the old shard keeps serving them, then
+    the map is switched and, once every process has had time to pick up
+    the new map, rows written in between are copied and the originals
+    deleted. Edits to already-copied scans made before the switch (e.g.
+    feedback) stay on the old shard, so run it when traffic is low.
+    """
+    if not scan_shards.enabled:
+        raise RuntimeError("Resharding needs SCAN_SHARD_URLS")
+
+    with SessionLocal() as db:
+        scan_shards.load_map(db)
+    moves = plan_moves(scan_shards.buckets, len(scan_shards.engines))
+    tables = [shard_schema().tables[name] for name in SHARDED_TABLES]
+    report = {
+        "shards": len(scan_shards.engines),
+        "moves": [
+            {"source": source, "target": target, "buckets": len(buckets)}
+            for (source, target), buckets in sorted(moves.items())
+        ],
+    }
+    if dry_run or not moves:
+        for move, ((source, _), buckets) in zip(report["moves"], sorted(moves.items())):
+            scans = tables[0]
+            with scan_shards.engines[source].connect() as conn:
+                move["scans"] = sum(
+                    conn.scalar(select(func.count()).select_from(scans).where(_bucket_of(scans).in_(chunk)))
+                    for chunk in _chunks(buckets)
+                )
+        return report
+
+    for move, ((source, target), buckets) in zip(report["moves"], sorted(moves.items())):
+        move["copied"] = sum(_copy_rows(table, source, target, buckets, batch_size) for table in tables)
+        logger.info(f"Reshard: copied {move['copied']} rows from shard {source} to {target}")
+
+    _switch_map(moves)
+    time.sleep(settings.SHARD_MAP_REFRESH_SECONDS if settle_seconds is None else settle_seconds)
+
+    for move, ((source, target), buckets) in zip(report["moves"], sorted(moves.items())):
+        move["copied"] += sum(_copy_rows(table, source, target, buckets, batch_size) for table in tables)
+        move["deleted"] = sum(_delete_rows(table, source, buckets) for table in tables)
+        _recount_moved_rollups(target, buckets)
+        logger.info(f"Reshard: moved {len(buckets)} buckets from shard {source} to {target}")
+    return report
+
+def shard_report() -> List[Dict]:
+    """Scan counts per shard and rows stored on a shard that does not own their bucket"""
+    with SessionLocal() as db:
+        scan_shards.load_map(db)
+    scans = shard_schema().tables["waste_scans"]
+    report = []
+    for shard, shard_engine in enumerate(scan_shards.engines):
+        entry = {"shard": shard, "url": shard_engine.url.render_as_string(hide_password=True)}
+        try:
+            with shard_engine.connect() as conn:
+                per_bucket = Counter(dict(conn.execute(
+                    select(_bucket_of(scans), func.count()).group_by(_bucket_of(scans))
+                ).all()))
+        except SQLAlchemyError as e:
+            entry["error"] = str(e).splitlines()[0]
+            report.append(entry)
+            continue
+        entry["buckets"] = scan_shards.buckets.count(shard)
+        entry["scans"] = sum(per_bucket.values())
+        entry["misplaced"] = sum(
+            count for bucket, count in per_bucket.items() if scan_shards.buckets[bucket] != shard
+        )
+        report.append(entry)
+    return report
@@ -0,0 +1,128 @@
+"""
+Aggregation of a user's daily scan rollups for the analytics endpoints
+"""
+
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.timing import timed
+from app.models.waste import ScanDailyRollup
+
+CategorySummary = namedtuple(
+    "CategorySummary", ["detected_category", "count", "recent", "feedback", "confirmed"]
+)
+
+def feedback_accuracy(categories: List[CategorySummary]) -> float:
+    """Share of user-confirmed detections among scans with feedback, in percent"""
+    feedback = sum(stat.feedback for stat in categories)
+    confirmed = sum(stat.confirmed for stat in categories)
+    return confirmed / feedback * 100 if feedback else 0.0
+
+class ScanSummary(NamedTuple):
+    categories: List[CategorySummary]
+    # Zero-filled, oldest first; empty unless requested
+    days: np.ndarray
+    daily_counts: np.ndarray
+
+    @property
+    def total(self) -> int:
+        return sum(stat.count for stat in self.categories)
+
+    @property
+    def recent(self) -> int:
+        return sum(stat.recent for stat in self.categories)
+
+    def daily_series(self, days: int) -> List[Tuple[str, int]]:
+        """(YYYY-MM-DD, scans) for the last `days` days, oldest first"""
+        return [
+            (str(day), int(count))
+            for day, count in zip(self.days[-days:], self.daily_counts[-days:])
+        ]
+
+    def monthly_series(self, months: int) -> List[Tuple[str, int]]:
+        """(YYYY-MM, scans) for the last `months` calendar months, oldest first"""
+        if not len(self.days):
+            return []
+        month_index = self.days.astype("datetime64[M]")
+        labels, positions = np.unique(month_index, return_inverse=True)
+        totals = np.bincount(positions, weights=self.daily_counts, minlength=len(labels))
+        return [(str(label), int(total)) for label, total in zip(labels[-months:], totals[-months:])]
+
+def months_back(today: date, months: int) -> date:
+    """First day of the calendar month `months - 1` months before today's"""
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    return date(index // 12, index % 12 + 1, 1)
+
+def fill_days(start: date, end: date, rows) -> Tuple[np.ndarray, np.ndarray]:
+    """Spread (date, count) rows over every day from start to end inclusive"""
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    counts = np.zeros(len(days), dtype=np.int64)
+    if rows:
+        observed = np.array([str(row[0]) for row in rows], dtype="datetime64[D]")
+        offsets = (observed - days[0]).astype(np.int64)
+        inside = (offsets >= 0) & (offsets < len(days))
+        np.add.at(counts, offsets[inside], np.array([row[1] for row in rows], dtype=np.int64)[inside])
+    return days, counts
+
+async def category_summary(db: AsyncSession, user_id: int, recent_days: int = 30) -> List[CategorySummary]:
+    """Per-category totals, recent, feedback and confirmed counts in one grouped query"""
+    recent_since = (datetime.utcnow() - timedelta(days=recent_days)).date()
+    with timed("category_query"):
+        rows = (await db.execute(
+            select(
+                ScanDailyRollup.detected_category,
+                func.sum(ScanDailyRollup.scan_count).label("count"),
+                func.sum(case(
+                    (ScanDailyRollup.day >= recent_since, ScanDailyRollup.scan_count), else_=0
+                )).label("recent"),
+                func.sum(ScanDailyRollup.feedback_count).label("feedback"),
+                func.sum(ScanDailyRollup.confirmed_count).label("confirmed")
+            ).where(
+                ScanDailyRollup.user_id == user_id
+            ).group_by(ScanDailyRollup.detected_category)
+        )).all()
+    return [
+        CategorySummary(row.detected_category, row.count, row.recent or 0, row.feedback or 0, row.confirmed or 0)
+        for row in rows if row.count
+    ]
+
+async def daily_counts(db: AsyncSession, user_id: int, since: date) -> Tuple[np.ndarray, np.ndarray]:
+    """Scans per day from `since` through today in one grouped query, zero-filled"""
+    today = datetime.utcnow().date()
+    with timed("time_series_query"):
+        rows = (await db.execute(
+            select(ScanDailyRollup.day, func.sum(ScanDailyRollup.scan_count)).where(
+                ScanDailyRollup.user_id == user_id,
+                ScanDailyRollup.day >= since
+            ).group_by(ScanDailyRollup.day)
+        )).all()
+    return fill_days(since, today, rows)
+
+async def scan_summary(
+    db: AsyncSession,
+    user_id: int,
+    days: int = 0,
+    months: int = 0,
+    recent_days: int = 30
+) -> ScanSummary:
+    """Category breakdown, recent activity, accuracy and daily/monthly series
+
+    Two grouped queries over waste_scan_daily_rollups at most, so the cost
+    follows the date range rather than the number of scans; the day query
+    is skipped when neither series is requested. The caller routes `db` to the user's shard.
+    """
+    categories = await category_summary(db, user_id, recent_days)
+    since: Optional[date] = None
+    today = datetime.utcnow().date()
+    if days:
+        since = today - timedelta(days=days - 1)
+    if months:
+        month_start = months_back(today, months)
+        since = min(since, month_start) if since else month_start
+    if since is None:
+        empty = np.array([], dtype="datetime64[D]")
+        return ScanSummary(categories, empty, np.array([], dtype=np.int64))
+    return ScanSummary(categories, *await daily_counts(db, user_id, since))
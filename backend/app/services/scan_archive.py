@@ -0,0 +1,267 @@
+"""
+Retention for waste_scans: monthly Parquet cold storage with rollups kept hot
+"""
+
+import glob
+import json
+import logging
+import os
+import uuid
+from collections import Counter, defaultdict, namedtuple
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import Boolean, DateTime, Float, Integer, JSON, Table, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.database import scan_shards
+from app.models.system import AppMeta
+from app.models.waste import WasteScan, ScanMonthlyRollup
+from app.services.scan_geo import add_cell_counts, cell_deltas
+from app.services.scan_rollups import recount_rollups
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Only needed to archive or read archived scans
+    pa = ds = pq = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_CUTOFF_KEY = "scan_archive_cutoff"
+ROLLUP_LOOKUP_CHUNK_SIZE = 500
+DELETE_CHUNK_SIZE = 500
+
+CategoryCount = namedtuple("CategoryCount", ["detected_category", "count"])
+DailyCount = namedtuple("DailyCount", ["date", "count"])
+CategoryDailyCount = namedtuple("CategoryDailyCount", ["detected_category", "date", "count"])
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Scan archival needs pyarrow (pip install pyarrow)")
+
+def archive_root() -> str:
+    return os.path.join(settings.ARCHIVE_DIR, "waste_scans")
+
+def archive_cutoff(retention_days: int, now: Optional[datetime] = None) -> datetime:
+    """Start of the month containing the retention boundary; only whole months are archived"""
+    boundary = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    return datetime(boundary.year, boundary.month, 1)
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def arrow_schema(table: Table):
+    """Arrow schema mirroring a table's columns"""
+    fields = []
+    for column in table.columns:
+        if isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()  # strings, text and JSON (serialized)
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+def arrow_row(table: Table, row) -> dict:
+    values = {}
+    for column in table.columns:
+        value = getattr(row, column.name)
+        if isinstance(column.type, JSON) and value is not None:
+            value = json.dumps(value)
+        elif isinstance(column.type, DateTime):
+            value = _naive_utc(value)
+        values[column.name] = value
+    return values
+
+def _merge_rollups(db: Session, counts: Dict[Tuple[int, str, str], List[int]]):
+    """Add archived counts into the monthly rollup table (caller commits)"""
+    user_ids = sorted({user_id for user_id, _, _ in counts})
+    months = sorted({month for _, month, _ in counts})
+    existing = {}
+    for start in range(0, len(user_ids), ROLLUP_LOOKUP_CHUNK_SIZE):
+        for rollup in db.query(ScanMonthlyRollup).filter(
+            ScanMonthlyRollup.user_id.in_(user_ids[start:start + ROLLUP_LOOKUP_CHUNK_SIZE]),
+            ScanMonthlyRollup.month.in_(months)
+        ):
+            existing[(rollup.user_id, rollup.month, rollup.detected_category)] = rollup
+
+    for key, (scans, confirmed, corrected) in counts.items():
+        rollup = existing.get(key)
+        if rollup is None:
+            user_id, month, category = key
+            db.add(ScanMonthlyRollup(
+                user_id=user_id, month=month, detected_category=category,
+                scan_count=scans, confirmed_count=confirmed, corrected_count=corrected
+            ))
+        else:
+            rollup.scan_count += scans
+            rollup.confirmed_count += confirmed
+            rollup.corrected_count += corrected
+
+def archive_scans(db: Session, retention_days: Optional[int] = None, batch_size: int = 10_000) -> Dict:
+    """Move scans from months older than the retention window into Parquet files
+
+    Each run writes one new part file per month and shard under
+    ``ARCHIVE_DIR/waste_scans/month=YYYY-MM/``, adds the archived counts to
+    waste_scan_monthly_rollups, deletes the archived rows and recounts the
+    daily rollups of archived days in the same transaction, one shard at a
+    time. Rows are bounded by the highest id
+    seen up front and deleted by id, so scans ingested with old timestamps
+    mid-run are left for the next run.
+    """
+    _require_pyarrow()
+    retention_days = settings.SCAN_RETENTION_DAYS if retention_days is None else retention_days
+    cutoff = archive_cutoff(retention_days)
+    archived, months = 0, set()
+    for shard in range(len(scan_shards.engines)):
+        scan_shards.route_to_shard(db, shard)
+        shard_archived, shard_months = _archive_shard(db, cutoff, batch_size)
+        archived += shard_archived
+        months.update(shard_months)
+
+    logger.info(f"Archived {archived} scans older than {cutoff.date()} into {len(months)} months")
+    return {"cutoff": cutoff.date().isoformat(), "archived": archived, "months": sorted(months)}
+
+def _archive_shard(db: Session, cutoff: datetime, batch_size: int) -> Tuple[int, List[str]]:
+    """Archive the scans on the shard the session is routed to (commits)"""
+    max_id = db.scalar(select(func.max(WasteScan.id)).where(WasteScan.scanned_at < cutoff))
+    if max_id is None:
+        return 0, []
+
+    table = WasteScan.__table__
+    schema = arrow_schema(table)
+    part_name = f"part-{uuid.uuid4().hex}.parquet"
+    writers: Dict[str, Tuple[str, object]] = {}
+    counts: Dict[Tuple[int, str, str], List[int]] = defaultdict(lambda: [0, 0, 0])
+    archived_ids: List[int] = []
+    located: List[Tuple[str, str]] = []
+
+    try:
+        result = db.execute(
+            select(table).where(
+                table.c.scanned_at < cutoff, table.c.id <= max_id
+            ).order_by(table.c.id).execution_options(yield_per=batch_size)
+        )
+        for partition in result.partitions():
+            by_month = defaultdict(list)
+            for row in partition:
+                month = _naive_utc(row.scanned_at).strftime("%Y-%m")
+                by_month[month].append(arrow_row(table, row))
+                rollup = counts[(row.user_id, month, row.detected_category)]
+                rollup[0] += 1
+                rollup[1] += row.user_confirmed is True
+                rollup[2] += row.user_correction is not None
+                archived_ids.append(row.id)
+                if row.geohash:
+                    located.append((row.geohash, row.detected_category))
+            for month, rows in by_month.items():
+                if month not in writers:
+                    path = os.path.join(archive_root(), f"month={month}", part_name)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    writers[month] = (path, pq.ParquetWriter(path + ".tmp", schema))
+                writers[month][1].write_table(pa.Table.from_pylist(rows, schema=schema))
+
+        for path, writer in writers.values():
+            writer.close()
+            # Readers ignore .tmp files and drop duplicate ids, so a crash
+            # before commit at worst re-archives rows that are still hot
+            os.replace(path + ".tmp", path)
+
+        _merge_rollups(db, counts)
+        for start in range(0, len(archived_ids), DELETE_CHUNK_SIZE):
+            db.execute(table.delete().where(table.c.id.in_(archived_ids[start:start + DELETE_CHUNK_SIZE])))
+        # Archived days are counted by the monthly rollups from now on
+        recount_rollups(db, before=cutoff.date())
+        # Heatmaps cover the retention window only
+        add_cell_counts(db, cell_deltas(located, sign=-1))
+        previous = AppMeta.get(db, ARCHIVE_CUTOFF_KEY)
+        if previous is None or previous < cutoff.date().isoformat():
+            AppMeta.set(db, ARCHIVE_CUTOFF_KEY, cutoff.date().isoformat())
+        db.commit()
+    except Exception:
+        db.rollback()
+        for path, writer in writers.values():
+            writer.close()
+            for leftover in (path, path + ".tmp"):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        raise
+
+    return len(archived_ids), list(writers)
+
+async def get_archive_cutoff(db: AsyncSession) -> Optional[date]:
+    """First day still kept in waste_scans, or None if nothing was archived"""
+    entry = await db.get(AppMeta, ARCHIVE_CUTOFF_KEY)
+    return date.fromisoformat(entry.value) if entry is not None else None
+
+async def archived_category_counts(db: AsyncSession, user_id: int) -> Dict[str, int]:
+    """Archived scans per category for a user, from the rollups"""
+    rows = (await db.execute(
+        select(
+            ScanMonthlyRollup.detected_category,
+            func.sum(ScanMonthlyRollup.scan_count).label("count")
+        ).where(
+            ScanMonthlyRollup.user_id == user_id
+        ).group_by(ScanMonthlyRollup.detected_category)
+    )).all()
+    return {row.detected_category: row.count for row in rows}
+
+async def archived_monthly_counts(db: AsyncSession, user_id: int) -> Dict[str, int]:
+    """Archived scans per YYYY-MM month for a user, from the rollups"""
+    rows = (await db.execute(
+        select(
+            ScanMonthlyRollup.month,
+            func.sum(ScanMonthlyRollup.scan_count).label("count")
+        ).where(
+            ScanMonthlyRollup.user_id == user_id
+        ).group_by(ScanMonthlyRollup.month)
+    )).all()
+    return {row.month: row.count for row in rows}
+
+def merge_category_counts(stats: Iterable, archived: Dict[str, int]) -> List[CategoryCount]:
+    """Combine hot per-category counts with archived ones"""
+    totals = dict(archived)
+    for stat in stats:
+        totals[stat.detected_category] = totals.get(stat.detected_category, 0) + stat.count
+    return [CategoryCount(category, count) for category, count in totals.items()]
+
+def read_archived_scans(user_id: int, start: datetime, end: datetime, columns: List[str]) -> List[dict]:
+    """Read a user's archived scans in [start, end) from the Parquet files"""
+    _require_pyarrow()
+    months = [
+        path for path in glob.glob(os.path.join(archive_root(), "month=*"))
+        if start.strftime("%Y-%m") <= path.rsplit("=", 1)[-1] <= end.strftime("%Y-%m")
+    ]
+    files = [path for month in months for path in glob.glob(os.path.join(month, "*.parquet"))]
+    if not files:
+        return []
+
+    dataset = ds.dataset(files, format="parquet", schema=arrow_schema(WasteScan.__table__))
+    table = dataset.to_table(
+        columns=sorted({"id", *columns}),
+        filter=(ds.field("user_id") == user_id)
+        & (ds.field("scanned_at") >= pa.scalar(start, pa.timestamp("us")))
+        & (ds.field("scanned_at") < pa.scalar(end, pa.timestamp("us")))
+    )
+    # A run interrupted before commit can leave a second copy of some rows
+    unique = {row["id"]: row for row in table.to_pylist()}
+    return list(unique.values())
+
+def archived_daily_counts(user_id: int, start: datetime, end: datetime) -> Tuple[List[DailyCount], List[CategoryDailyCount]]:
+    """Per-day and per-day-per-category counts of a user's archived scans"""
+    scans = read_archived_scans(user_id, start, end, ["detected_category", "scanned_at"])
+    daily = Counter(scan["scanned_at"].date().isoformat() for scan in scans)
+    by_category = Counter((scan["detected_category"], scan["scanned_at"].date().isoformat()) for scan in scans)
+    return (
+        [DailyCount(day, count) for day, count in sorted(daily.items())],
+        [CategoryDailyCount(category, day, count) for (category, day), count in sorted(by_category.items())]
+    )
@@ -0,0 +1,229 @@
+"""
+Geohash bucketing of scan locations and per-cell counts for heatmaps
+"""
+
+import logging
+import math
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, bindparam, func, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.core.timing import timed
+from app.database import scan_shards
+from app.models.waste import ScanGeoCell, WasteScan
+
+logger = logging.getLogger(__name__)
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+SCAN_GEOHASH_PRECISION = 9  # ~5 m, stored on every located scan
+CELL_PRECISIONS = (3, 5, 7)  # ~156 km, ~4.9 km and ~153 m cells kept in scan_geo_cells
+MAX_COVER_PREFIXES = 32
+STREAM_BATCH_SIZE = 10_000
+
+CellKey = Tuple[int, str, str]  # (precision, geohash, detected_category)
+Bounds = Tuple[float, float, float, float]  # (min_lat, min_lon, max_lat, max_lon)
+
+def encode_geohash(latitude: Optional[float], longitude: Optional[float], precision: int = SCAN_GEOHASH_PRECISION) -> Optional[str]:
+    """Geohash of a point, or None without a valid location"""
+    if latitude is None or longitude is None:
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        interval, point = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (interval[0] + interval[1]) / 2
+        value <<= 1
+        if point >= middle:
+            value |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits, value = 0, 0
+    return "".join(chars)
+
+def cell_size(precision: int) -> Tuple[float, float]:
+    """(height, width) of a cell in degrees"""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+def bounds(geohash: str) -> Bounds:
+    """(min_lat, min_lon, max_lat, max_lon) of a cell"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            interval = lon_range if even else lat_range
+            middle = (interval[0] + interval[1]) / 2
+            if value >> shift & 1:
+                interval[0] = middle
+            else:
+                interval[1] = middle
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+def cover_indices(box: Bounds, precision: int) -> Tuple[range, range]:
+    """Row and column ranges of the cells of a precision overlapping a bounding box"""
+    height, width = cell_size(precision)
+    rows, columns = round(180 / height), round(360 / width)
+    min_lat, min_lon, max_lat, max_lon = box
+    return (
+        range(max(int((min_lat + 90) // height), 0), min(int((max_lat + 90) // height), rows - 1) + 1),
+        range(max(int((min_lon + 180) // width), 0), min(int((max_lon + 180) // width), columns - 1) + 1)
+    )
+
+def cover(box: Bounds, precision: int) -> List[str]:
+    """Cells of a precision overlapping a bounding box"""
+    height, width = cell_size(precision)
+    rows, columns = cover_indices(box, precision)
+    return [
+        encode_geohash(-90 + (row + 0.5) * height, -180 + (column + 0.5) * width, precision)
+        for row in rows for column in columns
+    ]
+
+def zoom_precision(zoom: int) -> int:
+    """Geohash precision giving a few pixels per cell at a web map zoom level"""
+    return min(max((zoom + 2) // 2, 1), CELL_PRECISIONS[-1])
+
+def _prefix_range(column, prefix: str):
+    # "{" sorts right after "z", the last geohash character
+    return and_(column >= prefix, column < prefix + "{")
+
+def add_cell_counts(db: Session, deltas: Dict[CellKey, int]):
+    """Add scan count deltas to cells, creating missing ones (caller commits)"""
+    table = ScanGeoCell.__table__
+    for (precision, geohash, category), delta in deltas.items():
+        if not delta:
+            continue
+        increment = update(table).where(
+            table.c.precision == precision, table.c.geohash == geohash, table.c.detected_category == category
+        ).values(scan_count=table.c.scan_count + delta)
+        if db.execute(increment).rowcount:
+            continue
+        if delta < 0:
+            logger.warning(f"No geo cell for {(precision, geohash, category)}; run `python manage.py rebuild-geo-cells`")
+            continue
+        try:
+            with db.begin_nested():
+                db.execute(insert(table).values(
+                    precision=precision, geohash=geohash, detected_category=category, scan_count=delta
+                ))
+        except IntegrityError:
+            # A concurrent request created the cell first
+            db.execute(increment)
+
+def cell_deltas(located: Iterable[Tuple[Optional[str], str]], sign: int = 1) -> Dict[CellKey, int]:
+    """Count (geohash, category) pairs into every cell precision"""
+    deltas: Dict[CellKey, int] = defaultdict(int)
+    for geohash, category in located:
+        if geohash:
+            for precision in CELL_PRECISIONS:
+                deltas[(precision, geohash[:precision], category)] += sign
+    return deltas
+
+def record_scan_cell(db: Session, scan: WasteScan, sign: int = 1):
+    """Count a stored (sign=1) or deleted (sign=-1) scan in its cells (caller commits)"""
+    add_cell_counts(db, cell_deltas([(scan.geohash, scan.detected_category)], sign))
+
+def record_new_scan_cells(db: Session, rows: Iterable[dict]):
+    """Count freshly inserted waste_scans rows, one update per cell (caller commits)"""
+    add_cell_counts(db, cell_deltas((row["geohash"], row["detected_category"]) for row in rows))
+
+def rebuild_geo_cells(db: Session) -> Dict[str, int]:
+    """Fill in missing scan geohashes and recount scan_geo_cells from waste_scans on every shard (commits)"""
+    table = WasteScan.__table__
+    located, counts = 0, defaultdict(int)
+    for shard in range(len(scan_shards.engines)):
+        scan_shards.route_to_shard(db, shard)
+        missing = db.execute(
+            select(table.c.id, table.c.latitude, table.c.longitude).where(
+                table.c.geohash.is_(None), table.c.latitude.isnot(None), table.c.longitude.isnot(None)
+            ).execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+        updates = [
+            {"scan_id": scan_id, "scan_geohash": geohash}
+            for scan_id, latitude, longitude in missing
+            if (geohash := encode_geohash(latitude, longitude))
+        ]
+        set_geohash = update(table).where(table.c.id == bindparam("scan_id")).values(geohash=bindparam("scan_geohash"))
+        for start in range(0, len(updates), STREAM_BATCH_SIZE):
+            db.execute(set_geohash, updates[start:start + STREAM_BATCH_SIZE])
+        located += len(updates)
+        db.commit()
+        for precision in CELL_PRECISIONS:
+            prefix = func.substr(table.c.geohash, 1, precision)
+            for geohash, category, count in db.execute(
+                select(prefix, table.c.detected_category, func.count()).where(
+                    table.c.geohash.isnot(None)
+                ).group_by(prefix, table.c.detected_category)
+            ):
+                counts[(precision, geohash, category)] += count
+
+    cells = ScanGeoCell.__table__
+    db.execute(cells.delete())
+    rows = [
+        {"precision": precision, "geohash": geohash, "detected_category": category, "scan_count": count}
+        for (precision, geohash, category), count in counts.items()
+    ]
+    for start in range(0, len(rows), STREAM_BATCH_SIZE):
+        db.execute(insert(cells), rows[start:start + STREAM_BATCH_SIZE])
+    db.commit()
+    logger.info(f"Geohashed {located} scans and rebuilt {len(rows)} geo cells")
+    return {"geohashed": located, "cells": len(rows)}
+
+async def heatmap_cells(db: AsyncSession, box: Bounds, precision: int,
+                        category: Optional[str] = None, min_count: int = 1) -> List[Dict]:
+    """Scan counts per cell of `precision` overlapping a bounding box, read from scan_geo_cells
+
+    Counts come from the smallest stored cell precision at least as fine
+    as requested, summed per prefix; the box is matched by a few geohash
+    prefix ranges so the query stays on the primary key index.
+    """
+    level = next(stored for stored in CELL_PRECISIONS if stored >= precision)
+    cover_precision = precision
+    while cover_precision > 1 and math.prod(len(axis) for axis in cover_indices(box, cover_precision)) > MAX_COVER_PREFIXES:
+        cover_precision -= 1
+    prefixes = cover(box, cover_precision)
+
+    cells = ScanGeoCell.__table__
+    prefix = func.substr(cells.c.geohash, 1, precision)
+    query = select(prefix, cells.c.detected_category, func.sum(cells.c.scan_count)).where(
+        cells.c.precision == level,
+        or_(*[_prefix_range(cells.c.geohash, cover_prefix) for cover_prefix in prefixes])
+    ).group_by(prefix, cells.c.detected_category)
+    if category is not None:
+        query = query.where(cells.c.detected_category == category)
+    with timed("heatmap_query"):
+        rows = (await db.execute(query)).all()
+
+    by_cell: Dict[str, Dict[str, int]] = defaultdict(dict)
+    for geohash, detected_category, count in rows:
+        if count:
+            by_cell[geohash][detected_category] = int(count)
+    min_lat, min_lon, max_lat, max_lon = box
+    result = []
+    for geohash, categories in by_cell.items():
+        total = sum(categories.values())
+        cell_bounds = bounds(geohash)
+        # Cover prefixes can be coarser than the box
+        if total < min_count or cell_bounds[0] > max_lat or cell_bounds[2] < min_lat \
+                or cell_bounds[1] > max_lon or cell_bounds[3] < min_lon:
+            continue
+        result.append({
+            "geohash": geohash,
+            "latitude": round((cell_bounds[0] + cell_bounds[2]) / 2, 6),
+            "longitude": round((cell_bounds[1] + cell_bounds[3]) / 2, 6),
+            "bounds": [round(value, 6) for value in cell_bounds],
+            "count": total,
+            "categories": categories
+        })
+    result.sort(key=lambda cell: -cell["count"])
+    return result
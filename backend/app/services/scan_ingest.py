@@ -0,0 +1,252 @@
+"""
+Bulk ingestion of buffered scans from kiosks and offline clients
+"""
+
+import base64
+import binascii
+import logging
+import os
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.timing import timed
+from app.database import scan_shards
+from app.models.user import User
+from app.models.waste import WasteScan
+from app.services.ai_detection import waste_detector
+from app.services.category_registry import category_registry
+from app.services.disposal_rules import disposal_rules
+from app.services.scan_geo import encode_geohash, record_new_scan_cells
+from app.services.scan_rollups import record_new_scans
+from app.services.seed import bulk_insert
+
+logger = logging.getLogger(__name__)
+
+ScanKey = Tuple[int, str]  # (user_id, client_scan_id)
+
+# Keeps IN lists well under driver bind parameter limits
+LOOKUP_CHUNK_SIZE = 500
+# Inserts per shard before giving up on keys that keep colliding with concurrent uploads
+INSERT_ATTEMPTS = 3
+
+def _scanned_at(value: Optional[datetime]) -> datetime:
+    """Normalize a client timestamp to naive UTC, never in the future"""
+    now = datetime.utcnow()
+    if value is None:
+        return now
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return min(value, now)
+
+def _save_image(image_base64: str, filename: Optional[str]) -> Tuple[str, int]:
+    """Decode a base64 image into the upload directory and return its path and size"""
+    try:
+        content = base64.b64decode(image_base64, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("Image is not valid base64")
+    if len(content) > settings.MAX_IMAGE_SIZE:
+        raise ValueError(f"Image too large. Maximum size is {settings.MAX_IMAGE_SIZE / (1024*1024):.1f}MB")
+
+    file_extension = (filename or "image.jpg").split('.')[-1].lower()
+    if file_extension not in ("jpg", "jpeg", "png"):
+        raise ValueError("Invalid file type. Only JPEG and PNG images are allowed.")
+
+    file_path = os.path.join(settings.UPLOAD_DIR, "waste_images", f"{uuid.uuid4()}.{file_extension}")
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "wb") as f:
+        f.write(content)
+    return file_path, len(content)
+
+def _scan_row(record, user_id: int) -> dict:
+    """Build a waste_scans row, classifying the image when the client did not"""
+    image_path, image_size, alternatives = None, None, None
+    if record.image_base64:
+        image_path, image_size = _save_image(record.image_base64, record.image_filename)
+
+    try:
+        if record.detected_category:
+            if record.detected_category not in settings.WASTE_CATEGORIES:
+                raise ValueError(f"Unknown category '{record.detected_category}'")
+            if record.confidence_score is None:
+                raise ValueError("confidence_score is required for pre-classified scans")
+            category, confidence = record.detected_category, record.confidence_score
+        elif image_path:
+            detection = waste_detector.detect_waste(image_path)
+            category, confidence = detection["detected_category"], detection["confidence_score"]
+            alternatives = detection["alternatives"]
+        else:
+            raise ValueError("Either detected_category or image_base64 is required")
+    except Exception as e:
+        if image_path and os.path.exists(image_path):
+            os.remove(image_path)
+        if isinstance(e, ValueError):
+            raise
+        raise ValueError(f"Error processing image: {str(e)}") from e
+
+    image_filename = os.path.basename(image_path) if image_path else ""
+    return {
+        "user_id": user_id,
+        "client_scan_id": record.client_scan_id,
+        # Pre-classified scans from kiosks may arrive without an image
+        "image_url": f"/uploads/waste_images/{image_filename}" if image_path else "",
+        "image_filename": image_filename,
+        "image_size": image_size,
+        "detected_category": category,
+        "confidence_score": confidence,
+        "alternative_categories": alternatives,
+        "is_recyclable": disposal_rules.resolve(
+            category_registry.info(category), category, record.latitude, record.longitude, record.location
+        )["is_recyclable"],
+        "category_id": category_registry.category_id(category),
+        "category_version": category_registry.content_version(category),
+        "scan_location": record.location,
+        "latitude": record.latitude,
+        "longitude": record.longitude,
+        "geohash": encode_geohash(record.latitude, record.longitude),
+        "scanned_at": _scanned_at(record.scanned_at),
+    }
+
+def _remove_image(row: dict):
+    if row["image_filename"]:
+        path = os.path.join(settings.UPLOAD_DIR, "waste_images", row["image_filename"])
+        if os.path.exists(path):
+            os.remove(path)
+
+def _by_shard(keys: Iterable[ScanKey]) -> Dict[int, List[ScanKey]]:
+    shards: Dict[int, List[ScanKey]] = {}
+    for key in keys:
+        shards.setdefault(scan_shards.shard_for(key[0]), []).append(key)
+    return shards
+
+def _stored_scan_ids(db: Session, keys: Iterable[ScanKey]) -> Dict[ScanKey, int]:
+    """Scan ids already stored for (user_id, client_scan_id) keys, on each user's shard"""
+    stored = {}
+    for shard, shard_keys in _by_shard(keys).items():
+        scan_shards.route_to_shard(db, shard)
+        by_user: Dict[int, List[str]] = {}
+        for user_id, client_scan_id in shard_keys:
+            by_user.setdefault(user_id, []).append(client_scan_id)
+        for user_id, client_scan_ids in by_user.items():
+            for start in range(0, len(client_scan_ids), LOOKUP_CHUNK_SIZE):
+                rows = db.execute(
+                    select(WasteScan.id, WasteScan.client_scan_id).where(
+                        WasteScan.user_id == user_id,
+                        WasteScan.client_scan_id.in_(client_scan_ids[start:start + LOOKUP_CHUNK_SIZE])
+                    )
+                ).all()
+                stored.update({(user_id, row.client_scan_id): row.id for row in rows})
+    return stored
+
+def _insert_scans(db: Session, shard: int, rows: List[dict], users: Dict[int, User], earning: Set[ScanKey]):
+    """Insert one shard's rows with batched executemany and apply per-user stats once (commits)
+
+    Only scans in `earning` award eco points.
+    """
+    scan_shards.route_to_shard(db, shard)
+    scan_ids = scan_shards.allocate_scan_ids(len(rows))
+    if scan_ids:
+        rows = [{**row, "id": scan_id} for row, scan_id in zip(rows, scan_ids)]
+    with timed("db_insert"):
+        bulk_insert(db, WasteScan, rows)
+        record_new_scans(db, rows)
+        record_new_scan_cells(db, rows)
+
+    earned = Counter(row["user_id"] for row in rows if (row["user_id"], row["client_scan_id"]) in earning)
+    for user_id, scans in Counter(row["user_id"] for row in rows).items():
+        user = users[user_id]
+        user.total_scans += scans
+        user.add_eco_points(settings.POINTS_PER_SCAN * earned[user_id], "bulk_scan")
+
+    with timed("db_commit"):
+        db.commit()
+
+def ingest_scans(db: Session, records: List, default_user_id: int) -> Dict:
+    """Store buffered scans idempotently, returning one result per record in order
+
+    Records are keyed by (user_id, client_scan_id); keys already stored,
+    or repeated within the batch, are reported as duplicates, so clients
+    can safely resend a whole buffer after a dropped connection. Only
+    images classified here earn eco points: a client-supplied category
+    is stored but not rewarded.
+    """
+    keyed = [((record.user_id or default_user_id, record.client_scan_id), record) for record in records]
+    results: List[dict] = []
+
+    users = {
+        user.id: user
+        for user in db.query(User).filter(User.id.in_({key[0] for key, _ in keyed})).all()
+    }
+    stored = _stored_scan_ids(db, {key for key, _ in keyed})
+
+    rows: Dict[ScanKey, dict] = {}
+    earning: Set[ScanKey] = set()
+    for key, record in keyed:
+        result = {"client_scan_id": record.client_scan_id, "user_id": key[0]}
+        if key in stored or key in rows:
+            result["status"] = "duplicate"
+        elif key[0] not in users:
+            result.update(status="rejected", error="User not found")
+        elif not record.client_scan_id or len(record.client_scan_id) > 64:
+            result.update(status="rejected", error="client_scan_id must be 1-64 characters")
+        else:
+            try:
+                with timed("classify"):
+                    rows[key] = _scan_row(record, key[0])
+                result["status"] = "created"
+                if not record.detected_category:
+                    earning.add(key)
+            except ValueError as e:
+                result.update(status="rejected", error=str(e))
+        results.append(result)
+
+    results_by_key = {
+        (result["user_id"], result["client_scan_id"]): result
+        for result in results if result["status"] == "created"
+    }
+    for shard, pending in _by_shard(list(rows)).items():
+        for _ in range(INSERT_ATTEMPTS):
+            try:
+                _insert_scans(db, shard, [rows[key] for key in pending], users, earning)
+                pending = []
+                break
+            except IntegrityError:
+                db.rollback()
+                # A concurrent upload of the same buffer stored some keys first
+                raced = _stored_scan_ids(db, pending)
+                logger.info(f"Bulk scan ingest: {len(raced)} scans stored concurrently, retrying")
+                for key in raced:
+                    _remove_image(rows.pop(key))
+                    results_by_key[key]["status"] = "duplicate"
+                pending = [key for key in pending if key not in raced]
+                if not pending:
+                    break
+        for key in pending:
+            _remove_image(rows.pop(key))
+            results_by_key[key].update(status="rejected", error="Could not store scan, please resend")
+        if pending:
+            logger.warning(f"Bulk scan ingest: gave up on {len(pending)} scans after {INSERT_ATTEMPTS} attempts")
+
+    # executemany does not return ids, so read them back in one pass
+    stored = _stored_scan_ids(db, {
+        key for (key, _), result in zip(keyed, results) if result["status"] != "rejected"
+    })
+    for (key, _), result in zip(keyed, results):
+        if key in stored:
+            result["scan_id"] = stored[key]
+        if key in rows and result["status"] == "created":
+            result["detected_category"] = rows[key]["detected_category"]
+
+    statuses = Counter(result["status"] for result in results)
+    earned = sum(key in earning and result["status"] == "created" for (key, _), result in zip(keyed, results))
+    return {
+        "created": statuses["created"],
+        "duplicates": statuses["duplicate"],
+        "rejected": statuses["rejected"],
+        "eco_points_earned": settings.POINTS_PER_SCAN * earned,
+        "results": results
+    }
@@ -0,0 +1,124 @@
+"""
+Daily per-user scan rollups, kept current as scans are written
+"""
+
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import case, func, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import SHARD_BUCKETS, scan_shards
+from app.models.waste import ScanDailyRollup, WasteScan
+
+logger = logging.getLogger(__name__)
+
+COUNT_COLUMNS = ("scan_count", "feedback_count", "confirmed_count", "corrected_count")
+
+# Keeps IN lists well under driver bind parameter limits
+BUCKET_CHUNK_SIZE = 500
+
+RollupKey = Tuple[int, date, str]  # (user_id, day, detected_category)
+
+def scan_day(scanned_at: datetime) -> date:
+    """UTC date a scan is counted under"""
+    if scanned_at.tzinfo is not None:
+        scanned_at = scanned_at.astimezone(timezone.utc)
+    return scanned_at.date()
+
+def _feedback_counts(user_confirmed: Optional[bool], user_correction: Optional[str]) -> List[int]:
+    return [int(user_confirmed is not None), int(user_confirmed is True), int(user_correction is not None)]
+
+def add_counts(db: Session, key: RollupKey, deltas: Sequence[int]):
+    """Add deltas (in COUNT_COLUMNS order) to one rollup row, creating it if needed (caller commits)
+
+    The session must already be routed to the user's shard.
+    """
+    changes = {name: delta for name, delta in zip(COUNT_COLUMNS, deltas) if delta}
+    if not changes:
+        return
+    table = ScanDailyRollup.__table__
+    user_id, day, category = key
+    increment = update(table).where(
+        table.c.user_id == user_id, table.c.day == day, table.c.detected_category == category
+    ).values({name: table.c[name] + delta for name, delta in changes.items()})
+    if db.execute(increment).rowcount:
+        return
+    if min(changes.values()) < 0:
+        logger.warning(f"No daily rollup for {key}; run `python manage.py rebuild-rollups`")
+        return
+    try:
+        with db.begin_nested():
+            db.execute(insert(table).values(
+                user_id=user_id, day=day, detected_category=category,
+                **{name: changes.get(name, 0) for name in COUNT_COLUMNS}
+            ))
+    except IntegrityError:
+        # A concurrent request created the row first
+        db.execute(increment)
+
+def record_scan(db: Session, scan: WasteScan, sign: int = 1):
+    """Count a stored (sign=1) or deleted (sign=-1) scan (caller commits)"""
+    counts = [1, *_feedback_counts(scan.user_confirmed, scan.user_correction)]
+    add_counts(db, (scan.user_id, scan_day(scan.scanned_at), scan.detected_category), [sign * count for count in counts])
+
+def record_new_scans(db: Session, rows: Iterable[dict]):
+    """Count freshly inserted waste_scans rows, one update per rollup row (caller commits)"""
+    added: Dict[RollupKey, int] = defaultdict(int)
+    for row in rows:
+        added[(row["user_id"], scan_day(row["scanned_at"]), row["detected_category"])] += 1
+    for key, scans in added.items():
+        add_counts(db, key, [scans])
+
+def record_feedback(db: Session, scan: WasteScan, previous: Tuple[Optional[bool], Optional[str]]):
+    """Apply a change of user_confirmed / user_correction from `previous` (caller commits)"""
+    before = _feedback_counts(*previous)
+    after = _feedback_counts(scan.user_confirmed, scan.user_correction)
+    add_counts(
+        db, (scan.user_id, scan_day(scan.scanned_at), scan.detected_category),
+        [0, *(new - old for new, old in zip(after, before))]
+    )
+
+def recount_rollups(db: Session, buckets: Optional[Sequence[int]] = None, before: Optional[date] = None) -> int:
+    """Recompute rollups from waste_scans on the shard the session is routed to (caller commits)
+
+    Limited to users in `buckets` and to days before `before` when given.
+    """
+    rollups, scans = ScanDailyRollup.__table__, WasteScan.__table__
+    day = func.date(scans.c.scanned_at)
+    chunks = [None] if buckets is None else [
+        list(buckets[start:start + BUCKET_CHUNK_SIZE]) for start in range(0, len(buckets), BUCKET_CHUNK_SIZE)
+    ]
+    recounted = 0
+    for chunk in chunks:
+        rollup_filter, scan_filter = [], []
+        if chunk is not None:
+            rollup_filter.append((rollups.c.user_id % SHARD_BUCKETS).in_(chunk))
+            scan_filter.append((scans.c.user_id % SHARD_BUCKETS).in_(chunk))
+        if before is not None:
+            rollup_filter.append(rollups.c.day < before)
+            scan_filter.append(scans.c.scanned_at < datetime.combine(before, datetime.min.time()))
+
+        db.execute(rollups.delete().where(*rollup_filter))
+        recounted += db.execute(insert(rollups).from_select(
+            ["user_id", "day", "detected_category", *COUNT_COLUMNS],
+            select(
+                scans.c.user_id, day, scans.c.detected_category,
+                func.count(),
+                func.sum(case((scans.c.user_confirmed.isnot(None), 1), else_=0)),
+                func.sum(case((scans.c.user_confirmed == True, 1), else_=0)),
+                func.sum(case((scans.c.user_correction.isnot(None), 1), else_=0))
+            ).where(*scan_filter).group_by(scans.c.user_id, day, scans.c.detected_category)
+        )).rowcount
+    return recounted
+
+def rebuild_daily_rollups(db: Session) -> int:
+    """Backfill waste_scan_daily_rollups from waste_scans on every shard (commits)"""
+    rebuilt = 0
+    for shard in range(len(scan_shards.engines)):
+        scan_shards.route_to_shard(db, shard)
+        rebuilt += recount_rollups(db)
+        db.commit()
+    logger.info(f"Rebuilt {rebuilt} daily scan rollups")
+    return rebuilt
@@ -0,0 +1,92 @@
+"""
+Synthetic measurement of waste_scans storage with and without copied guidance text
+"""
+
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+from sqlalchemy import Column, MetaData, String, Table, Text, create_engine, insert
+from app.models.waste import WasteScan
+from app.services.category_registry import CATEGORY_DEFAULTS
+
+# Columns the normalized layout dropped in favour of category_id/category_version
+LEGACY_TEXT_COLUMNS = [
+    ("disposal_method", String(255)),
+    ("environmental_impact", Text()),
+    ("recycling_tips", Text()),
+]
+
+def _scan_table(metadata: MetaData, legacy: bool) -> Table:
+    """waste_scans as it is today, optionally with the legacy text columns"""
+    columns = [
+        Column(column.name, column.type, primary_key=column.primary_key)
+        for column in WasteScan.__table__.columns
+        if not (legacy and column.name in ("category_id", "category_version"))
+    ]
+    if legacy:
+        columns += [Column(name, column_type) for name, column_type in LEGACY_TEXT_COLUMNS]
+    return Table("waste_scans", metadata, *columns)
+
+def _synthetic_rows(count: int, legacy: bool, seed: int = 42) -> Iterator[Dict]:
+    rng = random.Random(seed)
+    categories = list(CATEGORY_DEFAULTS)
+    start = datetime(2023, 1, 1)
+    for i in range(count):
+        category = rng.choice(categories)
+        info = CATEGORY_DEFAULTS[category]
+        row = {
+            "user_id": rng.randint(1, 10_000),
+            "image_url": f"/uploads/waste_images/{i:032x}.jpg",
+            "image_filename": f"{i:032x}.jpg",
+            "image_size": rng.randint(50_000, 5_000_000),
+            "detected_category": category,
+            "confidence_score": rng.random(),
+            "is_recyclable": info["is_recyclable"],
+            "scanned_at": start + timedelta(seconds=i * 30),
+        }
+        if legacy:
+            row.update({
+                "disposal_method": info["disposal_method"],
+                "environmental_impact": info["environmental_impact"],
+                "recycling_tips": info["recycling_tips"],
+            })
+        else:
+            row.update({"category_id": categories.index(category) + 1, "category_version": 1})
+        yield row
+
+def _populate(path: str, rows: int, legacy: bool, batch_size: int) -> int:
+    engine = create_engine(f"sqlite:///{path}")
+    metadata = MetaData()
+    table = _scan_table(metadata, legacy)
+    metadata.create_all(engine)
+
+    batch: List[Dict] = []
+    with engine.begin() as connection:
+        for row in _synthetic_rows(rows, legacy):
+            batch.append(row)
+            if len(batch) >= batch_size:
+                connection.execute(insert(table), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(table), batch)
+    with engine.connect() as connection:
+        connection.exec_driver_sql("VACUUM")
+    engine.dispose()
+    return os.path.getsize(path)
+
+def measure_scan_storage(rows: int = 1_000_000, batch_size: int = 10_000) -> Dict:
+    """Build both layouts in temporary SQLite files and compare their size"""
+    with tempfile.TemporaryDirectory() as directory:
+        legacy_bytes = _populate(os.path.join(directory, "legacy.db"), rows, True, batch_size)
+        normalized_bytes = _populate(os.path.join(directory, "normalized.db"), rows, False, batch_size)
+
+    return {
+        "rows": rows,
+        "legacy_bytes": legacy_bytes,
+        "normalized_bytes": normalized_bytes,
+        "legacy_bytes_per_row": round(legacy_bytes / max(rows, 1), 1),
+        "normalized_bytes_per_row": round(normalized_bytes / max(rows, 1), 1),
+        "reduction_percentage": round((1 - normalized_bytes / max(legacy_bytes, 1)) * 100, 1),
+    }
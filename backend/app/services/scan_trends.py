@@ -0,0 +1,171 @@
+"""
+Dense day x category trend analysis of a user's scans
+"""
+
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.timing import timed
+from app.models.waste import ScanDailyRollup
+
+WEEK = 7
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+ANOMALY_WINDOW = 28
+ANOMALY_MIN_HISTORY = 14
+ANOMALY_THRESHOLD = 3.0
+
+class TrendMatrix(NamedTuple):
+    days: np.ndarray  # datetime64[D], one entry per day, oldest first
+    categories: List[str]
+    counts: np.ndarray  # days x categories
+
+    @property
+    def daily(self) -> np.ndarray:
+        return self.counts.sum(axis=1)
+
+def fill_matrix(start: date, end: date, rows: Iterable) -> TrendMatrix:
+    """Spread (category, date, count) rows over every day from start to end inclusive"""
+    days = np.arange(np.datetime64(start, "D"), np.datetime64(end, "D") + 1)
+    rows = list(rows)
+    categories = sorted({row[0] for row in rows})
+    counts = np.zeros((len(days), len(categories)), dtype=np.int64)
+    if rows:
+        column = {category: i for i, category in enumerate(categories)}
+        offsets = (np.array([str(row[1]) for row in rows], dtype="datetime64[D]") - days[0]).astype(np.int64)
+        columns = np.array([column[row[0]] for row in rows])
+        inside = (offsets >= 0) & (offsets < len(days))
+        np.add.at(counts, (offsets[inside], columns[inside]), np.array([row[2] for row in rows], dtype=np.int64)[inside])
+    return TrendMatrix(days, categories, counts)
+
+async def category_daily_counts(db: AsyncSession, user_id: int, since: date) -> list:
+    """(category, day, scans) since a day in one grouped query; the caller routes `db` to the user's shard"""
+    with timed("trend_query"):
+        return (await db.execute(
+            select(
+                ScanDailyRollup.detected_category,
+                ScanDailyRollup.day,
+                func.sum(ScanDailyRollup.scan_count)
+            ).where(
+                ScanDailyRollup.user_id == user_id,
+                ScanDailyRollup.day >= since
+            ).group_by(ScanDailyRollup.detected_category, ScanDailyRollup.day)
+        )).all()
+
+def moving_average(series: np.ndarray, window: int) -> np.ndarray:
+    """Trailing mean over up to `window` days, along the first axis"""
+    totals = np.cumsum(series, axis=0, dtype=float)
+    totals[window:] = totals[window:] - totals[:-window]
+    sizes = np.minimum(np.arange(1, len(series) + 1), window)
+    return totals / sizes.reshape(-1, *([1] * (series.ndim - 1)))
+
+def week_over_week(series: np.ndarray) -> Dict:
+    """Last 7 days against the 7 before them, along the first axis"""
+    current = series[-WEEK:].sum(axis=0)
+    previous = series[-2 * WEEK:-WEEK].sum(axis=0)
+    change = np.divide(
+        (current - previous) * 100.0, previous,
+        out=np.full(np.shape(current), np.nan), where=previous != 0
+    )
+    return {"current": current, "previous": previous, "change_percent": change}
+
+def weekday_averages(days: np.ndarray, daily: np.ndarray) -> np.ndarray:
+    """Mean scans per weekday (Monday first), counting days without scans"""
+    weekdays = (days.astype(np.int64) + 3) % WEEK  # 1970-01-01 was a Thursday
+    totals = np.bincount(weekdays, weights=daily, minlength=WEEK)
+    occurrences = np.bincount(weekdays, minlength=WEEK)
+    return np.divide(totals, occurrences, out=np.zeros(WEEK), where=occurrences != 0)
+
+def anomalies(daily: np.ndarray) -> np.ndarray:
+    """Indices of days far above or below the mean of the ANOMALY_WINDOW days before them
+
+    Deviations are measured in standard deviations, floored at one scan so
+    that users who scan a couple of items now and then are not flagged.
+    """
+    values = daily.astype(float)
+    sums = np.concatenate([[0.0], np.cumsum(values)])
+    squares = np.concatenate([[0.0], np.cumsum(values ** 2)])
+    index = np.arange(len(values))
+    first = np.maximum(index - ANOMALY_WINDOW, 0)
+    history = index - first
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = (sums[index] - sums[first]) / history
+        variance = (squares[index] - squares[first]) / history - mean ** 2
+    spread = np.maximum(np.sqrt(np.maximum(variance, 0)), 1.0)
+    score = np.abs(values - mean) / spread
+    return np.flatnonzero((history >= ANOMALY_MIN_HISTORY) & (score > ANOMALY_THRESHOLD))
+
+def _rounded(value: float):
+    return None if np.isnan(value) else round(float(value), 1)
+
+def analyze(matrix: TrendMatrix) -> Dict:
+    """Moving averages, week-over-week changes, weekday profile and anomalies"""
+    daily = matrix.daily
+    weekly = week_over_week(daily)
+    by_category = week_over_week(matrix.counts)
+    averages = weekday_averages(matrix.days, daily)
+    flagged = anomalies(daily)
+    expected = moving_average(daily, ANOMALY_WINDOW)
+    return {
+        "moving_average_7d": [round(float(value), 2) for value in moving_average(daily, WEEK)],
+        "moving_average_28d": [round(float(value), 2) for value in expected],
+        "week_over_week": {
+            "current": int(weekly["current"]),
+            "previous": int(weekly["previous"]),
+            "change_percent": _rounded(weekly["change_percent"])
+        },
+        "category_week_over_week": {
+            category: {
+                "current": int(by_category["current"][i]),
+                "previous": int(by_category["previous"][i]),
+                "change_percent": _rounded(by_category["change_percent"][i])
+            }
+            for i, category in enumerate(matrix.categories)
+        },
+        "weekday_averages": {name: round(float(value), 2) for name, value in zip(WEEKDAYS, averages)},
+        "anomalies": [
+            {
+                "date": str(matrix.days[i]),
+                "count": int(daily[i]),
+                "expected": round(float(expected[i - 1]), 2),
+                "direction": "spike" if daily[i] > expected[i - 1] else "drop"
+            }
+            for i in flagged
+        ]
+    }
+
+def trend_insights(matrix: TrendMatrix, analysis: Dict) -> List[str]:
+    """Readable insights from the analysis of a dense trend matrix"""
+    insights = []
+    daily = matrix.daily
+    if len(daily) > WEEK and daily.any():
+        recent_avg = daily[-WEEK:].mean()
+        older_avg = daily[:-WEEK].mean()
+        if recent_avg > older_avg:
+            insights.append("Your scanning activity has increased recently!")
+        elif recent_avg < older_avg:
+            insights.append("Your scanning activity has decreased. Try to scan more items!")
+
+    change = analysis["week_over_week"]["change_percent"]
+    if change is not None and abs(change) >= 10:
+        insights.append(f"You scanned {abs(change):.0f}% {'more' if change > 0 else 'fewer'} items than the week before.")
+
+    growing = {
+        category: stats["current"] - stats["previous"]
+        for category, stats in analysis["category_week_over_week"].items()
+    }
+    if growing and max(growing.values()) > 0:
+        category = max(growing, key=growing.get)
+        insights.append(f"{category.title()} is your fastest growing category this week.")
+
+    averages = analysis["weekday_averages"]
+    if len(daily) >= 2 * WEEK and any(averages.values()):
+        insights.append(f"You scan the most on {max(averages, key=averages.get)}s.")
+
+    spikes = [anomaly for anomaly in analysis["anomalies"] if anomaly["direction"] == "spike"]
+    if spikes:
+        insights.append(f"Unusually busy day on {spikes[-1]['date']} with {spikes[-1]['count']} scans.")
+
+    insights.append("Keep up the great work contributing to environmental sustainability!")
+    return insights
@@ -0,0 +1,116 @@
+"""
+Idempotent seeding of catalog data and bulk fixture loading
+"""
+
+import json
+import logging
+import os
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.system import AppMeta
+from app.models.waste import WasteCategory
+from app.services.category_registry import CATEGORY_DEFAULTS, category_registry, category_row_values
+from app.routers.shop import Product, SAMPLE_PRODUCTS
+from app.routers.diy_projects import DIYProject, SAMPLE_PROJECTS
+
+logger = logging.getLogger(__name__)
+
+# Bump when the built-in sample data changes and should be loaded again
+SEED_VERSION = 2
+SEED_VERSION_KEY = "seed_version"
+DEFAULT_BATCH_SIZE = 1000
+
+# Fixture tables that may be bulk loaded, keyed by table name
+FIXTURE_MODELS = {
+    Product.__tablename__: Product,
+    DIYProject.__tablename__: DIYProject,
+}
+
+def _batches(rows: Iterable[dict], batch_size: int) -> Iterator[List[dict]]:
+    iterator = iter(rows)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def bulk_insert(db: Session, model, rows: Iterable[dict], batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Insert rows with one executemany per batch (caller commits)"""
+    inserted = 0
+    for batch in _batches(rows, batch_size):
+        db.execute(insert(model.__table__), batch)
+        inserted += len(batch)
+    return inserted
+
+def _iter_jsonl(path: str) -> Iterator[dict]:
+    with open(path, "r", encoding="utf-8") as fixture:
+        for line in fixture:
+            if line.strip():
+                yield json.loads(line)
+
+def load_fixture_file(db: Session, path: str, batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, int]:
+    """Load a fixture file and return rows inserted per table
+
+    ``<table>.jsonl`` files are streamed one row per line, so arbitrarily
+    large fixtures load in constant memory. ``.json`` files hold an object
+    mapping table names to lists of rows.
+    """
+    name, extension = os.path.splitext(os.path.basename(path))
+    if extension == ".jsonl":
+        if name not in FIXTURE_MODELS:
+            raise ValueError(f"Unknown fixture table '{name}'")
+        counts = {name: bulk_insert(db, FIXTURE_MODELS[name], _iter_jsonl(path), batch_size)}
+    else:
+        with open(path, "r", encoding="utf-8") as fixture:
+            data = json.load(fixture)
+        unknown = set(data) - set(FIXTURE_MODELS)
+        if unknown:
+            raise ValueError(f"Unknown fixture tables: {', '.join(sorted(unknown))}")
+        counts = {
+            table: bulk_insert(db, FIXTURE_MODELS[table], rows, batch_size)
+            for table, rows in data.items()
+        }
+    db.commit()
+    return counts
+
+def seed_categories(db: Session):
+    """Create missing waste categories and fill in guidance left blank (caller commits)"""
+    existing = {category.name: category for category in db.query(WasteCategory).all()}
+    for name, info in CATEGORY_DEFAULTS.items():
+        values = category_row_values(name, info)
+        category = existing.get(name)
+        if category is None:
+            db.add(WasteCategory(**values))
+        elif category.disposal_method is None:
+            for column, value in values.items():
+                setattr(category, column, value)
+
+def seed_database(db: Session, force: bool = False) -> bool:
+    """Load built-in sample data once per SEED_VERSION; returns True if it ran"""
+    current_version = int(AppMeta.get(db, SEED_VERSION_KEY, "0"))
+    if current_version >= SEED_VERSION and not force:
+        return False
+
+    try:
+        # Write the marker first so a concurrent worker conflicts before inserting data
+        AppMeta.set(db, SEED_VERSION_KEY, str(SEED_VERSION))
+        db.flush()
+
+        seed_categories(db)
+        category_registry.bump_version(db)
+        if db.query(Product.id).first() is None:
+            bulk_insert(db, Product, SAMPLE_PRODUCTS)
+        if db.query(DIYProject.id).first() is None:
+            bulk_insert(db, DIYProject, SAMPLE_PROJECTS)
+
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        logger.info("Seed already applied by another worker")
+        return False
+
+    logger.info(f"Seed data version {SEED_VERSION} applied")
+    return True
@@ -3,12 +3,13 @@ Smart Waste Sorter Backend API
 FastAPI application with AI-powered waste detection and management
 """
 
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import JSONResponse
 import uvicorn
 import os
+import time
 from pathlib import Path
 
 # Import routers
@@ -19,15 +20,25 @@ from app.routers import (
     smart_card,
     shop,
     analytics,
-    diy_projects
+    diy_projects,
+    admin
 )
 
 # Import database
-from app.database import engine, Base
+from app.database import init_db, SessionLocal, read_replicas
 from app.core.config import settings
+from app.core.security import password_hasher
+from app.core.token_families import revoked_families
+from app.core.timing import start_request_timer, record_span, timing_registry
+from app.core.query_stats import start_query_stats, report_request
+from app.core.scheduler import scheduler
+from app.services.seed import seed_database
+from app.services.category_registry import category_registry
+from app.services.community_impact import refresh_community_impact
+from app.services.disposal_rules import disposal_rules
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Create or migrate database tables
+init_db()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -45,8 +56,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Next-Cursor", "ETag"],
 )
 
+# Requests no route matched (static files, 404s) share one label, so
+# arbitrary paths cannot grow the per-route histograms or flood the logs
+UNMATCHED_ROUTE = "<unmatched>"
+
+def route_label(request: Request) -> str:
+    """Method and matched route template, e.g. GET /api/shop/orders/{order_id}"""
+    route = request.scope.get("route")
+    return f"{request.method} {route.path if route is not None else UNMATCHED_ROUTE}"
+
+# Registered before the timing middleware so it runs inside it
+@app.middleware("http")
+async def query_stats_middleware(request: Request, call_next):
+    """Count queries per request and flag repeated statement shapes"""
+    stats = start_query_stats()
+    response = await call_next(request)
+
+    if stats.count:
+        record_span("db", stats.total_ms)
+        report_request(route_label(request), stats)
+    return response
+
+@app.middleware("http")
+async def server_timing_middleware(request: Request, call_next):
+    """Record per-stage timings and expose them as a Server-Timing header"""
+    timer = start_request_timer()
+    if timer is None:
+        return await call_next(request)
+
+    start = time.perf_counter()
+    response = await call_next(request)
+    total_ms = (time.perf_counter() - start) * 1000
+
+    timing_registry.record_request(route_label(request), timer, total_ms)
+    response.headers["Server-Timing"] = timer.header_value(total_ms)
+    return response
+
 # Create upload directories
 os.makedirs("uploads/waste_images", exist_ok=True)
 os.makedirs("uploads/user_avatars", exist_ok=True)
@@ -64,6 +112,49 @@ app.include_router(smart_card.router, prefix="/api/smart-card", tags=["Smart Car
 app.include_router(shop.router, prefix="/api/shop", tags=["Shop"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
 app.include_router(diy_projects.router, prefix="/api/diy", tags=["DIY Projects"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+
+@app.on_event("startup")
+def seed_catalog():
+    """Load sample catalog data once per seed version and cache categories"""
+    with SessionLocal() as db:
+        seed_database(db)
+        category_registry.load(db)
+
+@app.on_event("startup")
+def load_disposal_rules():
+    """Compile per-region disposal rule files"""
+    disposal_rules.load()
+
+@app.on_event("startup")
+def load_revoked_tokens():
+    """Build the in-memory filter of revoked token families"""
+    with SessionLocal() as db:
+        revoked_families.rebuild(db)
+
+@app.on_event("startup")
+async def start_replica_monitor():
+    """Track read replica lag so analytics can fall back to the primary"""
+    read_replicas.start()
+
+@app.on_event("startup")
+async def start_scheduler():
+    """Run periodic background jobs such as community impact snapshots"""
+    if settings.SCHEDULER_ENABLED:
+        scheduler.add_job("community_impact", refresh_community_impact, settings.COMMUNITY_IMPACT_INTERVAL_SECONDS)
+        scheduler.start()
+
+@app.on_event("shutdown")
+async def stop_scheduler():
+    await scheduler.stop()
+
+@app.on_event("shutdown")
+async def stop_replica_monitor():
+    await read_replicas.stop()
+
+@app.on_event("shutdown")
+def stop_password_hasher():
+    password_hasher.shutdown()
 
 @app.get("/")
 async def root():
@@ -102,7 +193,8 @@ async def http_exception_handler(request, exc):
             "error": True,
             "message": exc.detail,
             "status_code": exc.status_code
-        }
+        },
+        headers=exc.headers
     )
 
 @app.exception_handler(Exception)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Smart Waste Sorter management commands
+"""
+
+import argparse
+import sys
+from datetime import date
+
+def grant_admin(args):
+    """Grant (or with --revoke, remove) the admin role for a user"""
+    from app.database import SessionLocal, init_db
+    from app.models.user import User
+
+    init_db()
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.email == args.email).first()
+        if user is None:
+            print(f"❌ No user with email {args.email}")
+            sys.exit(1)
+        user.is_admin = not args.revoke
+        db.commit()
+    print(f"✅ {args.email} is {'no longer' if args.revoke else 'now'} an admin")
+
+def seed(args):
+    """Load built-in sample data and optional fixture files"""
+    from app.database import SessionLocal, init_db
+    from app.services.seed import load_fixture_file, seed_database
+
+    init_db()
+    with SessionLocal() as db:
+        if seed_database(db, force=args.force):
+            print("✅ Sample data loaded")
+        else:
+            print("✅ Sample data already up to date")
+
+        for path in args.fixtures:
+            counts = load_fixture_file(db, path, batch_size=args.batch_size)
+            for table, count in counts.items():
+                print(f"✅ {path}: {count} rows into {table}")
+
+def measure_scan_storage(args):
+    """Compare waste_scans size with and without copied guidance text"""
+    from app.services.scan_storage import measure_scan_storage as measure
+
+    print(f"📏 Building {args.rows:,} synthetic scans in both layouts...")
+    report = measure(rows=args.rows, batch_size=args.batch_size)
+    print(f"   legacy:     {report['legacy_bytes'] / 1024 ** 2:,.1f} MB ({report['legacy_bytes_per_row']} B/row)")
+    print(f"   normalized: {report['normalized_bytes'] / 1024 ** 2:,.1f} MB ({report['normalized_bytes_per_row']} B/row)")
+    print(f"✅ {report['reduction_percentage']}% smaller")
+
+def check_replicas(args):
+    """Write a heartbeat to the primary and report each read replica's lag"""
+    import asyncio
+    from app.core.config import settings
+    from app.database import async_engine, read_replicas
+
+    if not read_replicas.engines:
+        print("ℹ️  No READ_REPLICA_URLS configured; analytics read from the primary")
+        return
+
+    async def check():
+        await read_replicas.write_heartbeat()
+        await read_replicas.check_lag()
+        await read_replicas.stop()
+        await async_engine.dispose()
+
+    asyncio.run(check())
+    for replica in read_replicas.status():
+        lag = replica["lag_seconds"]
+        print(f"{'✅' if replica['in_use'] else '❌'} replica {replica['replica']}: "
+              f"{'unreachable or never replicated' if lag is None else f'{lag:.1f}s behind'}")
+    if not read_replicas.usable():
+        print(f"\n❌ No replica within {settings.REPLICA_MAX_LAG_SECONDS:.0f}s; reads fall back to the primary")
+        sys.exit(1)
+
+def archive_scans(args):
+    """Move scans older than the retention window into monthly Parquet files"""
+    from app.database import SessionLocal, init_db
+    from app.services.scan_archive import archive_scans as archive
+
+    init_db()
+    with SessionLocal() as db:
+        report = archive(db, retention_days=args.older_than_days, batch_size=args.batch_size)
+    if not report["archived"]:
+        print(f"✅ No scans before {report['cutoff']} to archive")
+        return
+    print(f"✅ Archived {report['archived']:,} scans before {report['cutoff']} "
+          f"({', '.join(report['months'])})")
+
+def rebuild_rollups(args):
+    """Recount the daily scan rollups from waste_scans on every shard"""
+    from app.database import SessionLocal, init_db
+    from app.services.scan_rollups import rebuild_daily_rollups
+
+    init_db()
+    with SessionLocal() as db:
+        rows = rebuild_daily_rollups(db)
+    print(f"✅ Rebuilt {rows:,} daily rollup rows")
+
+def refresh_community_impact(args):
+    """Recompute the community impact snapshot now instead of waiting for the scheduler"""
+    from app.database import SessionLocal, init_db
+    from app.services.community_impact import compute_community_impact
+
+    init_db()
+    with SessionLocal() as db:
+        report = compute_community_impact(db)
+    print(f"✅ Community impact computed from {report['scans']:,} scans in {report['regions']} regions")
+
+def export(args):
+    """Stream scans, orders or DIY projects to a CSV or Parquet file"""
+    from app.database import SessionLocal, init_db
+    from app.services.bulk_export import stream_export
+
+    init_db()
+    output = args.output or f"{args.dataset}.{args.format}"
+    written = 0
+    with SessionLocal() as db, open(output, "wb") as f:
+        for chunk in stream_export(db, args.dataset, args.format, args.start, args.end, args.category, args.batch_size):
+            f.write(chunk)
+            written += len(chunk)
+    print(f"✅ Wrote {args.dataset} to {output} ({written:,} bytes)")
+
+def rebuild_geo_cells(args):
+    """Geohash located scans that lack one and recount the heatmap cells"""
+    from app.database import SessionLocal, init_db
+    from app.services.scan_geo import rebuild_geo_cells as run_rebuild
+
+    init_db()
+    with SessionLocal() as db:
+        report = run_rebuild(db)
+    print(f"✅ Geohashed {report['geohashed']:,} scans and rebuilt {report['cells']:,} heatmap cells")
+
+def check_shards(args):
+    """Report scans per shard and rows stored on the wrong shard"""
+    from app.database import scan_shards
+    from app.services.resharding import shard_report
+
+    if not scan_shards.enabled:
+        print("ℹ️  No SCAN_SHARD_URLS configured; scans are stored on the primary")
+        return
+
+    problems = 0
+    for shard in shard_report():
+        if "error" in shard:
+            print(f"❌ shard {shard['shard']} ({shard['url']}): {shard['error']}")
+            problems += 1
+            continue
+        print(f"{'✅' if not shard['misplaced'] else '❌'} shard {shard['shard']} ({shard['url']}): "
+              f"{shard['buckets']} buckets, {shard['scans']:,} scans, {shard['misplaced']:,} misplaced")
+        problems += bool(shard["misplaced"])
+    if problems:
+        sys.exit(1)
+
+def reshard(args):
+    """Spread scan data evenly over every shard in SCAN_SHARD_URLS"""
+    from app.database import init_db
+    from app.services.resharding import reshard as run_reshard
+
+    init_db()
+    report = run_reshard(batch_size=args.batch_size, dry_run=args.dry_run)
+    if not report["moves"]:
+        print(f"✅ Buckets already balanced over {report['shards']} shards")
+        return
+    for move in report["moves"]:
+        if args.dry_run:
+            print(f"ℹ️  shard {move['source']} -> {move['target']}: {move['buckets']} buckets, {move['scans']:,} scans")
+        else:
+            print(f"✅ shard {move['source']} -> {move['target']}: {move['buckets']} buckets, "
+                  f"{move['copied']:,} rows copied, {move['deleted']:,} removed from source")
+
+def main():
+    parser = argparse.ArgumentParser(description="Smart Waste Sorter management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    admin_parser = subparsers.add_parser("grant-admin", help=grant_admin.__doc__)
+    admin_parser.add_argument("email", help="Email of the user")
+    admin_parser.add_argument("--revoke", action="store_true", help="Remove the admin role instead")
+    admin_parser.set_defaults(func=grant_admin)
+
+    seed_parser = subparsers.add_parser("seed", help=seed.__doc__)
+    seed_parser.add_argument("fixtures", nargs="*", help="Fixture files (.json or <table>.jsonl)")
+    seed_parser.add_argument("--force", action="store_true", help="Re-run sample seeding for empty tables")
+    seed_parser.add_argument("--batch-size", type=int, default=1000, help="Rows per batched insert")
+    seed_parser.set_defaults(func=seed)
+
+    storage_parser = subparsers.add_parser("measure-scan-storage", help=measure_scan_storage.__doc__)
+    storage_parser.add_argument("--rows", type=int, default=1_000_000, help="Synthetic scans to generate")
+    storage_parser.add_argument("--batch-size", type=int, default=10_000, help="Rows per batched insert")
+    storage_parser.set_defaults(func=measure_scan_storage)
+
+    replicas_parser = subparsers.add_parser("check-replicas", help=check_replicas.__doc__)
+    replicas_parser.set_defaults(func=check_replicas)
+
+    archive_parser = subparsers.add_parser("archive-scans", help=archive_scans.__doc__)
+    archive_parser.add_argument("--older-than-days", type=int, default=None,
+                                help="Retention window (defaults to SCAN_RETENTION_DAYS)")
+    archive_parser.add_argument("--batch-size", type=int, default=10_000, help="Rows read per batch")
+    archive_parser.set_defaults(func=archive_scans)
+
+    rollups_parser = subparsers.add_parser("rebuild-rollups", help=rebuild_rollups.__doc__)
+    rollups_parser.set_defaults(func=rebuild_rollups)
+
+    geo_parser = subparsers.add_parser("rebuild-geo-cells", help=rebuild_geo_cells.__doc__)
+    geo_parser.set_defaults(func=rebuild_geo_cells)
+
+    impact_parser = subparsers.add_parser("refresh-community-impact", help=refresh_community_impact.__doc__)
+    impact_parser.set_defaults(func=refresh_community_impact)
+
+    export_parser = subparsers.add_parser("export", help=export.__doc__)
+    export_parser.add_argument("dataset", choices=["scans", "orders", "diy-projects"])
+    export_parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    export_parser.add_argument("--output", help="File to write (defaults to <dataset>.<format>)")
+    export_parser.add_argument("--start", type=date.fromisoformat, help="First day to include (YYYY-MM-DD)")
+    export_parser.add_argument("--end", type=date.fromisoformat, help="Last day to include (YYYY-MM-DD)")
+    export_parser.add_argument("--category", help="Detected category (scans), status (orders) or waste category (DIY projects)")
+    export_parser.add_argument("--batch-size", type=int, default=10_000, help="Rows read per batch")
+    export_parser.set_defaults(func=export)
+
+    shards_parser = subparsers.add_parser("check-shards", help=check_shards.__doc__)
+    shards_parser.set_defaults(func=check_shards)
+
+    reshard_parser = subparsers.add_parser("reshard", help=reshard.__doc__)
+    reshard_parser.add_argument("--dry-run", action="store_true", help="Only report which buckets would move")
+    reshard_parser.add_argument("--batch-size", type=int, default=5000, help="Rows copied per batch")
+    reshard_parser.set_defaults(func=reshard)
+
+    args = parser.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Shared fixtures: every test session runs against a throwaway SQLite database
+"""
+
+import os
+import tempfile
+
+# Settings are read when app.core.config is imported, so point them at a
+# temporary database before anything from the app is loaded
+_DB_DIR = tempfile.mkdtemp(prefix="smart-waste-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/primary.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["READ_REPLICA_URLS"] = ""
+os.environ["SCAN_SHARD_URLS"] = ""
+os.environ["SCHEDULER_ENABLED"] = "false"
+os.environ["LEADERBOARD_BACKEND"] = "memory"
+os.environ["RATE_LIMIT_BACKEND"] = "memory"
+
+import itertools
+from datetime import datetime
+import pytest
+from app.database import SessionLocal, engine, init_db
+from app.models.user import User
+
+_user_numbers = itertools.count(1)
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    """Schema for the whole session, built the way the app builds it"""
+    init_db()
+    yield engine
+    engine.dispose()
+
+@pytest.fixture
+def db_dir():
+    return _DB_DIR
+
+@pytest.fixture
+def make_user():
+    """Create a committed user and return its id"""
+    def make(**fields) -> int:
+        number = next(_user_numbers)
+        with SessionLocal() as db:
+            fields.setdefault("hashed_password", "x")
+            user = User(
+                email=f"user{number}@example.com",
+                username=f"user{number}",
+                created_at=datetime.utcnow(),
+                **fields
+            )
+            db.add(user)
+            db.commit()
+            return user.id
+    return make
+
+@pytest.fixture(scope="session")
+def client():
+    """The full app; it loads the classifier, so it needs TensorFlow and OpenCV"""
+    pytest.importorskip("cv2")
+    pytest.importorskip("tensorflow")
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def auth_headers():
+    """Bearer header for a user id"""
+    from app.core.security import create_access_token
+
+    def headers(user_id: int) -> dict:
+        return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+    return headers
@@ -0,0 +1,24 @@
+from app.database import SessionLocal
+from app.models.waste import WasteCategory
+from app.services.category_registry import CategoryRegistry, category_revision
+
+def test_scans_keep_the_guidance_version_they_were_shown():
+    registry = CategoryRegistry()
+    with SessionLocal() as db:
+        category = WasteCategory(name="battery", disposal_method="Battery drop-off box", content_version=1)
+        db.add(category)
+        db.commit()
+        registry.load(db)
+        category_id = category.id
+
+        # The admin edit path: save the outgoing text, then replace it
+        db.add(category_revision(category))
+        category.disposal_method = "Hazardous waste facility"
+        category.content_version = 2
+        db.commit()
+        registry.load(db)
+
+    assert registry.info_for_scan(category_id, "battery", 1)["disposal_method"] == "Battery drop-off box"
+    assert registry.info_for_scan(category_id, "battery", 2)["disposal_method"] == "Hazardous waste facility"
+    # Scans from before versions were recorded show the current text
+    assert registry.info_for_scan(category_id, "battery", None)["disposal_method"] == "Hazardous waste facility"
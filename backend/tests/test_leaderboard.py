@@ -0,0 +1,49 @@
+from datetime import datetime
+import pytest
+from app.database import SessionLocal
+from app.models.user import EcoPointEvent
+from app.services.leaderboard import Leaderboard, MemoryLeaderboardStore, RedisLeaderboardStore, period_key
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request):
+    if request.param == "memory":
+        return MemoryLeaderboardStore(rebuild_seconds=300)
+    fakeredis = pytest.importorskip("fakeredis")
+    return RedisLeaderboardStore(fakeredis.FakeRedis(), rebuild_seconds=300)
+
+def award(user_id: int, points: int) -> int:
+    with SessionLocal() as db:
+        event = EcoPointEvent(user_id=user_id, points=points, reason="test", created_at=datetime.utcnow())
+        db.add(event)
+        db.commit()
+        return event.id
+
+@pytest.mark.asyncio
+async def test_late_increment_after_recount_is_not_counted_twice(store, make_user):
+    user_id = make_user()
+    event_id = award(user_id, 10)
+    board = Leaderboard(store)
+
+    # The recount sees the award before its after_commit hook records it
+    _, points = await board.rank("all_time", user_id)
+    assert points == 10
+    store.increment(period_key("all_time", datetime.utcnow()), user_id, 10, event_id)
+    assert (await board.rank("all_time", user_id))[1] == 10
+
+    later = award(user_id, 5)
+    store.increment(period_key("all_time", datetime.utcnow()), user_id, 5, later)
+    assert (await board.rank("all_time", user_id))[1] == 15
+
+@pytest.mark.asyncio
+async def test_awards_held_while_stale_are_added_above_the_watermark(store, make_user):
+    user_id = make_user()
+    key = period_key("all_time", datetime.utcnow())
+    counted = award(user_id, 10)
+    missed = award(user_id, 7)
+
+    # Both awards arrive while the board is stale; the recount only saw the first
+    store.increment(key, user_id, 10, counted)
+    store.increment(key, user_id, 7, missed)
+    store.replace(key, {user_id: 10}, counted)
+
+    assert store.rank(key, user_id)[1] == 17
@@ -0,0 +1,79 @@
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.dialects import postgresql
+from app.core.pagination import CursorDateTime, apply_keyset, decode_cursor, encode_cursor, finish_page
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models.waste import WasteScan
+
+SORT_COLUMNS = (WasteScan.scanned_at, WasteScan.id)
+PAGE_SIZE = 2
+
+def sort_key(scan):
+    return scan.scanned_at, scan.id
+
+@pytest.fixture
+def scans(make_user):
+    """A user's scans, most of them sharing one whole-second timestamp; returns (user id, ids oldest first)"""
+    user_id = make_user()
+    second = datetime.utcnow().replace(microsecond=0)
+    timestamps = [second] * 7 + [second - timedelta(seconds=1), second + timedelta(microseconds=500)]
+    rows = [
+        {
+            "user_id": user_id,
+            "image_url": "",
+            "image_filename": "",
+            "detected_category": "plastic",
+            "confidence_score": 1.0,
+            "scanned_at": scanned_at
+        }
+        for scanned_at in timestamps
+    ]
+    with SessionLocal() as db:
+        ids = db.execute(insert(WasteScan).returning(WasteScan.id), rows).scalars().all()
+        db.commit()
+    return user_id, [scan_id for _, scan_id in sorted(zip(timestamps, ids))]
+
+@pytest.mark.parametrize("descending", [True, False])
+def test_pages_reach_every_scan_once(scans, descending):
+    user_id, expected = scans
+    query = select(WasteScan).where(WasteScan.user_id == user_id)
+    seen, cursor = [], None
+    with SessionLocal() as db:
+        for _ in range(len(expected) + 1):
+            rows = db.execute(apply_keyset(
+                query, SORT_COLUMNS, decode_cursor(cursor, SORT_COLUMNS), PAGE_SIZE, descending
+            )).scalars().all()
+            page, cursor = finish_page(rows, PAGE_SIZE, sort_key)
+            seen.extend(scan.id for scan in page)
+            if cursor is None:
+                break
+
+    assert seen == (list(reversed(expected)) if descending else expected)
+
+@pytest.mark.asyncio
+async def test_decoded_cursor_reads_the_next_page_with_the_async_session(scans):
+    user_id, expected = scans
+    query = select(WasteScan).where(WasteScan.user_id == user_id)
+    async with AsyncSessionLocal() as db:
+        first = (await db.execute(apply_keyset(query, SORT_COLUMNS, None, PAGE_SIZE))).scalars().all()
+        page, cursor = finish_page(first, PAGE_SIZE, sort_key)
+        # The cursor travels as an opaque string and is decoded on the next request
+        assert cursor == encode_cursor(sort_key(page[-1]))
+        second = (await db.execute(apply_keyset(
+            query, SORT_COLUMNS, decode_cursor(cursor, SORT_COLUMNS), PAGE_SIZE
+        ))).scalars().all()
+
+    newest_first = list(reversed(expected))
+    assert [scan.id for scan in page] == newest_first[:PAGE_SIZE]
+    assert [scan.id for scan in second[:PAGE_SIZE]] == newest_first[PAGE_SIZE:2 * PAGE_SIZE]
+
+def test_cursor_timestamps_bind_as_timestamptz_outside_sqlite():
+    impl = CursorDateTime().dialect_impl(postgresql.dialect())
+    assert impl.timezone is True
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(HTTPException) as error:
+        decode_cursor("not-a-cursor", SORT_COLUMNS)
+    assert error.value.status_code == 400
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+import pytest
+from app.core.analytics_cache import analytics_cache
+from app.core.query_stats import assert_max_queries
+from app.core.user_cache import user_cache
+from app.database import SessionLocal
+from app.models.waste import WasteScan
+from app.services.scan_rollups import record_new_scans
+
+# Statements per request with cold caches; the count must not grow with the number of scans
+BUDGETS = {
+    "/api/detection/history?limit=50": 2,
+    "/api/detection/stats": 2,
+    "/api/analytics/overview": 3,
+    "/api/analytics/environmental-impact": 3,
+    "/api/analytics/trends": 2,
+}
+
+def add_scans(user_id: int, count: int):
+    categories = ["plastic", "glass", "paper"]
+    rows = [
+        {
+            "user_id": user_id,
+            "image_url": "",
+            "image_filename": "",
+            "detected_category": categories[n % len(categories)],
+            "confidence_score": 0.9,
+            "is_recyclable": True,
+            "scanned_at": datetime.utcnow() - timedelta(days=n % 20)
+        }
+        for n in range(count)
+    ]
+    with SessionLocal() as db:
+        db.execute(WasteScan.__table__.insert(), rows)
+        record_new_scans(db, rows)
+        db.commit()
+
+@pytest.mark.parametrize("scans", [3, 40])
+@pytest.mark.parametrize("url", list(BUDGETS))
+def test_query_count_does_not_grow_with_scans(client, make_user, auth_headers, url, scans):
+    user_id = make_user()
+    add_scans(user_id, scans)
+    headers = auth_headers(user_id)
+    user_cache.clear()
+    analytics_cache.clear()
+
+    with assert_max_queries(BUDGETS[url]):
+        response = client.get(url, headers=headers)
+    assert response.status_code == 200
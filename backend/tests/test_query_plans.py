@@ -0,0 +1,14 @@
+import pytest
+from sqlalchemy import select
+from app.database import engine
+from app.models.waste import WasteScan
+from app.services.query_plans import HOT_QUERIES, explain, is_full_scan
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_uses_an_index(name):
+    plan = explain(engine, HOT_QUERIES[name]())
+    assert not any(is_full_scan(line) for line in plan), "\n".join(plan)
+
+def test_unindexed_filter_is_reported_as_a_full_scan():
+    plan = explain(engine, select(WasteScan).where(WasteScan.confidence_score > 0.5))
+    assert any(is_full_scan(line) for line in plan)
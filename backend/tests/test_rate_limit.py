@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from app.core import rate_limit as rate_limit_module
+from app.core.rate_limit import MemoryBucketStore, RedisBucketStore, parse_rate, rate_limit
+from app.core.security import create_access_token
+from app.core.token_families import revoked_families
+
+def limited_app(rate: str, per: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/limited", dependencies=[Depends(rate_limit("test", rate, per=per))])
+    async def limited():
+        return {"ok": True}
+
+    return app
+
+def bearer(user_id: int) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+@pytest.fixture(params=["memory", "redis"])
+def store(request, monkeypatch):
+    if request.param == "memory":
+        store = MemoryBucketStore()
+    else:
+        fakeredis = pytest.importorskip("fakeredis")
+        store = RedisBucketStore(fakeredis.aioredis.FakeRedis())
+    monkeypatch.setattr(rate_limit_module, "rate_limit_store", store)
+    return store
+
+def test_requests_over_the_rate_get_429_with_retry_after(store):
+    with TestClient(limited_app("3/minute", "ip")) as client:
+        statuses = [client.get("/limited").status_code for _ in range(4)]
+        limited = client.get("/limited")
+
+    assert statuses == [200, 200, 200, 429]
+    assert limited.status_code == 429
+    assert 1 <= int(limited.headers["Retry-After"]) <= 20
+    # The Redis store falls back to memory on errors; make sure the script itself ran
+    assert getattr(store, "_available", True)
+
+def test_per_user_limits_keep_separate_buckets(store):
+    with TestClient(limited_app("1/minute", "user")) as client:
+        assert client.get("/limited", headers=bearer(1)).status_code == 200
+        assert client.get("/limited", headers=bearer(1)).status_code == 429
+        assert client.get("/limited", headers=bearer(2)).status_code == 200
+        # No valid token: keyed by client IP instead
+        assert client.get("/limited", headers={"Authorization": "Bearer garbage"}).status_code == 200
+
+def test_invalid_rates_are_rejected():
+    for value in ("10", "0/minute", "10/fortnight", "-1/second"):
+        with pytest.raises(ValueError):
+            parse_rate(value)
+
+def test_per_user_limit_checks_revocation_off_the_event_loop(store, monkeypatch):
+    on_loop = []
+
+    def is_revoked(family_id: str) -> bool:
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return False
+
+    monkeypatch.setattr(revoked_families, "is_revoked", is_revoked)
+    token = create_access_token({"sub": "1", "fid": "family"})
+
+    with TestClient(limited_app("5/minute", "user")) as client:
+        response = client.get("/limited", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert on_loop == [False]
@@ -0,0 +1,74 @@
+import shutil
+import sqlite3
+import time
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from app.core.analytics_cache import ResponseCache
+from app.database import ReadReplicas, REPLICA_AS_OF_KEY, REPLICA_HEARTBEAT_KEY, async_engine, engine
+from app.models.user import User
+
+@pytest_asyncio.fixture
+async def replicas(tmp_path):
+    replica_path = tmp_path / "replica.db"
+    replicas = ReadReplicas([f"sqlite:///{replica_path}"])
+    replicas.path = replica_path
+    yield replicas
+    await replicas.stop()
+
+def replicate(replicas):
+    """Copy the primary database file over the replica"""
+    shutil.copyfile(engine.url.database, replicas.path)
+
+@pytest.mark.asyncio
+async def test_reads_use_the_replica_once_it_has_a_recent_heartbeat(replicas, make_user):
+    replicas.path.touch()
+    await replicas.check_lag()
+    assert replicas.usable() == []
+    async with replicas.session() as db:
+        assert db.bind is async_engine
+
+    await replicas.write_heartbeat()
+    replicate(replicas)
+    await replicas.check_lag()
+    assert replicas.usable() == [0]
+
+    # Written after the copy, so only the primary has it
+    user_id = make_user()
+    async with replicas.session() as db:
+        assert db.bind is replicas.engines[0]
+        assert db.info[REPLICA_AS_OF_KEY] == replicas.replicated_at[0]
+        assert (await db.execute(select(User).where(User.id == user_id))).scalar() is None
+
+@pytest.mark.asyncio
+async def test_lagging_replica_falls_back_to_the_primary(replicas):
+    await replicas.write_heartbeat()
+    replicate(replicas)
+    with sqlite3.connect(replicas.path) as replica:
+        replica.execute("UPDATE app_meta SET value = ? WHERE key = ?", (repr(time.time() - 3600), REPLICA_HEARTBEAT_KEY))
+
+    await replicas.check_lag()
+
+    assert replicas.lag_seconds[0] > 3500
+    assert replicas.usable() == []
+    async with replicas.session() as db:
+        assert db.bind is async_engine
+
+def test_cache_skips_replica_responses_older_than_an_invalidation():
+    cache = ResponseCache(max_size=10, ttl_seconds=60)
+    replicated_at = time.time()
+    cache.invalidate(1)
+
+    # Read from a replica snapshot taken before the user's data changed
+    _, looked_up_at = cache.get("overview", 1)
+    cache.put("overview", 1, (), "stale", looked_up_at, as_of=replicated_at)
+    assert cache.get("overview", 1)[0] is None
+
+    _, looked_up_at = cache.get("overview", 1)
+    cache.put("overview", 1, (), "fresh", looked_up_at, as_of=time.time())
+    assert cache.get("overview", 1)[0] == "fresh"
+
+    # Other users and primary reads are unaffected
+    _, looked_up_at = cache.get("overview", 2)
+    cache.put("overview", 2, (), "other", looked_up_at, as_of=replicated_at)
+    assert cache.get("overview", 2)[0] == "other"
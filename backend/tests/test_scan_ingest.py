@@ -0,0 +1,65 @@
+import base64
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("tensorflow")
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models.user import User
+from app.routers.waste_detection import BulkScanRecord
+from app.services import scan_ingest
+
+def ingest(user_id: int, records):
+    with SessionLocal() as db:
+        report = scan_ingest.ingest_scans(db, records, user_id)
+        user = db.get(User, user_id)
+        return report, user.eco_points, user.total_scans
+
+def test_preclassified_scans_are_stored_without_points(make_user):
+    user_id = make_user()
+    records = [
+        BulkScanRecord(client_scan_id=f"kiosk-{n}", detected_category="plastic", confidence_score=0.9)
+        for n in range(3)
+    ]
+
+    report, eco_points, total_scans = ingest(user_id, records)
+
+    assert report["created"] == 3
+    assert report["eco_points_earned"] == 0
+    assert (eco_points, total_scans) == (0, 3)
+
+def test_only_images_classified_by_the_server_earn_points(make_user, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(scan_ingest.waste_detector, "detect_waste", lambda path: {
+        "detected_category": "glass", "confidence_score": 0.8, "alternatives": []
+    })
+    user_id = make_user()
+    image = base64.b64encode(b"not really a png").decode()
+    records = [
+        BulkScanRecord(client_scan_id="classified", image_base64=image, image_filename="a.png"),
+        BulkScanRecord(client_scan_id="labelled", image_base64=image, image_filename="b.png",
+                       detected_category="glass", confidence_score=1.0),
+        BulkScanRecord(client_scan_id="missing"),
+    ]
+
+    report, eco_points, total_scans = ingest(user_id, records)
+
+    assert [result["status"] for result in report["results"]] == ["created", "created", "rejected"]
+    assert report["eco_points_earned"] == settings.POINTS_PER_SCAN
+    assert (eco_points, total_scans) == (settings.POINTS_PER_SCAN, 2)
+
+def test_ingesting_for_other_users_needs_the_admin_role(client, make_user, auth_headers):
+    owner = make_user()
+    payload = {"scans": [
+        {"client_scan_id": "on-behalf", "user_id": owner, "detected_category": "paper", "confidence_score": 0.7}
+    ]}
+
+    premium = make_user(is_premium=True)
+    response = client.post("/api/detection/scans/bulk", json=payload, headers=auth_headers(premium))
+    assert response.status_code == 403
+
+    admin = make_user(is_admin=True)
+    response = client.post("/api/detection/scans/bulk", json=payload, headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert response.json()["created"] == 1
@@ -0,0 +1,84 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import delete, func, select
+from app.database import (
+    SCAN_ID_NEXT_KEY, SHARD_BUCKETS, SHARD_MAP_VERSION_KEY, ScanShards, SessionLocal, scan_shard_buckets
+)
+from app.models.system import AppMeta
+from app.models.waste import ScanDailyRollup, WasteScan
+from app.services import resharding
+from app.services.scan_rollups import record_new_scans
+from app.services.seed import bulk_insert
+
+# Consecutive ids fall in neighbouring buckets, so they end up on different shards
+USERS = (10, 11)
+
+@pytest.fixture
+def shards(tmp_path, monkeypatch):
+    """Two scan shards in their own SQLite files; the bucket map stays on the primary"""
+    shards = ScanShards([f"sqlite:///{tmp_path}/shard0.db", f"sqlite:///{tmp_path}/shard1.db"])
+    monkeypatch.setattr(resharding, "scan_shards", shards)
+    shards.initialize()
+    yield shards
+    with SessionLocal() as db:
+        db.execute(delete(scan_shard_buckets))
+        db.execute(delete(AppMeta).where(AppMeta.key.in_([SHARD_MAP_VERSION_KEY, SCAN_ID_NEXT_KEY])))
+        db.commit()
+    for shard_engine in shards.engines:
+        shard_engine.dispose()
+
+def add_scans(shards, user_id: int, count: int):
+    rows = [
+        {
+            "user_id": user_id,
+            "image_url": "",
+            "image_filename": "",
+            "detected_category": "metal",
+            "confidence_score": 0.9,
+            "scanned_at": datetime.utcnow()
+        }
+        for _ in range(count)
+    ]
+    with SessionLocal() as db:
+        shards.route(db, user_id)
+        rows = [{**row, "id": scan_id} for row, scan_id in zip(rows, shards.allocate_scan_ids(count))]
+        bulk_insert(db, WasteScan, rows)
+        record_new_scans(db, rows)
+        db.commit()
+
+def stored(shards, user_id: int):
+    """(scans, rolled-up scan count) for a user as the session routing sees them"""
+    with SessionLocal() as db:
+        shards.route(db, user_id)
+        scans = db.scalar(select(func.count()).select_from(WasteScan).where(WasteScan.user_id == user_id))
+        rolled_up = db.scalar(select(func.sum(ScanDailyRollup.scan_count)).where(ScanDailyRollup.user_id == user_id))
+        return scans, rolled_up
+
+def test_every_bucket_starts_on_the_first_shard(shards):
+    assert shards.buckets == (0,) * SHARD_BUCKETS
+    assert {shards.shard_for(user_id) for user_id in USERS} == {0}
+
+def test_reshard_moves_buckets_and_routing_follows(shards):
+    for user_id, count in zip(USERS, (3, 5)):
+        add_scans(shards, user_id, count)
+
+    report = resharding.reshard(settle_seconds=0)
+
+    assert report["moves"][0]["buckets"] == SHARD_BUCKETS // 2
+    assert [shards.shard_for(user_id) for user_id in USERS] == [user_id % SHARD_BUCKETS % 2 for user_id in USERS]
+    assert [stored(shards, user_id) for user_id in USERS] == [(3, 3), (5, 5)]
+    assert [entry["misplaced"] for entry in resharding.shard_report()] == [0, 0]
+    assert [entry["scans"] for entry in resharding.shard_report()] == [3, 5]
+
+    # Already balanced: nothing left to move
+    assert resharding.reshard(settle_seconds=0)["moves"] == []
+
+def test_scan_ids_are_unique_across_shards(shards):
+    for user_id in USERS:
+        add_scans(shards, user_id, 2)
+
+    ids = []
+    for shard_engine in shards.engines:
+        with shard_engine.connect() as connection:
+            ids.extend(connection.scalars(select(WasteScan.__table__.c.id)))
+    assert len(ids) == len(set(ids)) == 4
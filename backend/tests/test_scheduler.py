@@ -0,0 +1,65 @@
+import asyncio
+import uuid
+from datetime import datetime
+import pytest
+from sqlalchemy import select
+from app.core.scheduler import JobScheduler
+from app.database import SessionLocal
+from app.models.waste import CommunityImpactSnapshot
+from app.services.community_impact import refresh_community_impact
+from app.services.scan_rollups import record_new_scans
+
+def unique_name(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:8]}"
+
+@pytest.mark.asyncio
+async def test_lease_lets_one_scheduler_run_a_job_per_interval():
+    name, calls = unique_name("job"), []
+    first, second = JobScheduler(), JobScheduler()
+    for scheduler in (first, second):
+        scheduler.add_job(name, lambda: calls.append(1), interval_seconds=60)
+
+    await first.run_job(first.jobs[name])
+    await second.run_job(second.jobs[name])
+
+    assert calls == [1]
+    assert (first.jobs[name].runs, second.jobs[name].skipped) == (1, 1)
+
+@pytest.mark.asyncio
+async def test_failed_run_is_recorded_and_the_loop_keeps_going():
+    name = unique_name("failing")
+
+    def fail():
+        raise RuntimeError("boom")
+
+    scheduler = JobScheduler()
+    scheduler.add_job(name, fail, interval_seconds=60)
+    scheduler.start()
+    for _ in range(100):
+        if scheduler.jobs[name].failures:
+            break
+        await asyncio.sleep(0.01)
+    status = scheduler.status()[0]
+    await scheduler.stop()
+
+    assert (status["running"], status["failures"], status["last_error"]) == (True, 1, "boom")
+    assert scheduler.status()[0]["running"] is False
+
+def test_community_impact_job_groups_regions_by_location_spelling(make_user):
+    town = unique_name("Test Town")
+    users = [make_user(location=town), make_user(location=f"  {town.upper()} ")]
+    rows = [
+        {"user_id": user_id, "scanned_at": datetime.utcnow(), "detected_category": category}
+        for user_id, category in zip(users, ("plastic", "glass"))
+    ]
+    with SessionLocal() as db:
+        record_new_scans(db, rows)
+        db.commit()
+
+    refresh_community_impact()
+
+    with SessionLocal() as db:
+        snapshot = db.scalars(select(CommunityImpactSnapshot).where(CommunityImpactSnapshot.region == town)).one()
+    assert (snapshot.users, snapshot.scan_count) == (2, 2)
+    assert snapshot.category_counts == {"plastic": 1, "glass": 1}
+    assert snapshot.plastic_items_recycled == 1
@@ -0,0 +1,11 @@
+from app.core.timing import timing_registry
+
+def test_unmatched_paths_share_one_timing_label(client):
+    timing_registry.reset()
+
+    for n in range(3):
+        assert client.get(f"/no-such-page-{n}").status_code == 404
+    client.get("/api/health")
+
+    routes = set(timing_registry.snapshot())
+    assert routes == {"GET <unmatched>", "GET /api/health"}
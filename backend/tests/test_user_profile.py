@@ -0,0 +1,39 @@
+from app.core.security import get_password_hash, verify_password
+from app.database import SessionLocal
+from app.models.user import User
+
+def test_change_password_saves_the_new_hash(client, make_user, auth_headers):
+    user_id = make_user(hashed_password=get_password_hash("old-password"))
+
+    response = client.post(
+        "/api/profile/change-password",
+        json={"current_password": "wrong-password", "new_password": "new-password"},
+        headers=auth_headers(user_id)
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        "/api/profile/change-password",
+        json={"current_password": "old-password", "new_password": "new-password"},
+        headers=auth_headers(user_id)
+    )
+    assert response.status_code == 200
+    with SessionLocal() as db:
+        assert verify_password("new-password", db.get(User, user_id).hashed_password)
+
+def test_avatar_upload_and_delete(client, make_user, auth_headers, monkeypatch, tmp_path):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path))
+    user_id = make_user()
+
+    response = client.post(
+        "/api/profile/avatar",
+        files={"avatar": ("me.png", b"png bytes", "image/png")},
+        headers=auth_headers(user_id)
+    )
+    assert response.status_code == 200
+    stored = tmp_path / "user_avatars" / response.json()["avatar_url"].split("/")[-1]
+    assert stored.read_bytes() == b"png bytes"
+
+    assert client.delete("/api/profile/avatar", headers=auth_headers(user_id)).status_code == 200
+    assert not stored.exists()